@@ -0,0 +1,250 @@
+"""
+Vectorized market statistics with NumPy.
+
+Listing prices, property areas and the city and agency of every listing are read column-wise into
+NumPy arrays (ListingArrays); missing prices and areas become NaN and listings without a city or
+agency are flagged, so they are left out of that grouping. Per-group statistics sort the
+values once by (group, value) and read counts, means, percentiles and outlier fences for every group
+straight off the sorted array, without a Python loop over groups or rows.
+"""
+import argparse
+from collections import namedtuple
+
+import numpy as np
+from sqlalchemy.sql import select
+
+from db import unit_of_work, session_scope, Listing, Property, Address, City, Agency
+
+# city_id and agency_id are 0 where has_city and has_agency are False
+ListingArrays = namedtuple("ListingArrays", ["sale_price", "rental_price", "area_sqm", "city_id", "agency_id",
+                                             "has_city", "has_agency"])
+
+GroupStatistics = namedtuple("GroupStatistics", ["key", "name", "count", "mean", "minimum", "p10", "p25", "median",
+                                                 "p75", "p90", "maximum", "outliers"])
+
+# Percentiles reported for every group, in GroupStatistics field order
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Tukey fence multiplier: values further than this many interquartile ranges outside the quartiles are outliers
+OUTLIER_IQR_FACTOR = 1.5
+
+MEASURES = {
+    "sale": ("Sale price", lambda arrays: arrays.sale_price),
+    "rent": ("Rental price", lambda arrays: arrays.rental_price),
+    "sqm": ("Sale price per sqm", lambda arrays: price_per_sqm(arrays)),
+}
+# grouping -> (model, key field of ListingArrays, field flagging the listings that have a key)
+GROUPINGS = {"city": (City, "city_id", "has_city"), "agency": (Agency, "agency_id", "has_agency")}
+
+
+def _fetch_columns(connection, query, width):
+    """
+    The query's rows as a (rows, width) float64 array, with NaN for NULL. Rows come straight from
+    the DBAPI cursor: building a SQLAlchemy Row per record would take longer than the query itself.
+    """
+    rows = connection.execute(query).cursor.fetchall()
+    return np.array(rows, dtype=np.float64).reshape(-1, width)
+
+
+def _ids(column):
+    """
+    (IDs as int64 with 0 for NULL, mask of the non-NULL IDs) of a foreign key column.
+    """
+    present = ~np.isnan(column)
+    return np.where(present, column, 0).astype(np.int64), present
+
+
+def load_listing_arrays(session, city_id=None):
+    """
+    Every listing's sale price, rental price, property area, city ID and agency ID as ListingArrays,
+    optionally for a single city.
+
+    Listings and properties are read in two sequential table scans and joined in NumPy, which is
+    several times faster than joining every listing to its property and address in SQL.
+    """
+    connection = session.connection()
+    properties = (select(Property.property_id, Property.area_sqm, Address.city_id)
+                  .join(Address, Property.address_id == Address.address_id)
+                  .order_by(Property.property_id))
+    listings = select(Listing.sale_price, Listing.rental_price, Listing.property_id, Listing.agency_id)
+    if city_id is not None:
+        properties = properties.filter(Address.city_id == city_id)
+        listings = listings.filter(Listing.property_id.in_(
+            select(Property.property_id).join(Address, Property.address_id == Address.address_id)
+            .filter(Address.city_id == city_id)))
+
+    property_columns = _fetch_columns(connection, properties, 3)
+    listing_columns = _fetch_columns(connection, listings, 4)
+
+    # Position of every listing's property among the properties, sorted by ID. Listings without a
+    # property (NaN never compares equal) or whose property has no address are dropped
+    property_ids = property_columns[:, 0]
+    position = np.minimum(np.searchsorted(property_ids, listing_columns[:, 2]), max(len(property_ids) - 1, 0))
+    known = ((property_ids[position] == listing_columns[:, 2]) if len(property_ids)
+             else np.zeros(len(listing_columns), dtype=bool))
+    listing_columns = listing_columns[known]
+    position = position[known]
+
+    city_ids, has_city = _ids(property_columns[position, 2])
+    agency_ids, has_agency = _ids(listing_columns[:, 3])
+    return ListingArrays(listing_columns[:, 0], listing_columns[:, 1], property_columns[position, 1],
+                         city_ids, agency_ids, has_city, has_agency)
+
+
+def price_per_sqm(arrays):
+    """
+    Sale price per square metre of every listing; NaN where there is no sale price or no area.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(arrays.area_sqm > 0, arrays.sale_price / arrays.area_sqm, np.nan)
+
+
+def _sorted_groups(keys, values):
+    """
+    Drops NaN values and sorts the rest by (key, value).
+    Returns (sorted values, group keys, group start offsets, group sizes).
+    """
+    present = ~np.isnan(values)
+    keys, values = keys[present], values[present]
+    order = np.lexsort((values, keys))
+    keys, values = keys[order], values[order]
+    group_keys, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    return values, group_keys, starts, counts
+
+
+def _group_percentiles(values, starts, counts, percentile):
+    """
+    The percentile of every group of the sorted values, interpolated linearly like np.percentile.
+    """
+    position = starts + (counts - 1) * (percentile / 100)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, starts + counts - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def group_statistics(keys, values):
+    """
+    Per-group count, mean, minimum, PERCENTILES, maximum and Tukey outlier count of the non-NaN values.
+    Returns a dict of arrays aligned with its "key" array, in key order.
+    """
+    values, group_keys, starts, counts = _sorted_groups(np.asarray(keys), np.asarray(values, dtype=np.float64))
+    if not len(values):
+        empty = np.array([], dtype=np.float64)
+        return {name: empty for name in GroupStatistics._fields if name != "name"}
+
+    statistics = {"key": group_keys, "count": counts,
+                  "mean": np.add.reduceat(values, starts) / counts,
+                  "minimum": values[starts], "maximum": values[starts + counts - 1]}
+    for percentile in PERCENTILES:
+        name = "median" if percentile == 50 else f"p{percentile}"
+        statistics[name] = _group_percentiles(values, starts, counts, percentile)
+
+    low, high = _fences(statistics["p25"], statistics["p75"])
+    group_of_value = np.repeat(np.arange(len(group_keys)), counts)
+    is_outlier = (values < low[group_of_value]) | (values > high[group_of_value])
+    statistics["outliers"] = np.add.reduceat(is_outlier.astype(np.int64), starts)
+    return statistics
+
+
+def _fences(first_quartile, third_quartile):
+    spread = (third_quartile - first_quartile) * OUTLIER_IQR_FACTOR
+    return first_quartile - spread, third_quartile + spread
+
+
+def outlier_flags(keys, values):
+    """
+    Boolean array marking the values outside their group's Tukey fences. NaN values are never outliers.
+    """
+    keys, values = np.asarray(keys), np.asarray(values, dtype=np.float64)
+    sorted_values, group_keys, starts, counts = _sorted_groups(keys, values)
+    flags = np.zeros(len(values), dtype=bool)
+    if not len(sorted_values):
+        return flags
+
+    low, high = _fences(_group_percentiles(sorted_values, starts, counts, 25),
+                        _group_percentiles(sorted_values, starts, counts, 75))
+    present = ~np.isnan(values)
+    group = np.searchsorted(group_keys, keys[present])
+    flags[present] = (values[present] < low[group]) | (values[present] > high[group])
+    return flags
+
+
+def histogram(values, bins=10):
+    """
+    (counts, bin edges) of the non-NaN values.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return np.zeros(bins, dtype=np.int64), np.zeros(bins + 1)
+    return np.histogram(values, bins=bins)
+
+
+def market_statistics(session, measure="sqm", by="city", arrays=None):
+    """
+    GroupStatistics of a measure (sale, rent or sqm, see MEASURES) per city or agency, in key order.
+    arrays defaults to every listing from load_listing_arrays().
+    """
+    if measure not in MEASURES:
+        raise ValueError(f"Unknown measure '{measure}'; choose one of {', '.join(MEASURES)}.")
+    if by not in GROUPINGS:
+        raise ValueError(f"Unknown grouping '{by}'; choose one of {', '.join(GROUPINGS)}.")
+
+    arrays = load_listing_arrays(session) if arrays is None else arrays
+    model, key_field, has_key_field = GROUPINGS[by]
+    values = np.where(getattr(arrays, has_key_field), MEASURES[measure][1](arrays), np.nan)
+    statistics = group_statistics(getattr(arrays, key_field), values)
+    key_column = getattr(model, key_field)
+    names = dict(session.query(key_column, model.name).filter(key_column.in_(statistics["key"].tolist())))
+
+    fields = [statistics[name] for name in GroupStatistics._fields if name != "name"]
+    return [GroupStatistics(int(key), names.get(int(key)), int(count), *map(float, rest[:-1]), int(rest[-1]))
+            for key, count, *rest in zip(*fields)]
+
+
+def _print_statistics(rows, measure, by, limit):
+    print(f"\n{MEASURES[measure][0]} by {by} ({len(rows)} groups, largest {min(limit, len(rows))} shown):")
+    print(f"  {'Name':24} {'Listings':>9} {'P25':>11} {'Median':>11} {'P75':>11} {'Mean':>11} {'Outliers':>9}")
+    for row in sorted(rows, key=lambda row: -row.count)[:limit]:
+        print(f"  {str(row.name)[:24]:24} {row.count:9d} {row.p25:11.2f} {row.median:11.2f} "
+              f"{row.p75:11.2f} {row.mean:11.2f} {row.outliers:9d}")
+
+
+def _print_histogram(values, bins=10, width=40):
+    counts, edges = histogram(values, bins)
+    largest = max(int(counts.max()), 1)
+    for count, low, high in zip(counts, edges[:-1], edges[1:]):
+        print(f"  {low:11.2f} - {high:11.2f} {int(count):9d} {'#' * round(count / largest * width)}")
+
+
+@unit_of_work
+def market_statistics_menu(session):
+    """
+    Prints per-city or per-agency price statistics and the distribution of sale price per sqm.
+    """
+    print("\n--- Market Statistics ---")
+    by = input("Group by (city/agency, default city): ").strip().lower() or "city"
+    measure = input("Measure (sale/rent/sqm, default sqm): ").strip().lower() or "sqm"
+    if by not in GROUPINGS or measure not in MEASURES:
+        print("Invalid choice.")
+        return
+
+    arrays = load_listing_arrays(session)
+    if not len(arrays.sale_price):
+        print("No listings found.")
+        return
+
+    _print_statistics(market_statistics(session, measure, by, arrays), measure, by, limit=20)
+    print("\nSale price per sqm distribution:")
+    _print_histogram(price_per_sqm(arrays))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print market statistics per city or agency.")
+    parser.add_argument("--by", choices=list(GROUPINGS), default="city")
+    parser.add_argument("--measure", choices=list(MEASURES), default="sqm")
+    parser.add_argument("--limit", type=int, default=20, help="groups shown, largest first")
+    args = parser.parse_args()
+
+    with session_scope() as db_session:
+        _print_statistics(market_statistics(db_session, args.measure, args.by), args.measure, args.by, args.limit)
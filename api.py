@@ -0,0 +1,430 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from sqlalchemy.exc import IntegrityError
+
+import services
+import search_index
+import price_history
+from db import session_scope, Listing
+from services import NotFoundError
+
+# Largest page a collection endpoint returns
+MAX_PAGE_SIZE = 500
+
+# Seconds a cached GET response stays valid; bounds how long writes made outside the API
+# (the menu, imports, another process) can go unseen. 0 for no expiry
+RESPONSE_CACHE_TTL = float(os.environ.get("REAL_ESTATE_API_CACHE_TTL", "30"))
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of serialized GET responses, keyed on the request target, with a TTL.
+    Any successful write through the API clears it; a response computed before that clear is
+    not stored after it.
+    """
+
+    def __init__(self, max_entries=2048, ttl=RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (entry, expires_at)
+        self.lock = threading.Lock()
+        # Bumped by every clear so responses computed before it are not stored after it
+        self.generation = 0
+
+    def lookup(self, key):
+        """
+        Returns (True, entry) for a live entry, otherwise (False, generation) where generation
+        is passed back to store() once the response has been computed.
+        """
+        with self.lock:
+            cached = self.entries.get(key)
+            if cached is not None:
+                if self.ttl and cached[1] < time.monotonic():
+                    del self.entries[key]
+                else:
+                    self.entries.move_to_end(key)
+                    return True, cached[0]
+            return False, self.generation
+
+    def store(self, key, entry, generation):
+        """
+        Caches a computed response, unless the cache was cleared since its lookup().
+        """
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.entries[key] = (entry, time.monotonic() + self.ttl if self.ttl else None)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def to_json(value):
+    """
+    Converts query results (Rows, ORM entities, tuples and lists of them) into JSON-ready values.
+    """
+    if value is None or isinstance(value, (str, int, float, bool, dict)):
+        return value
+    if hasattr(value, "_asdict"):
+        return value._asdict()
+    if hasattr(value, "__table__"):
+        return {column.name: getattr(value, column.name) for column in value.__table__.columns}
+    return [to_json(item) for item in value]
+
+
+def _number(params, name):
+    value = params.get(name)
+    return float(value) if value not in (None, "") else None
+
+
+def _page_args(params):
+    after = params.get("after")
+    limit = min(int(params.get("limit", 50)), MAX_PAGE_SIZE)
+    return (int(after) if after else None), limit
+
+
+def _require(result, message):
+    if result is None:
+        raise NotFoundError(message)
+    return result
+
+
+# Read endpoints: handler(session, path_args, query_params) -> payload
+
+def get_city_properties(session, args, params):
+    return _require(services.search_by_city(session, args[0]), f"No city found with the name '{args[0]}'.")
+
+
+def get_registry_prices(session, args, params):
+    property_data, listings = _require(services.prices_by_registry_number(session, args[0]),
+                                       f"No property found with registry number '{args[0]}'.")
+    return {"property": to_json(property_data), "listings": to_json(listings)}
+
+
+def get_search(session, args, params):
+    city_name = params.get("city", "")
+    return _require(services.advanced_search(session, city_name,
+                                             _number(params, "min_sale_price"), _number(params, "max_sale_price"),
+                                             _number(params, "min_rental_price"), _number(params, "max_rental_price")),
+                    f"No city found with the name '{city_name}'.")
+
+
+def get_nearby(session, args, params):
+    """
+    Properties within radius_km of lat/lon, nearest first, or inside bbox=south,west,north,east;
+    both take the price filters of /search.
+    """
+    prices = (_number(params, "min_sale_price"), _number(params, "max_sale_price"),
+              _number(params, "min_rental_price"), _number(params, "max_rental_price"))
+    if params.get("bbox"):
+        south, west, north, east = (float(value) for value in params["bbox"].split(","))
+        return services.properties_in_box(session, south, west, north, east, *prices)
+    limit = params.get("limit")
+    return services.properties_near(session, _number(params, "lat"), _number(params, "lon"),
+                                    _number(params, "radius_km"), *prices,
+                                    limit=min(int(limit), MAX_PAGE_SIZE) if limit else None)
+
+
+def get_price_history(session, args, params):
+    """
+    Bucketed asking prices of a city (?city=name), agency (?agency_id=) or property (?property_id=)
+    over the last ?days= days (default 90), per ?bucket= (hour, day or week).
+    """
+    if params.get("city"):
+        by, key = "city", _require(services.find_city_id(session, params["city"]),
+                                   f"No city found with the name '{params['city']}'.")
+    elif params.get("agency_id"):
+        by, key = "agency", int(params["agency_id"])
+    else:
+        by, key = "property", int(params["property_id"])
+    start = int(time.time()) - int(params.get("days", 90)) * 86400
+    return price_history.price_trend(session, by, key, start, bucket=params.get("bucket", "week"))
+
+
+def get_property_history(session, args, params):
+    return price_history.property_history(session, int(args[0]))
+
+
+def get_fulltext(session, args, params):
+    kinds = [kind for kind in params.get("kind", "").split(",") if kind]
+    unknown = set(kinds) - set(search_index.SEARCH_KINDS)
+    if unknown:
+        raise ValueError(f"unknown kind {', '.join(sorted(unknown))}")
+    return search_index.search(session, params.get("q", ""), kinds or None,
+                               min(int(params.get("limit", 20)), MAX_PAGE_SIZE))
+
+
+def collection(page_function):
+    return lambda session, args, params: page_function(session, *_page_args(params))
+
+
+# Write endpoints: handler(session, path_args, body) -> (status, payload)
+
+_TYPE_NAMES = {str: "a string", int: "an integer", float: "a number"}
+
+
+def _fields(body, required=None, optional=None):
+    """
+    Checks a request body before anything is written. `required` and `optional` map field names to
+    str, int or float (which also accepts integers); required fields must be present and not null.
+    Returns {field: value}, None for absent optional fields. Raises ValueError naming every missing
+    or mistyped field.
+    """
+    if not isinstance(body, dict):
+        raise ValueError("the body must be a JSON object")
+    required, optional = required or {}, optional or {}
+    missing = [name for name in required if body.get(name) is None]
+    if missing:
+        raise ValueError(f"missing required field{'s' if len(missing) > 1 else ''} {', '.join(missing)}")
+    mistyped = [f"{name} must be {_TYPE_NAMES[kind]}" for name, kind in {**required, **optional}.items()
+                if body.get(name) is not None and not _is_a(body[name], kind)]
+    if mistyped:
+        raise ValueError("; ".join(mistyped))
+    return {name: body.get(name) for name in {**required, **optional}}
+
+
+def _is_a(value, kind):
+    # JSON true and false arrive as bools, which are ints in Python
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, (int, float) if kind is float else kind)
+
+
+_ADDRESS_FIELDS = {"street_address": str, "postal_code": str, "city": str, "latitude": float, "longitude": float}
+_PRICE_FIELDS = {"sale_price": float, "rental_price": float}
+
+
+def post_owner(session, args, body):
+    fields = _fields(body, {"first_name": str, "last_name": str}, {"phone_number": str})
+    return 201, services.create_owner(session, fields["first_name"], fields["last_name"], fields["phone_number"])
+
+
+def post_property(session, args, body):
+    fields = _fields(body, {"owner_id": int, "street_address": str, "city": str, "area_sqm": float,
+                            "registry_number": str}, _ADDRESS_FIELDS)
+    return 201, services.create_property(session, fields["owner_id"], fields["street_address"],
+                                         fields["postal_code"], fields["city"], fields["area_sqm"],
+                                         fields["registry_number"], fields["latitude"], fields["longitude"])
+
+
+def post_agency(session, args, body):
+    fields = _fields(body, {"name": str, "company_code": str})
+    return 201, services.create_agency(session, fields["name"], fields["company_code"])
+
+
+def post_listing(session, args, body):
+    fields = _fields(body, {"property_id": int, "agency_id": int}, _PRICE_FIELDS)
+    return 201, services.create_listing(session, fields["property_id"], fields["agency_id"],
+                                        fields["sale_price"], fields["rental_price"])
+
+
+def patch_owner(session, args, body):
+    fields = _fields(body, optional={"first_name": str, "last_name": str, "phone_number": str})
+    return 200, services.update_owner(session, int(args[0]), fields["first_name"], fields["last_name"],
+                                      fields["phone_number"])
+
+
+def patch_property(session, args, body):
+    fields = _fields(body, optional={"area_sqm": float, "registry_number": str})
+    return 200, services.update_property(session, int(args[0]), fields["area_sqm"], fields["registry_number"])
+
+
+def patch_address(session, args, body):
+    fields = _fields(body, optional=_ADDRESS_FIELDS)
+    return 200, services.update_address(session, int(args[0]), fields["street_address"], fields["postal_code"],
+                                        fields["city"], fields["latitude"], fields["longitude"])
+
+
+def patch_agency(session, args, body):
+    fields = _fields(body, optional={"name": str, "company_code": str})
+    return 200, services.update_agency(session, int(args[0]), fields["name"], fields["company_code"])
+
+
+def patch_city(session, args, body):
+    fields = _fields(body, optional={"name": str})
+    return 200, services.update_city(session, int(args[0]), fields["name"])
+
+
+def patch_listing(session, args, body):
+    # Prices missing from the body keep their current value; an explicit null clears them
+    _fields(body, optional=_PRICE_FIELDS)
+    listing = _require(session.get(Listing, int(args[0])), f"No listing found with ID {args[0]}.")
+    return 200, services.update_listing_prices(session, listing.listing_id,
+                                               body.get("sale_price", listing.sale_price),
+                                               body.get("rental_price", listing.rental_price))
+
+
+def deleter(delete_function):
+    def handler(session, args, body):
+        delete_function(session, int(args[0]))
+        return 204, None
+    return handler
+
+
+def delete_agency_listings(session, args, body):
+    return 200, {"removed": services.delete_agency_listings(session, int(args[0]))}
+
+
+ROUTES = [
+    ("GET", r"/cities", collection(services.cities_page)),
+    ("GET", r"/cities/([^/]+)/properties", get_city_properties),
+    ("GET", r"/properties/by-registry/([^/]+)", get_registry_prices),
+    ("GET", r"/search", get_search),
+    ("GET", r"/fulltext", get_fulltext),
+    ("GET", r"/nearby", get_nearby),
+    ("GET", r"/price-history", get_price_history),
+    ("GET", r"/properties/(\d+)/price-history", get_property_history),
+    ("GET", r"/owners", collection(services.owners_page)),
+    ("GET", r"/agencies", collection(services.agencies_page)),
+    ("GET", r"/properties", collection(services.properties_page)),
+    ("GET", r"/listings", collection(services.listings_page)),
+    ("POST", r"/owners", post_owner),
+    ("POST", r"/properties", post_property),
+    ("POST", r"/agencies", post_agency),
+    ("POST", r"/listings", post_listing),
+    ("PATCH", r"/owners/(\d+)", patch_owner),
+    ("PATCH", r"/properties/(\d+)", patch_property),
+    ("PATCH", r"/addresses/(\d+)", patch_address),
+    ("PATCH", r"/agencies/(\d+)", patch_agency),
+    ("PATCH", r"/cities/(\d+)", patch_city),
+    ("PATCH", r"/listings/(\d+)", patch_listing),
+    ("DELETE", r"/owners/(\d+)", deleter(services.delete_owner)),
+    ("DELETE", r"/properties/(\d+)", deleter(services.delete_property)),
+    ("DELETE", r"/listings/(\d+)", deleter(services.delete_listing)),
+    ("DELETE", r"/agencies/(\d+)/listings", delete_agency_listings),
+]
+COMPILED_ROUTES = [(method, re.compile(pattern + r"/?$"), handler) for method, pattern, handler in ROUTES]
+
+
+def etag_for(body):
+    return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """
+    JSON endpoints over the service layer. GET responses carry an ETag, honour If-None-Match
+    and are served from response_cache when possible.
+    """
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY keep-alive clients stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        # Keep load tests quiet; errors are still reported in the responses
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method):
+        target = urlsplit(self.path)
+        for route_method, pattern, handler in COMPILED_ROUTES:
+            match = pattern.match(target.path)
+            if match and route_method == method:
+                args = [unquote(arg) for arg in match.groups()]
+                try:
+                    if method == "GET":
+                        self._handle_read(handler, args, target)
+                    else:
+                        self._handle_write(handler, args)
+                except NotFoundError as error:
+                    self._send_json(404, {"error": str(error)})
+                except (ValueError, KeyError, TypeError) as error:
+                    self._send_json(400, {"error": f"Invalid request: {error}"})
+                except IntegrityError as error:
+                    self._send_json(409, {"error": str(error.orig)})
+                return
+
+        self._send_json(404, {"error": f"No endpoint {method} {target.path}"})
+
+    def _handle_read(self, handler, args, target):
+        found, entry = response_cache.lookup(self.path)
+        if not found:
+            generation = entry
+            params = {name: values[-1] for name, values in parse_qs(target.query).items()}
+            with session_scope() as session:
+                body = json.dumps(to_json(handler(session, args, params))).encode("utf-8")
+            entry = (etag_for(body), body)
+            response_cache.store(self.path, entry, generation)
+
+        etag, body = entry
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._send_body(200, body, etag)
+
+    def _handle_write(self, handler, args):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        with session_scope() as session:
+            status, result = handler(session, args, body)
+            session.flush()
+            payload = to_json(result)
+        response_cache.clear()
+
+        if status == 204:
+            self.send_response(204)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            self._send_json(status, payload)
+
+    def _send_json(self, status, payload):
+        self._send_body(status, json.dumps(payload).encode("utf-8"))
+
+    def _send_body(self, status, body, etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def create_server(host="127.0.0.1", port=8000):
+    return ThreadingHTTPServer((host, port), ApiHandler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the Real Estate Management System as a JSON API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port)
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,49 @@
+from contextlib import asynccontextmanager
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from db import DATABASE_URL, DATABASE_PROFILE, DATABASE_PRAGMAS, install_sqlite_pragmas
+
+# Same database as db.py, reached through the aiosqlite driver
+ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+
+def create_async_database_engine(url=ASYNC_DATABASE_URL, profile=DATABASE_PROFILE, overrides=DATABASE_PRAGMAS,
+                                 **engine_options):
+    """
+    Creates an AsyncEngine that applies the same SQLite pragma profile as the sync engine.
+    """
+    new_engine = create_async_engine(url, **engine_options)
+    if new_engine.dialect.name == "sqlite":
+        install_sqlite_pragmas(new_engine.sync_engine, profile, overrides)
+    return new_engine
+
+
+async_engine = create_async_database_engine()
+
+# expire_on_commit=False keeps returned objects readable after the session is gone
+AsyncSession = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+
+@asynccontextmanager
+async def async_session_scope():
+    """
+    Async unit of work: commits when the block succeeds, rolls back when it raises, always closes.
+    """
+    db_session = AsyncSession()
+    try:
+        yield db_session
+        await db_session.commit()
+    except Exception:
+        await db_session.rollback()
+        raise
+    finally:
+        await db_session.close()
+
+
+async def dispose_async_engine():
+    """
+    Closes the pooled aiosqlite connections. Call before the event loop ends: their worker threads
+    otherwise keep the interpreter from exiting.
+    """
+    await async_engine.dispose()
@@ -0,0 +1,49 @@
+import services
+from async_db import async_session_scope
+
+# The query code is shared with the sync service layer: AsyncSession.run_sync() runs a services.py
+# function against the async connection without blocking the event loop.
+
+
+async def search_by_city(city_name):
+    """
+    Properties in a city with average prices, or None if the city does not exist.
+    """
+    async with async_session_scope() as session:
+        return await session.run_sync(services.search_by_city, city_name)
+
+
+async def prices_by_registry_number(registry_number):
+    """
+    (property, listings) for a registry number, or None if no such property exists.
+    """
+    async with async_session_scope() as session:
+        return await session.run_sync(services.prices_by_registry_number, registry_number)
+
+
+async def advanced_search(city_name, min_sale_price=None, max_sale_price=None,
+                          min_rental_price=None, max_rental_price=None):
+    """
+    Properties in a city within the price ranges, or None if the city does not exist.
+    """
+    async with async_session_scope() as session:
+        return await session.run_sync(services.advanced_search, city_name, min_sale_price, max_sale_price,
+                                      min_rental_price, max_rental_price)
+
+
+async def add_listing(property_id, agency_id, sale_price=None, rental_price=None):
+    """
+    Adds a listing and returns its ID. Raises ValueError for unknown property/agency or missing prices.
+    """
+    async with async_session_scope() as session:
+        listing = await session.run_sync(services.create_listing, property_id, agency_id, sale_price, rental_price)
+        await session.flush()
+        return listing.listing_id
+
+
+async def edit_listing(listing_id, sale_price, rental_price):
+    """
+    Replaces a listing's prices. Raises ValueError if the listing does not exist.
+    """
+    async with async_session_scope() as session:
+        await session.run_sync(services.update_listing_prices, listing_id, sale_price, rental_price)
@@ -0,0 +1,11 @@
+"""
+Benchmark scripts for the Real Estate Management System.
+
+Every benchmark runs against its own scratch database so that real_estate.db is never touched.
+The location can still be overridden through REAL_ESTATE_DB_URL.
+"""
+import os
+
+BENCH_DATABASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench.db")
+
+os.environ.setdefault("REAL_ESTATE_DB_URL", f"sqlite:///{BENCH_DATABASE_PATH}")
@@ -0,0 +1,137 @@
+"""
+Market statistics (per-city and per-agency percentiles, means, outliers and the price per sqm
+histogram) computed with the NumPy analytics module, against the same figures computed the way the
+reports do today: rows fetched through the ORM and aggregated in Python loops, with SQL GROUP BY for
+what SQLite can aggregate itself.
+
+    python -m benchmarks.bench_analytics --scale 1M
+"""
+import argparse
+import math
+import statistics
+import time
+from collections import defaultdict
+
+import numpy as np
+from sqlalchemy.sql import func
+
+import analytics
+from benchmarks.common import parse_scales
+from benchmarks.synthetic import generate
+from db import engine, session_scope, Listing, Property, Address
+
+CASES = [("sqm", "city"), ("sale", "city"), ("rent", "agency")]
+
+
+def python_statistics(session, measure, by):
+    """
+    {key: (count, mean, p25, median, p75, outliers)} with per-row Python arithmetic and statistics.quantiles.
+    """
+    key_column = Address.city_id if by == "city" else Listing.agency_id
+    rows = (session.query(key_column, Listing.sale_price, Listing.rental_price, Property.area_sqm)
+            .join(Property, Listing.property_id == Property.property_id)
+            .join(Address, Property.address_id == Address.address_id))
+    groups = defaultdict(list)
+    for key, sale_price, rental_price, area_sqm in rows:
+        if measure == "sqm":
+            value = sale_price / area_sqm if sale_price is not None and area_sqm and area_sqm > 0 else None
+        else:
+            value = sale_price if measure == "sale" else rental_price
+        if value is not None:
+            groups[key].append(value)
+
+    result = {}
+    for key, values in groups.items():
+        if len(values) > 1:
+            p25, median, p75 = statistics.quantiles(values, n=4, method="inclusive")
+        else:
+            p25 = median = p75 = values[0]
+        spread = (p75 - p25) * analytics.OUTLIER_IQR_FACTOR
+        outliers = sum(1 for value in values if value < p25 - spread or value > p75 + spread)
+        result[key] = (len(values), math.fsum(values) / len(values), p25, median, p75, outliers)
+    return result
+
+
+def sql_summary(session, by):
+    """
+    What SQLite aggregates itself: listing count and mean, min and max sale price per group.
+    """
+    key_column = Address.city_id if by == "city" else Listing.agency_id
+    return (session.query(key_column, func.count(Listing.sale_price), func.avg(Listing.sale_price),
+                          func.min(Listing.sale_price), func.max(Listing.sale_price))
+            .join(Property, Listing.property_id == Property.property_id)
+            .join(Address, Property.address_id == Address.address_id)
+            .group_by(key_column)
+            .all())
+
+
+def python_histogram(session, bins=10):
+    values = [sale_price / area_sqm for sale_price, area_sqm in
+              session.query(Listing.sale_price, Property.area_sqm)
+              .join(Property, Listing.property_id == Property.property_id)
+              .filter(Listing.sale_price.isnot(None), Property.area_sqm > 0)]
+    low, high = min(values), max(values)
+    width = (high - low) / bins or 1
+    counts = [0] * bins
+    for value in values:
+        counts[min(int((value - low) / width), bins - 1)] += 1
+    return counts
+
+
+def timed(label, function):
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:34} {elapsed * 1000:9.1f} ms")
+    return result, elapsed
+
+
+def matches(vectorized, reference):
+    by_key = {row.key: row for row in vectorized}
+    return len(by_key) == len(reference) and all(
+        by_key[key].count == count and by_key[key].outliers == outliers
+        and np.allclose([by_key[key].mean, by_key[key].p25, by_key[key].median, by_key[key].p75],
+                        [mean, p25, median, p75])
+        for key, (count, mean, p25, median, p75, outliers) in reference.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="1M", help="synthetic listing count")
+    args = parser.parse_args()
+
+    listings = parse_scales(args.scale)[0]
+    generate(engine, listings)
+    print(f"{listings} listings")
+
+    with session_scope() as session:
+        print("NumPy:")
+        arrays, load_time = timed("columnar load", lambda: analytics.load_listing_arrays(session))
+        numpy_total = load_time
+        vectorized = {}
+        for measure, by in CASES:
+            vectorized[measure, by], elapsed = timed(f"{measure} by {by}", lambda: analytics.market_statistics(
+                session, measure, by, arrays))
+            numpy_total += elapsed
+        numpy_total += timed("outlier flags (sale by city)",
+                             lambda: analytics.outlier_flags(arrays.city_id, arrays.sale_price))[1]
+        numpy_histogram, elapsed = timed("price per sqm histogram",
+                                         lambda: analytics.histogram(analytics.price_per_sqm(arrays)))
+        numpy_total += elapsed
+
+        print("Python / SQL:")
+        python_total = timed("SQL GROUP BY city (count/avg/min/max)", lambda: sql_summary(session, "city"))[1]
+        for measure, by in CASES:
+            reference, elapsed = timed(f"{measure} by {by}", lambda: python_statistics(session, measure, by))
+            python_total += elapsed
+            print(f"    results match: {matches(vectorized[measure, by], reference)}")
+        counts, elapsed = timed("price per sqm histogram", lambda: python_histogram(session))
+        python_total += elapsed
+        print(f"    histogram matches: {counts == numpy_histogram[0].tolist()}")
+
+    print(f"total: NumPy {numpy_total:.2f}s, Python/SQL {python_total:.2f}s "
+          f"({python_total / numpy_total:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Load test for the JSON API: starts the server in-process on a free port, then N client threads with
+keep-alive connections issue a mix of GET requests for a fixed duration. Each client count runs three
+passes: with the response cache cleared before every request (cold), with the cache warm, and with
+conditional requests answered by 304 Not Modified. The query cache is off throughout.
+
+    python -m benchmarks.bench_api --scale 100k --clients 1,4,16
+"""
+import argparse
+import http.client
+import random
+import threading
+import time
+from urllib.parse import quote
+
+import api
+from benchmarks.common import summarize, parse_scales, disable_query_cache
+from benchmarks.synthetic import generate, city_name
+from db import engine
+
+MODES = ["cold", "warm", "conditional"]
+
+
+def random_target(rng, properties):
+    kind = rng.random()
+    if kind < 0.4:
+        return f"/cities/{quote(city_name(rng.randint(1, 200)))}/properties"
+    if kind < 0.8:
+        return f"/properties/by-registry/REG-{rng.randint(1, properties):08d}"
+    return f"/search?city={quote(city_name(rng.randint(1, 200)))}&min_sale_price=100000&max_sale_price=400000"
+
+
+def client(port, mode, seed, deadline, latencies, properties):
+    """
+    Issues random GET requests until the deadline, recording each request's latency.
+    """
+    rng = random.Random(seed)
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    etags = {}
+    while time.perf_counter() < deadline:
+        target = random_target(rng, properties)
+        headers = {"If-None-Match": etags[target]} if mode == "conditional" and target in etags else {}
+        if mode == "cold":
+            api.response_cache.clear()
+
+        start = time.perf_counter()
+        connection.request("GET", target, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        etags[target] = response.getheader("ETag")
+    connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="100k", help="synthetic listing count")
+    parser.add_argument("--clients", default="1,4,16", help="concurrent client counts")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per client count and mode")
+    args = parser.parse_args()
+
+    # "cold" means the queries run: only the response cache is measured warm
+    disable_query_cache()
+    listings = parse_scales(args.scale)[0]
+    generate(engine, listings)
+
+    server = api.create_server(port=0)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        for clients in parse_scales(args.clients):
+            for mode in MODES:
+                latencies = []
+                deadline = time.perf_counter() + args.duration
+                threads = [threading.Thread(target=client,
+                                            args=(port, mode, seed, deadline, latencies, listings // 2))
+                           for seed in range(clients)]
+                start = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                elapsed = time.perf_counter() - start
+
+                stats = summarize(latencies)
+                print(f"{clients:3} clients {mode:>11}: {len(latencies) / elapsed:8.0f} req/s  "
+                      f"p50 {stats['p50_ms']:8.2f} ms  p99 {stats['p99_ms']:8.2f} ms")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
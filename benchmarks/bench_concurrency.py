@@ -0,0 +1,70 @@
+"""
+Load test for ConcurrentReadService: N client threads issue a mix of searches for a fixed duration
+and the p50/p99 latency and total queries per second are reported per client count.
+
+    python -m benchmarks.bench_concurrency --scale 100k --clients 1,4,16,64 --pool queue
+"""
+import argparse
+import random
+import threading
+import time
+
+from benchmarks.common import summarize, parse_scales, disable_query_cache
+from benchmarks.synthetic import generate, city_name
+from concurrent_service import ConcurrentReadService, POOL_CLASSES
+from db import engine
+
+
+def client(service, seed, deadline, latencies, properties):
+    """
+    Issues random searches until the deadline, recording each request's latency.
+    """
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        kind = rng.random()
+        start = time.perf_counter()
+        if kind < 0.4:
+            future = service.submit("search_by_city", city_name(rng.randint(1, 200)))
+        elif kind < 0.8:
+            future = service.submit("prices_by_registry_number", f"REG-{rng.randint(1, properties):08d}")
+        else:
+            future = service.submit("advanced_search", city_name(rng.randint(1, 200)), 100_000, 400_000)
+        future.result()
+        latencies.append(time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="100k", help="synthetic listing count")
+    parser.add_argument("--clients", default="1,4,16,64", help="concurrent client counts")
+    parser.add_argument("--workers", type=int, default=8, help="service thread pool and connection pool size")
+    parser.add_argument("--pool", choices=list(POOL_CLASSES), default="queue")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per client count")
+    args = parser.parse_args()
+
+    # Clients repeat the same searches; time the service's queries, not cache hits
+    disable_query_cache()
+    listings = parse_scales(args.scale)[0]
+    generate(engine, listings)
+    engine.dispose()
+
+    with ConcurrentReadService(workers=args.workers, pool=args.pool) as service:
+        for clients in parse_scales(args.clients):
+            latencies = []
+            deadline = time.perf_counter() + args.duration
+            threads = [threading.Thread(target=client, args=(service, seed, deadline, latencies, listings // 2))
+                       for seed in range(clients)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+            stats = summarize(latencies)
+            print(f"{clients:3} clients: {len(latencies) / elapsed:8.0f} QPS  "
+                  f"p50 {stats['p50_ms']:8.2f} ms  p99 {stats['p99_ms']:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
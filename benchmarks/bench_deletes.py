@@ -0,0 +1,105 @@
+"""
+Cascading delete cost: removing an owner with N properties, and removing every listing of an
+agency, with the set-based deletes in services.py against the loops they replaced (one DELETE on
+listings and addresses per property, or one delete_listing() per listing). Every run is rolled
+back, so all of them start from the same data.
+
+    python -m benchmarks.bench_deletes --scale 1M --owner-sizes 10,100,1000,10000
+"""
+import argparse
+import time
+
+from sqlalchemy import text
+
+import services
+from benchmarks.common import StatementCounter, parse_scales
+from benchmarks.synthetic import generate
+from db import engine, Session, Owner, Property, Address, Listing
+from price_summary import discard_property_summaries, check_price_summary
+
+OWNER_ID = 1
+
+
+def loop_delete_owner(session, owner_id):
+    """
+    delete_owner() as it was: every property loaded and removed with its own statements.
+    """
+    owner = session.get(Owner, owner_id)
+    properties = session.query(Property).filter_by(owner_id=owner_id).all()
+    services.invalidate_on_commit(session, services.property_cache_tags(
+        session, [property.property_id for property in properties]))
+    discard_property_summaries(session, [property.property_id for property in properties])
+    for property in properties:
+        session.query(Listing).filter_by(property_id=property.property_id).delete()
+        session.query(Address).filter_by(address_id=property.address_id).delete()
+        session.delete(property)
+    session.delete(owner)
+
+
+def loop_delete_agency_listings(session, agency_id):
+    """
+    What removing an agency's listings took before: delete_listing() for each of them.
+    """
+    listing_ids = [row.listing_id for row in session.query(Listing.listing_id).filter_by(agency_id=agency_id)]
+    for listing_id in listing_ids:
+        services.delete_listing(session, listing_id)
+
+
+def give_properties(owner_id, count):
+    """
+    Makes the owner own exactly the first `count` properties.
+    """
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE properties SET owner_id = :other WHERE owner_id = :owner"),
+                           {"owner": owner_id, "other": owner_id + 1})
+        connection.execute(text("UPDATE properties SET owner_id = :owner WHERE property_id <= :count"),
+                           {"owner": owner_id, "count": count})
+
+
+def run(delete, key):
+    """
+    Seconds and SQL statements one delete takes including its flush; checks the price summary is
+    still consistent, then rolls back.
+    """
+    session = Session()
+    try:
+        with StatementCounter(engine) as counter:
+            start = time.perf_counter()
+            delete(session, key)
+            session.flush()
+            elapsed = time.perf_counter() - start
+        assert not check_price_summary(session), "price summary out of date after the delete"
+        return elapsed, counter.count
+    finally:
+        session.rollback()
+        session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="1M", help="synthetic listing count")
+    parser.add_argument("--owner-sizes", default="10,100,1000,10000", help="properties of the removed owner")
+    parser.add_argument("--agency", type=int, default=1, help="agency whose listings are removed")
+    args = parser.parse_args()
+
+    generate(engine, parse_scales(args.scale)[0])
+
+    print(f"{'removal':34} {'loop':>10} {'stmts':>7} {'set-based':>10} {'stmts':>7}")
+    for size in parse_scales(args.owner_sizes):
+        give_properties(OWNER_ID, size)
+        loop, loop_statements = run(loop_delete_owner, OWNER_ID)
+        bulk, bulk_statements = run(services.delete_owner, OWNER_ID)
+        print(f"{f'owner with {size} properties':34} {loop * 1000:8.1f}ms {loop_statements:7} "
+              f"{bulk * 1000:8.1f}ms {bulk_statements:7}")
+
+    with engine.connect() as connection:
+        listings = connection.execute(text("SELECT count(*) FROM listings WHERE agency_id = :agency"),
+                                      {"agency": args.agency}).scalar()
+    loop, loop_statements = run(loop_delete_agency_listings, args.agency)
+    bulk, bulk_statements = run(services.delete_agency_listings, args.agency)
+    print(f"{f'agency with {listings} listings':34} {loop * 1000:8.1f}ms {loop_statements:7} "
+          f"{bulk * 1000:8.1f}ms {bulk_statements:7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Measures bulk_export throughput and peak memory for every export format.
+
+    python -m benchmarks.bench_export --scale 1M
+"""
+import argparse
+import os
+import tempfile
+import tracemalloc
+
+from benchmarks.common import parse_scales
+from benchmarks.synthetic import generate
+from bulk_export import EXPORT_FORMATS, export_catalog, pyarrow
+from db import engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="1M", help="synthetic listing count")
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--memory", action="store_true", help="also trace peak Python memory (slower)")
+    args = parser.parse_args()
+
+    generate(engine, parse_scales(args.scale)[0])
+
+    with tempfile.TemporaryDirectory() as directory:
+        for export_format in EXPORT_FORMATS:
+            if export_format == "parquet" and pyarrow is None:
+                print(f"{export_format:9} skipped (pyarrow not installed)")
+                continue
+
+            path = os.path.join(directory, f"catalog.{export_format}")
+            if args.memory:
+                tracemalloc.start()
+            rows, elapsed = export_catalog(path, export_format, args.chunk_size)
+            peak = f", peak {tracemalloc.get_traced_memory()[1] / 1_000_000:.1f} MB" if args.memory else ""
+            if args.memory:
+                tracemalloc.stop()
+
+            print(f"{export_format:9} {rows} rows in {elapsed:6.2f}s  {rows / elapsed:>10,.0f} rows/sec  "
+                  f"{os.path.getsize(path) / 1_000_000:7.1f} MB{peak}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Proximity search latency through the R*Tree spatial index against the same search filtering the
+address coordinates without an index. The default scale has a million properties.
+
+    python -m benchmarks.bench_geo --scale 2M --repeat 20
+"""
+import argparse
+import random
+import time
+
+import geo_search
+import services
+from benchmarks.common import summarize, parse_scales
+from benchmarks.synthetic import generate, city_centre
+from db import engine, session_scope, Address
+
+# (label, radius in km, price filters)
+QUERIES = [
+    ("1 km", 1, ()),
+    ("5 km", 5, ()),
+    ("25 km", 25, ()),
+    ("5 km, sale 100k-400k", 5, (100_000, 400_000)),
+    ("25 km, rent <= 800", 25, (None, None, None, 800)),
+]
+
+
+def scan_near(session, latitude, longitude, radius_km, *prices):
+    """
+    properties_near() with the bounding box applied to the address columns instead of the index.
+    """
+    south, west, north, east = geo_search.bounding_box(latitude, longitude, radius_km)
+    rows = (services.priced_properties_query(session, *prices, extra_columns=(Address.latitude, Address.longitude))
+            .filter(Address.latitude.between(south, north), Address.longitude.between(west, east))
+            .all())
+    return [row for row in rows
+            if geo_search.haversine_km(latitude, longitude, row.latitude, row.longitude) <= radius_km]
+
+
+def time_queries(search, radius_km, prices, repeat):
+    rng = random.Random(7)
+    samples, hits = [], 0
+    for _ in range(repeat):
+        latitude, longitude = city_centre(rng.randint(1, 200))
+        with session_scope() as session:
+            start = time.perf_counter()
+            results = search(session, latitude, longitude, radius_km, *prices)
+            samples.append(time.perf_counter() - start)
+        hits += len(results)
+    return samples, hits // repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="2M", help="synthetic listing count (two listings per property)")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per indexed query")
+    parser.add_argument("--scan-repeat", type=int, default=3, help="runs per unindexed query")
+    args = parser.parse_args()
+
+    listings = parse_scales(args.scale)[0]
+    generate(engine, listings)
+    start = time.perf_counter()
+    located = geo_search.rebuild_geo_index()
+    print(f"indexed {located} addresses in {time.perf_counter() - start:.1f}s")
+
+    print(f"{'query':22} {'rtree p50':>10} {'rtree p99':>10} {'scan p50':>10} {'hits':>7}")
+    for label, radius_km, prices in QUERIES:
+        indexed, hits = time_queries(services.properties_near, radius_km, prices, args.repeat)
+        scanned, scan_hits = time_queries(scan_near, radius_km, prices, args.scan_repeat)
+        indexed, scanned = summarize(indexed), summarize(scanned)
+        print(f"{label:22} {indexed['p50_ms']:8.2f}ms {indexed['p99_ms']:8.2f}ms "
+              f"{scanned['p50_ms']:8.1f}ms {hits:7}")
+
+
+if __name__ == "__main__":
+    main()
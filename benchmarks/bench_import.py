@@ -0,0 +1,70 @@
+"""
+Writes a synthetic feed file and measures bulk_import throughput into an empty database.
+
+    python -m benchmarks.bench_import --rows 1M --format csv
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import tempfile
+
+from benchmarks.common import parse_scales
+from bulk_import import FEED_COLUMNS, import_feed, print_import_report
+from db import Base, engine
+
+
+def write_feed(path, rows, file_format, seed=42):
+    """
+    Writes `rows` feed records: about two listings per property and four properties per owner.
+    """
+    rng = random.Random(seed)
+    properties = max(1, rows // 2)
+    owners = max(1, properties // 4)
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, FEED_COLUMNS) if file_format == "csv" else None
+        if writer:
+            writer.writeheader()
+        for _ in range(rows):
+            property_number = rng.randint(1, properties)
+            owner_number = property_number % owners + 1
+            agency_number = rng.randint(1, 50)
+            record = {
+                "first_name": f"First{owner_number}", "last_name": f"Last{owner_number}",
+                "phone_number": f"+370{owner_number:08d}",
+                "street_address": f"{property_number} Street", "postal_code": f"LT-{property_number % 90000 + 10000}",
+                "city": f"City {property_number % 200 + 1:04d}", "area_sqm": round(rng.uniform(25, 250), 1),
+                "registry_number": f"REG-{property_number:08d}",
+                "agency_name": f"Agency {agency_number}", "company_code": f"AG{agency_number:05d}",
+                "sale_price": round(rng.uniform(30_000, 900_000), -2) if rng.random() < 0.7 else "",
+                "rental_price": round(rng.uniform(300, 3_000), 0) if rng.random() < 0.5 else "",
+            }
+            if not record["sale_price"] and not record["rental_price"]:
+                record["rental_price"] = 500.0
+            if writer:
+                writer.writerow(record)
+            else:
+                file.write(json.dumps(record) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="100k", help="feed size, e.g. 100k or 1M")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rows = parse_scales(args.rows)[0]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"feed.{args.format}")
+        write_feed(path, rows, args.format)
+
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        stats = import_feed(path, args.format, args.chunk_size, progress=False)
+        print_import_report(stats)
+
+
+if __name__ == "__main__":
+    main()
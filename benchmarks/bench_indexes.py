@@ -0,0 +1,58 @@
+"""
+Measures search_properties_by_city and advanced_search before and after the declared indexes exist.
+
+    python -m benchmarks.bench_indexes --scales 10k,100k,1M
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import time_call, summarize, parse_scales, disable_query_cache
+from benchmarks.synthetic import generate, city_name
+from db import engine, create_missing_indexes, drop_declared_indexes
+from features_read import search_properties_by_city, advanced_search
+
+
+def measure(repeat):
+    """
+    Times both read paths with the same scripted answers.
+    """
+    city = city_name(1)
+    return {
+        "search_properties_by_city": summarize(time_call(search_properties_by_city, [city], repeat)),
+        "advanced_search": summarize(time_call(advanced_search, [city, "100000", "500000", "", ""], repeat)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="10k,100k,1M", help="listing counts, e.g. 10k,100k,1M")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    # Both passes repeat the same searches; with the cache on, "after" would replay results cached "before"
+    disable_query_cache()
+    results = {}
+    for scale in parse_scales(args.scales):
+        start = time.perf_counter()
+        generate(engine, scale)
+        drop_declared_indexes()
+        print(f"\n{scale} listings (generated in {time.perf_counter() - start:.1f}s)")
+
+        before = measure(args.repeat)
+        create_missing_indexes()
+        after = measure(args.repeat)
+
+        results[scale] = {"before": before, "after": after}
+        for name in before:
+            print(f"  {name:28} before p50 {before[name]['p50_ms']:>10.2f} ms   "
+                  f"after p50 {after[name]['p50_ms']:>10.2f} ms")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Calling operations as a library: registry lookups and city searches through the interactive screens
+(scripted answers, output discarded), through operations.py (one unit of work per call) and through
+services.py in one shared session (a batch job). Also compares the memory a city's search result
+holds as SQLAlchemy Rows and as the record namedtuples services.py now returns.
+
+    python -m benchmarks.bench_operations --scale 100k
+"""
+import argparse
+import time
+import tracemalloc
+
+import features_read
+import operations
+import services
+from benchmarks.common import scripted_input, parse_scales, disable_query_cache
+from benchmarks.synthetic import generate, city_name
+from db import engine, session_scope, Property, Address, PropertyPriceSummary
+
+
+def registry_number(call):
+    return f"REG-{call * 7919 % 10_000 + 1:08d}"
+
+
+def through_screen(calls):
+    for call in range(calls):
+        with scripted_input([registry_number(call)]):
+            features_read.view_prices_by_registry_number()
+
+
+def through_operations(calls):
+    for call in range(calls):
+        operations.prices_by_registry_number(registry_number(call))
+
+
+def through_services(calls):
+    with session_scope() as session:
+        for call in range(calls):
+            services.prices_by_registry_number(session, registry_number(call))
+
+
+def city_rows(session, city_id):
+    """
+    What properties_in_city() returned before: the query's Row objects.
+    """
+    return (session.query(Property.property_id, Property.registry_number, Property.area_sqm,
+                          Address.street_address, Address.postal_code,
+                          PropertyPriceSummary.avg_sale_price, PropertyPriceSummary.avg_rental_price)
+            .join(Address, Property.address_id == Address.address_id)
+            .join(PropertyPriceSummary, Property.property_id == PropertyPriceSummary.property_id)
+            .filter(Address.city_id == city_id)
+            .all())
+
+
+def held_bytes(load):
+    """
+    Bytes still allocated by a loaded result, and the result.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = load()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return held, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="100k", help="synthetic listing count")
+    parser.add_argument("--calls", type=int, default=2000, help="registry lookups per path")
+    args = parser.parse_args()
+
+    # Every path repeats lookups of the same registry numbers; compare their cost, not cache hits
+    disable_query_cache()
+    generate(engine, parse_scales(args.scale)[0], skew=1.0)
+
+    print(f"{'registry lookups':24} {'per call':>10}")
+    for label, run in [("interactive screen", through_screen), ("operations.py", through_operations),
+                       ("services.py, one session", through_services)]:
+        start = time.perf_counter()
+        run(args.calls)
+        print(f"{label:24} {(time.perf_counter() - start) / args.calls * 1_000_000:8.1f}us")
+
+    with session_scope() as session:
+        city_id = services.find_city_id(session, city_name(1))
+        row_bytes, rows = held_bytes(lambda: city_rows(session, city_id))
+        record_bytes, records = held_bytes(lambda: services.properties_in_city(session, city_id))
+    print(f"\nlargest city, {len(records)} properties: Rows hold {row_bytes / 1024:.0f} KB, "
+          f"records {record_bytes / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Entity picker cost: the old screens loaded and printed every row of the table before asking for an
+ID; the picker fetches one keyset page of the displayed columns. Reports latency and peak Python
+memory for the first page, a page deep into the table, a prefix-filtered page and, for comparison,
+the full load.
+
+    python -m benchmarks.bench_pickers --scale 1M
+"""
+import argparse
+import os
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+from sqlalchemy.orm import joinedload
+
+import picker
+from benchmarks.common import summarize, parse_scales
+from benchmarks.synthetic import generate
+from db import engine, session_scope, Owner, Property, Address, Listing
+
+# (picker, model and loader options the old screen listed, a prefix to filter by)
+PICKERS = [
+    (picker.OWNERS, Owner, (), "Last12"),
+    (picker.PROPERTIES, Property, (), "REG-00001"),
+    (picker.ADDRESSES, Address, (joinedload(Address.city),), "12"),
+    (picker.LISTINGS, Listing, (), "REG-00001"),
+]
+
+
+def load_all(session, spec, model, options):
+    """
+    What the screens did before the picker: every row as an ORM object, all printed.
+    """
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        for row in session.query(model).options(*options).all():
+            print(row.__dict__)
+
+
+def deep_key(session, spec):
+    """
+    Sort key of a row 90% of the way through the table, as if the user had paged that far.
+    """
+    count = session.query(spec.key).count()
+    return (session.query(spec.key).order_by(spec.key).offset(count * 9 // 10).limit(1).scalar(),)
+
+
+def measure(action, repeat):
+    samples, peak = [], 0
+    for _ in range(repeat):
+        with session_scope() as session:
+            tracemalloc.start()
+            start = time.perf_counter()
+            action(session)
+            samples.append(time.perf_counter() - start)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    return summarize(samples), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="1M", help="synthetic listing count")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per picker page")
+    parser.add_argument("--load-repeat", type=int, default=2, help="runs of the full load")
+    args = parser.parse_args()
+
+    generate(engine, parse_scales(args.scale)[0])
+    page_size = picker.PICKER_PAGE_SIZE
+
+    print(f"{'picker':10} {'page':14} {'p50':>10} {'p99':>10} {'peak':>10}")
+    for spec, model, options, prefix in PICKERS:
+        with session_scope() as session:
+            after = deep_key(session, spec)
+        cases = [
+            ("first", lambda session: picker.picker_page(session, spec, limit=page_size), args.repeat),
+            ("90% deep", lambda session: picker.picker_page(session, spec, after=after, limit=page_size),
+             args.repeat),
+            (f"/{prefix}", lambda session: picker.picker_page(session, spec, prefix, limit=page_size),
+             args.repeat),
+            ("load all", lambda session: load_all(session, spec, model, options), args.load_repeat),
+        ]
+        for label, action, repeat in cases:
+            timing, peak = measure(action, repeat)
+            print(f"{spec.label:10} {label:14} {timing['p50_ms']:8.2f}ms {timing['p99_ms']:8.2f}ms "
+                  f"{peak / 1_000_000:8.2f}MB")
+
+
+if __name__ == "__main__":
+    main()
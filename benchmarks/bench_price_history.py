@@ -0,0 +1,131 @@
+"""
+Price history at scale: cost of the history triggers on listing edits, latency of the bucketed
+trend queries per city, agency and property over a synthetic year of price changes, and what the
+retention job removes.
+
+    python -m benchmarks.bench_price_history --scale 1M --events-per-listing 4
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import text
+
+import price_history
+from benchmarks.common import summarize, parse_scales
+from benchmarks.synthetic import generate, _insert_chunked
+from db import engine, session_scope, ListingPriceHistory
+
+DAY = 86400
+
+
+def synthetic_history(listings, events_per_listing, now, days=365, seed=3):
+    """
+    Replaces the history with events_per_listing repricings per listing, spread evenly over the last
+    `days` days in time order; prices drift by up to +-10% over the year.
+    """
+    rng = random.Random(seed)
+    with engine.connect() as connection:
+        rows = connection.execute(text(
+            "SELECT listings.listing_id, listings.property_id, addresses.city_id, listings.agency_id, "
+            "listings.sale_price, listings.rental_price FROM listings "
+            "JOIN properties ON properties.property_id = listings.property_id "
+            "JOIN addresses ON addresses.address_id = properties.address_id")).all()
+    drift = {city_id: rng.uniform(-0.1, 0.1) for city_id in {row.city_id for row in rows}}
+    total = len(rows) * events_per_listing
+    start = now - days * DAY
+
+    def events():
+        for i in range(total):
+            listing = rows[rng.randrange(len(rows))]
+            progress = i / total
+            factor = (1 + drift[listing.city_id] * progress) * rng.uniform(0.95, 1.05)
+            yield {"ts": start + int(progress * days * DAY), "event": price_history.EVENTS["repriced"],
+                   "listing_id": listing.listing_id, "property_id": listing.property_id,
+                   "city_id": listing.city_id, "agency_id": listing.agency_id,
+                   "sale_price": round(listing.sale_price * factor, -2) if listing.sale_price else None,
+                   "rental_price": round(listing.rental_price * factor) if listing.rental_price else None}
+
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM listing_price_history"))
+        _insert_chunked(connection, ListingPriceHistory.__table__, events())
+    return total
+
+
+def time_edits(count, with_triggers):
+    """
+    Seconds per repricing UPDATE of `count` listings in one transaction, rolled back afterwards.
+    """
+    rng = random.Random(5)
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        if not with_triggers:
+            connection.execute(text("DROP TRIGGER history_listings_update"))
+        top = connection.execute(text("SELECT max(listing_id) FROM listings")).scalar()
+        start = time.perf_counter()
+        for _ in range(count):
+            connection.execute(text("UPDATE listings SET sale_price = :price WHERE listing_id = :listing_id"),
+                               {"price": rng.randint(300, 9000) * 100, "listing_id": rng.randint(1, top)})
+        elapsed = time.perf_counter() - start
+        transaction.rollback()
+    return elapsed / count
+
+
+def time_trend(by, keys, days, bucket, repeat, now):
+    samples = []
+    rng = random.Random(11)
+    for _ in range(repeat):
+        with session_scope() as session:
+            start = time.perf_counter()
+            price_history.price_trend(session, by, rng.choice(keys), now - days * DAY, now, bucket)
+            samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def count_history():
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT count(*) FROM listing_price_history")).scalar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="1M", help="synthetic listing count")
+    parser.add_argument("--events-per-listing", type=int, default=4, help="synthetic repricings per listing")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per trend query")
+    parser.add_argument("--edits", type=int, default=20_000, help="listing updates timed with and without triggers")
+    args = parser.parse_args()
+
+    listings = parse_scales(args.scale)[0]
+    generate(engine, listings)
+    start = time.perf_counter()
+    price_history.ensure_price_history()
+    print(f"history seeded for {listings} listings in {time.perf_counter() - start:.1f}s")
+
+    with_triggers, without_triggers = time_edits(args.edits, True), time_edits(args.edits, False)
+    print(f"listing repricing: {with_triggers * 1e6:.1f} us with history, {without_triggers * 1e6:.1f} us without")
+
+    now = int(time.time())
+    start = time.perf_counter()
+    events = synthetic_history(listings, args.events_per_listing, now)
+    print(f"{events} synthetic events over a year inserted in {time.perf_counter() - start:.1f}s")
+
+    print(f"{'trend query':34} {'p50':>9} {'p99':>9}")
+    for label, by, keys, days, bucket in [
+        ("city, last quarter, weekly", "city", list(range(1, 201)), 91, "week"),
+        ("city, last year, weekly", "city", list(range(1, 201)), 365, "week"),
+        ("agency, last quarter, daily", "agency", list(range(1, 51)), 91, "day"),
+        ("property, last year, weekly", "property", list(range(1, listings // 2 + 1)), 365, "week"),
+    ]:
+        timing = time_trend(by, keys, days, bucket, args.repeat, now)
+        print(f"{label:34} {timing['p50_ms']:7.2f}ms {timing['p99_ms']:7.2f}ms")
+
+    before = count_history()
+    start = time.perf_counter()
+    downsampled, expired = price_history.compact_price_history(now=now)
+    elapsed = time.perf_counter() - start
+    print(f"compaction: {before} -> {count_history()} events ({downsampled} downsampled, {expired} expired) "
+          f"in {elapsed:.1f}s; a second run removes {sum(price_history.compact_price_history(now=now))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Compares the SQLite performance profiles from db.SQLITE_PROFILES: commit throughput for
+add_listing-style single-row writes and latency of the features_read.py queries.
+
+    python -m benchmarks.bench_profiles --scale 100k --writes 500
+
+Every profile runs in its own process, so its pragmas are applied exactly as at application start-up.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import time_call, summarize, parse_scales, disable_query_cache
+
+
+def run_worker(writes, repeat):
+    """
+    Runs inside the profile's process and prints its results as JSON.
+    """
+    from benchmarks.synthetic import city_name
+    from db import session_scope, Listing
+    from features_read import search_properties_by_city, view_prices_by_registry_number, advanced_search
+    from price_summary import refresh_property_summary
+
+    # One listing per transaction, the same statements add_listing issues
+    start = time.perf_counter()
+    for number in range(writes):
+        with session_scope() as session:
+            listing = Listing(property_id=number % 1000 + 1, agency_id=1, sale_price=100_000.0 + number)
+            session.add(listing)
+            refresh_property_summary(session, listing.property_id)
+    commits_per_second = writes / (time.perf_counter() - start)
+
+    city = city_name(1)
+    reads = {
+        "search_properties_by_city": time_call(search_properties_by_city, [city], repeat),
+        "view_prices_by_registry_number": time_call(view_prices_by_registry_number, ["REG-00000001"], repeat),
+        "advanced_search": time_call(advanced_search, [city, "100000", "500000", "", ""], repeat),
+    }
+    print(json.dumps({"commits_per_second": round(commits_per_second, 1),
+                      "reads": {name: summarize(samples) for name, samples in reads.items()}}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="100k", help="synthetic listing count")
+    parser.add_argument("--writes", type=int, default=500, help="single-row commits per profile")
+    parser.add_argument("--repeat", type=int, default=10, help="runs per read query")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # The reads repeat the same queries; time them under each profile's pragmas, not as cache hits.
+    # Also turns the cache off in the worker processes started below
+    disable_query_cache()
+    if args.worker:
+        run_worker(args.writes, args.repeat)
+        return
+
+    from benchmarks.synthetic import generate
+    from db import engine, SQLITE_PROFILES
+
+    generate(engine, parse_scales(args.scale)[0])
+    engine.dispose()
+
+    for profile in SQLITE_PROFILES:
+        environment = dict(os.environ, REAL_ESTATE_DB_PROFILE=profile)
+        output = subprocess.run([sys.executable, "-m", "benchmarks.bench_profiles", "--worker", profile,
+                                 "--writes", str(args.writes), "--repeat", str(args.repeat)],
+                                env=environment, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        reads = "  ".join(f"{name} p50 {stats['p50_ms']:.2f} ms" for name, stats in result["reads"].items())
+        print(f"{profile:8} {result['commits_per_second']:>9,.0f} commits/sec  {reads}")
+
+
+if __name__ == "__main__":
+    main()
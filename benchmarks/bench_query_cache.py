@@ -0,0 +1,72 @@
+"""
+Hot-lookup benchmark for the query cache: a skewed (Zipf-like) mix of city searches, registry
+lookups and advanced searches, one unit of work each, with the cache off and on. Optionally
+every Nth operation edits a listing, invalidating the entries of that property and its city.
+
+    python -m benchmarks.bench_query_cache --scale 100k --lookups 20000 --write-every 100
+"""
+import argparse
+import random
+import time
+
+import query_cache
+import services
+from benchmarks.common import summarize, parse_scales
+from benchmarks.synthetic import generate, city_name
+from db import engine, session_scope
+
+
+def skewed(rng, population, alpha=1.0):
+    """
+    Picks a rank in 1..population from a Pareto distribution: a few ranks take most of the picks.
+    """
+    return min(population, int(rng.paretovariate(alpha)))
+
+
+def run(lookups, listings, write_every, seed):
+    rng = random.Random(seed)
+    properties = listings // 2
+    latencies = []
+    for operation in range(1, lookups + 1):
+        start = time.perf_counter()
+        with session_scope() as session:
+            if write_every and operation % write_every == 0:
+                services.update_listing_prices(session, rng.randint(1, listings), rng.uniform(50_000, 500_000), None)
+                continue
+
+            kind = rng.random()
+            if kind < 0.4:
+                services.search_by_city(session, city_name(skewed(rng, 200)))
+            elif kind < 0.8:
+                services.prices_by_registry_number(session, f"REG-{skewed(rng, properties):08d}")
+            else:
+                services.advanced_search(session, city_name(skewed(rng, 200)), 100_000, 400_000)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="100k", help="synthetic listing count")
+    parser.add_argument("--lookups", type=int, default=20_000, help="operations per run")
+    parser.add_argument("--write-every", type=int, default=0, help="edit a listing every N operations (0: never)")
+    args = parser.parse_args()
+
+    listings = parse_scales(args.scale)[0]
+    generate(engine, listings)
+
+    for label, cache in [("off", query_cache.NullCache()), ("lru", query_cache.QueryCache())]:
+        query_cache.set_query_cache(cache)
+        start = time.perf_counter()
+        latencies = run(args.lookups, listings, args.write_every, seed=1)
+        elapsed = time.perf_counter() - start
+
+        stats = summarize(latencies)
+        print(f"cache {label:>3}: {len(latencies) / elapsed:8.0f} lookups/s  mean {stats['mean_ms']:7.3f} ms  "
+              f"p50 {stats['p50_ms']:7.3f} ms  p99 {stats['p99_ms']:7.3f} ms")
+        if label != "off":
+            print(f"           {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
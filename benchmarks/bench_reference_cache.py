@@ -0,0 +1,83 @@
+"""
+Cost of the city and agency lookups the write paths repeat per row, straight from the database
+and from the reference cache, then a race check: many threads get-or-create the same new cities
+at once, and every thread must end up with the single committed ID of each city.
+
+    python -m benchmarks.bench_reference_cache --lookups 100000 --threads 16
+"""
+import argparse
+import random
+import threading
+import time
+
+from sqlalchemy.sql import func
+
+from benchmarks.synthetic import generate, city_name
+from db import engine, session_scope, City, Agency
+from reference_cache import reference_cache
+
+
+def time_lookups(label, lookups, lookup):
+    rng = random.Random(1)
+    with session_scope() as session:
+        start = time.perf_counter()
+        for _ in range(lookups):
+            lookup(session, rng.randint(1, 200), rng.randint(1, 50))
+        elapsed = time.perf_counter() - start
+    print(f"{label:28} {elapsed / lookups * 1_000_000:8.2f} us/lookup")
+
+
+def race(threads, names):
+    """
+    Every thread creates the same cities in its own unit of work. Returns {name: set of IDs seen}.
+    """
+    seen = {name: set() for name in names}
+    barrier = threading.Barrier(threads)
+
+    def writer():
+        barrier.wait()
+        for name in names:
+            with session_scope() as session:
+                city_id, _ = reference_cache.get_or_create_city_id(session, name)
+            seen[name].add(city_id)
+
+    workers = [threading.Thread(target=writer) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return seen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=100_000, help="lookups per variant")
+    parser.add_argument("--threads", type=int, default=16, help="concurrent writers in the race check")
+    parser.add_argument("--cities", type=int, default=50, help="new cities created in the race check")
+    args = parser.parse_args()
+
+    generate(engine, 10_000)
+
+    time_lookups("city by name (database)", args.lookups, lambda session, city, agency:
+                 session.query(City.city_id).filter(City.name == city_name(city)).scalar())
+    time_lookups("city by name (cache)", args.lookups, lambda session, city, agency:
+                 reference_cache.city_id(session, city_name(city)))
+    time_lookups("agency by ID (database)", args.lookups, lambda session, city, agency:
+                 session.query(Agency.agency_id, Agency.name, Agency.company_code)
+                 .filter(Agency.agency_id == agency).first())
+    time_lookups("agency by ID (cache)", args.lookups, lambda session, city, agency:
+                 reference_cache.agency(session, agency))
+    print(f"cache: {reference_cache.stats()}")
+
+    names = [f"Race City {i}" for i in range(args.cities)]
+    seen = race(args.threads, names)
+    with session_scope() as session:
+        rows = session.query(City.name, func.count()).filter(City.name.in_(names)).group_by(City.name).all()
+    duplicates = [name for name, count in rows if count != 1]
+    conflicting = [name for name, ids in seen.items() if len(ids) != 1]
+    print(f"race: {args.threads} threads x {args.cities} cities -> {len(rows)} rows, "
+          f"{len(duplicates)} duplicated, {len(conflicting)} with conflicting IDs")
+
+
+if __name__ == "__main__":
+    main()
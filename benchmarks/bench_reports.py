@@ -0,0 +1,134 @@
+"""
+Per-row cost of the show-all reports: the entity queries they used (full Owner, Property, Address,
+City and Agency objects per row) against the column-projected queries in services.py that select
+only the displayed columns. Every report is streamed in full with yield_per() and each row formatted
+as the report would print it, then a slice is loaded with .all() to show the memory retained per row.
+
+    python -m benchmarks.bench_reports --scale 1M
+"""
+import argparse
+import time
+import tracemalloc
+
+import services
+from benchmarks.common import parse_scales
+from benchmarks.synthetic import generate
+from db import engine, Session, Owner, Property, Address, Agency, City, Listing, PropertyPriceSummary
+
+BATCH_SIZE = 1000
+
+
+def entity_owner_properties(session):
+    return (session.query(Owner, Property, Address, City)
+            .join(Property, Owner.owner_id == Property.owner_id)
+            .join(Address, Property.address_id == Address.address_id)
+            .join(City, Address.city_id == City.city_id)
+            .order_by(Property.owner_id, Property.property_id))
+
+
+def entity_agency_listings(session):
+    return (session.query(Agency, Property, Address, City, Listing.sale_price, Listing.rental_price,
+                          Listing.listing_id)
+            .join(Listing, Agency.agency_id == Listing.agency_id)
+            .join(Property, Listing.property_id == Property.property_id)
+            .join(Address, Property.address_id == Address.address_id)
+            .join(City, Address.city_id == City.city_id)
+            .order_by(Listing.agency_id, Listing.listing_id))
+
+
+def entity_properties(session):
+    return (session.query(Property, Address, City,
+                          PropertyPriceSummary.min_sale_price.label("sale_price"),
+                          PropertyPriceSummary.min_rental_price.label("rental_price"))
+            .join(Address, Property.address_id == Address.address_id)
+            .join(City, Address.city_id == City.city_id)
+            .outerjoin(PropertyPriceSummary, Property.property_id == PropertyPriceSummary.property_id)
+            .order_by(Property.property_id))
+
+
+# (report, old query, line of the old report, new query, line of the new report)
+REPORTS = [
+    ("owners with properties", entity_owner_properties,
+     lambda row: f"{row.Owner.first_name} {row.Owner.last_name} {row.Property.registry_number} "
+                 f"{row.Address.street_address} {row.City.name} {row.Property.area_sqm}",
+     lambda session: services.owner_properties_query(session).order_by(Property.owner_id, Property.property_id),
+     lambda row: f"{row.first_name} {row.last_name} {row.registry_number} {row.street_address} {row.city} "
+                 f"{row.area_sqm}"),
+    ("properties by agency", entity_agency_listings,
+     lambda row: f"{row.Agency.name} {row.Property.registry_number} {row.Address.street_address} "
+                 f"{row.City.name} {row.Property.area_sqm} {row.sale_price} {row.rental_price}",
+     lambda session: services.agency_listings_query(session).order_by(Listing.agency_id, Listing.listing_id),
+     lambda row: f"{row.agency_name} {row.registry_number} {row.street_address} {row.city} {row.area_sqm} "
+                 f"{row.sale_price} {row.rental_price}"),
+    ("all properties", entity_properties,
+     lambda row: f"{row.Property.registry_number} {row.Address.street_address} {row.City.name} "
+                 f"{row.Address.postal_code} {row.Property.area_sqm} {row.sale_price} {row.rental_price}",
+     lambda session: services.properties_query(session).order_by(Property.property_id),
+     lambda row: f"{row.registry_number} {row.street_address} {row.city} {row.postal_code} {row.area_sqm} "
+                 f"{row.sale_price} {row.rental_price}"),
+]
+
+
+def stream(query, format_row, trace=False):
+    """
+    Streams the whole query, formatting every row. Returns (rows, seconds, peak bytes or None).
+    """
+    session = Session()
+    try:
+        if trace:
+            tracemalloc.start()
+        start = time.perf_counter()
+        rows = 0
+        for row in query(session).yield_per(BATCH_SIZE):
+            format_row(row)
+            rows += 1
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace else None
+        return rows, elapsed, peak
+    finally:
+        if trace:
+            tracemalloc.stop()
+        session.close()
+
+
+def retained_per_row(query, rows):
+    """
+    Bytes the first `rows` rows of the query hold once loaded with .all(), per row.
+    """
+    session = Session()
+    try:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        result = query(session).limit(rows).all()
+        held = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        return held / len(result)
+    finally:
+        session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="1M", help="synthetic listing count")
+    parser.add_argument("--retained-rows", type=int, default=10_000, help="rows loaded for the retained memory")
+    parser.add_argument("--trace", action="store_true",
+                        help="also stream every report under tracemalloc for its peak memory (about twice as slow)")
+    args = parser.parse_args()
+
+    generate(engine, parse_scales(args.scale)[0])
+
+    print(f"{'report':24} {'query':9} {'rows':>9} {'total':>9} {'per row':>10} {'retained/row':>13}"
+          + (f" {'peak':>9}" if args.trace else ""))
+    for label, old_query, old_format, new_query, new_format in REPORTS:
+        for kind, query, format_row in (("entities", old_query, old_format), ("columns", new_query, new_format)):
+            rows, elapsed, _ = stream(query, format_row)
+            retained = retained_per_row(query, args.retained_rows)
+            line = (f"{label:24} {kind:9} {rows:9} {elapsed:8.2f}s {elapsed / rows * 1_000_000:8.2f}us "
+                    f"{retained:11.0f} B")
+            if args.trace:
+                line += f" {stream(query, format_row, trace=True)[2] / 1_000_000:7.2f}MB"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
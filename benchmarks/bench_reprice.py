@@ -0,0 +1,86 @@
+"""
+Bulk repricing throughput: filter adjustments (one set-based UPDATE) and repricing files (chunked
+executemany) against editing the same listings one at a time through update_listing_prices().
+The price history triggers are installed, as they are in the application.
+
+    python -m benchmarks.bench_reprice --scale 1M --file-rows 100k
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+import bulk_reprice
+import price_history
+import services
+from benchmarks.common import parse_scales
+from benchmarks.synthetic import generate
+from db import engine, session_scope, Listing
+
+# (label, adjust_prices() arguments)
+ADJUSTMENTS = [
+    ("+3% rentals in one city", {"price": "rental", "percent": 3, "city_id": 1}),
+    ("-1% sale prices of one agency", {"price": "sale", "percent": -1, "agency_id": 1}),
+    ("+150 sale prices 100k-200k", {"price": "sale", "amount": 150, "min_price": 100_000, "max_price": 200_000}),
+    ("+2% all rentals", {"price": "rental", "percent": 2}),
+]
+
+
+def one_at_a_time(count, top):
+    """
+    Listings repriced per second through update_listing_prices(), one unit of work per listing.
+    """
+    rng = random.Random(9)
+    start = time.perf_counter()
+    for _ in range(count):
+        with session_scope() as session:
+            listing = session.get(Listing, rng.randint(1, top))
+            services.update_listing_prices(session, listing.listing_id, rng.randint(300, 9000) * 100,
+                                           listing.rental_price)
+    return count / (time.perf_counter() - start)
+
+
+def write_file(path, rows, top):
+    rng = random.Random(13)
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(bulk_reprice.REPRICE_COLUMNS)
+        for _ in range(rows):
+            writer.writerow([rng.randint(1, top), rng.randint(300, 9000) * 100, ""])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="1M", help="synthetic listing count")
+    parser.add_argument("--file-rows", default="100k", help="rows in the repricing file")
+    parser.add_argument("--single", type=int, default=2000, help="listings edited one at a time")
+    args = parser.parse_args()
+
+    listings = parse_scales(args.scale)[0]
+    generate(engine, listings)
+    price_history.ensure_price_history()
+
+    print(f"one at a time: {one_at_a_time(args.single, listings):,.0f} listings/sec")
+
+    print(f"{'adjustment':32} {'dry run':>9} {'listings':>9} {'apply':>9} {'listings/sec':>13}")
+    for label, arguments in ADJUSTMENTS:
+        dry_run = bulk_reprice.adjust_prices(dry_run=True, **arguments).elapsed
+        stats = bulk_reprice.adjust_prices(**arguments)
+        print(f"{label:32} {dry_run * 1000:7.1f}ms {stats.updated:9} {stats.elapsed:8.2f}s "
+              f"{stats.rows_per_second:13,.0f}")
+
+    file_rows = parse_scales(args.file_rows)[0]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "reprice.csv")
+        write_file(path, file_rows, listings)
+        for chunk_size in (1_000, 10_000):
+            dry_run = bulk_reprice.reprice_from_file(path, chunk_size=chunk_size, dry_run=True).elapsed
+            stats = bulk_reprice.reprice_from_file(path, chunk_size=chunk_size, progress=False)
+            print(f"file of {file_rows} rows, chunks of {chunk_size}: dry run {dry_run:.2f}s, "
+                  f"applied in {stats.elapsed:.2f}s ({stats.rows_per_second:,.0f} rows/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Full-text search latency against the equivalent LIKE '%word%' scans over the same documents
+(addresses with their city, owners, agencies, cities). The default scale has a million addresses.
+
+    python -m benchmarks.bench_search --scale 2M --repeat 20
+"""
+import argparse
+import time
+
+from sqlalchemy import text
+
+import search_index
+from benchmarks.common import summarize, parse_scales
+from benchmarks.synthetic import generate
+from db import engine, session_scope
+from schema_objects import SEARCH_DOCUMENTS
+
+
+def sample_queries(properties, owners):
+    middle_property, middle_owner = properties // 2, owners // 2
+    return [
+        ("street + number", f"Street {middle_property}"),
+        ("owner full name", f"First{middle_owner} Last{middle_owner}"),
+        ("owner name prefix", f"Last{middle_owner // 10}"),
+        ("city", "City 0042"),
+        ("agency", "Agency 7"),
+        ("phone number", f"+370{middle_owner:08d}"),
+        ("typo in owner name", f"Frist{middle_owner}"),
+    ]
+
+
+def like_search(session, query, limit=20):
+    """
+    The same documents as the search index, matched with one LIKE '%word%' per word.
+    """
+    words = search_index.tokenize(query)
+    parameters = {f"word{i}": f"%{word}%" for i, word in enumerate(words)}
+    parts = []
+    for table, kind, id_column, name, detail in SEARCH_DOCUMENTS:
+        conditions = " AND ".join(f"({name} || ' ' || {detail}) LIKE :word{i}" for i in range(len(words)))
+        parts.append(f"SELECT '{kind}' AS kind, new.{id_column} AS entity_id, {name} AS name "
+                     f"FROM {table} AS new WHERE {conditions}")
+    return session.execute(text(" UNION ALL ".join(parts) + f" LIMIT {limit}"), parameters).all()
+
+
+def time_queries(search, query, repeat):
+    samples = []
+    for _ in range(repeat):
+        with session_scope() as session:
+            start = time.perf_counter()
+            results = search(session, query)
+            samples.append(time.perf_counter() - start)
+    return samples, len(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="2M", help="synthetic listing count (two listings per address)")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per full-text query")
+    parser.add_argument("--like-repeat", type=int, default=3, help="runs per LIKE query")
+    args = parser.parse_args()
+
+    listings = parse_scales(args.scale)[0]
+    properties = max(1, listings // 2)
+    generate(engine, listings)
+    start = time.perf_counter()
+    documents = search_index.rebuild_search_index()
+    print(f"indexed {documents} documents ({properties} addresses) in {time.perf_counter() - start:.1f}s")
+
+    # Loads the typo-tolerance vocabulary so the timings below are warm
+    with session_scope() as session:
+        search_index.search(session, "Frist1")
+
+    print(f"{'query':22} {'fts p50':>10} {'fts p99':>10} {'like p50':>10} {'hits':>6}")
+    for label, query in sample_queries(properties, max(1, properties // 4)):
+        fts, hits = time_queries(search_index.search, query, args.repeat)
+        like, _ = time_queries(like_search, query, args.like_repeat)
+        fts, like = summarize(fts), summarize(like)
+        print(f"{label:22} {fts['p50_ms']:8.2f}ms {fts['p99_ms']:8.2f}ms {like['p50_ms']:8.1f}ms {hits:6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Measures memory retained across a long interactive run: after every operation the Python heap
+still in use is sampled, so objects kept alive by an ever-growing identity map show up as growth.
+
+    python -m benchmarks.bench_session_memory --scale 100k --operations 40
+    python -m benchmarks.bench_session_memory --shared-session   # old behaviour: one global session
+"""
+import argparse
+import gc
+import tracemalloc
+from contextlib import contextmanager
+
+import db
+from benchmarks.common import scripted_input, parse_scales, disable_query_cache
+from benchmarks.synthetic import generate, city_name
+from features_edit import edit_address, edit_owner
+from features_read import search_properties_by_city, show_all_properties
+
+
+@contextmanager
+def shared_session_scope(shared):
+    """
+    Stand-in for db.session_scope() that reuses one session and never closes it,
+    the way the application behaved with a module-global session.
+    """
+    yield shared
+    shared.commit()
+
+
+def operations(count):
+    """
+    Cycles through the screens of a typical session, visiting a different city each time.
+    """
+    screens = [
+        lambda number: (show_all_properties, [], {"page_size": 0}),
+        lambda number: (search_properties_by_city, [city_name(number % 200 + 1)], {}),
+        lambda number: (edit_address, ["0"], {}),
+        lambda number: (edit_owner, ["0"], {}),
+    ]
+    for number in range(count):
+        yield screens[number % len(screens)](number)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="100k", help="synthetic listing count")
+    parser.add_argument("--operations", type=int, default=40)
+    parser.add_argument("--shared-session", action="store_true", help="reuse one session for every operation")
+    args = parser.parse_args()
+
+    # Cached results would count as retained memory, up to the cache's size limit
+    disable_query_cache()
+    generate(db.engine, parse_scales(args.scale)[0])
+
+    if args.shared_session:
+        shared = db.Session()
+        db.session_scope = lambda: shared_session_scope(shared)
+
+    tracemalloc.start()
+    samples = []
+    for number, (screen, answers, kwargs) in enumerate(operations(args.operations), start=1):
+        with scripted_input(answers):
+            screen(**kwargs)
+        gc.collect()
+        samples.append(tracemalloc.get_traced_memory()[0] / 1_000_000)
+        if number % 4 == 0:
+            print(f"after {number:4} operations: {samples[-1]:8.1f} MB retained")
+
+    print(f"\nretained after first cycle {samples[3]:.1f} MB, after {len(samples)} operations {samples[-1]:.1f} MB, "
+          f"peak {tracemalloc.get_traced_memory()[1] / 1_000_000:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Cost of the SQL instrumentation in sql_stats.py: the same statements through an engine without it
+and through an instrumented one, from primary-key lookups (where the per-statement bookkeeping
+matters most) to full scans (where the timed fetches do). Both engines run every case once untimed,
+then take turns, swapping which goes first on every repeat, so cache warmth and drift hit both alike.
+
+    python -m benchmarks.bench_sql_stats --scale 100k
+"""
+import argparse
+import gc
+import random
+import time
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import summarize, parse_scales
+from benchmarks.synthetic import generate
+from db import DATABASE_URL, create_database_engine, engine, Listing, Property
+from sql_stats import sql_stats, operation_scope
+
+
+def lookups(session, listings, count=500):
+    rng = random.Random(3)
+    for _ in range(count):
+        session.execute(select(Listing.sale_price).where(Listing.listing_id == rng.randint(1, listings))).scalar()
+    return count
+
+
+def orm_gets(session, listings, count=500):
+    rng = random.Random(5)
+    for _ in range(count):
+        session.get(Listing, rng.randint(1, listings))
+    return count
+
+
+def pages(session, listings, count=50):
+    for page in range(count):
+        session.query(Property).filter(Property.property_id > page * 50).order_by(Property.property_id).limit(50).all()
+    return count
+
+
+def updates(session, listings, count=500):
+    rng = random.Random(7)
+    for _ in range(count):
+        session.execute(update(Listing).where(Listing.listing_id == rng.randint(1, listings))
+                        .values(rental_price=Listing.rental_price))
+    session.rollback()
+    return count
+
+
+def full_scan(session, listings):
+    session.execute(select(Listing.listing_id, Listing.sale_price, Listing.rental_price)).all()
+    return 1
+
+
+CASES = [("primary key lookup", lookups), ("session.get", orm_gets), ("page of 50", pages),
+         ("single-row update", updates), ("full listings scan", full_scan)]
+
+
+def run_case(session_factory, case, listings):
+    """
+    Seconds per statement of one run of the case on a new session.
+    """
+    gc.collect()
+    session = session_factory()
+    try:
+        # As under @unit_of_work, which names the operation without walking the stack
+        with operation_scope(case.__name__):
+            start = time.perf_counter()
+            statements = case(session, listings)
+        return (time.perf_counter() - start) / statements
+    finally:
+        session.close()
+
+
+def measure(session_factories, case, listings, repeat):
+    """
+    summarize() of the case on every session factory, after one warm-up run each; the factories
+    alternate, and which one runs first swaps on every repeat.
+    """
+    samples = [[] for _ in session_factories]
+    for run in range(repeat + 1):
+        order = list(enumerate(session_factories))
+        for index, session_factory in (order if run % 2 else order[::-1]):
+            seconds = run_case(session_factory, case, listings)
+            if run:
+                samples[index].append(seconds)
+    return [summarize(factory_samples) for factory_samples in samples]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="100k", help="synthetic listing count")
+    parser.add_argument("--repeat", type=int, default=9, help="timed runs per case and engine")
+    args = parser.parse_args()
+
+    listings = parse_scales(args.scale)[0]
+    generate(engine, listings)
+    engine.dispose()
+    plain = sessionmaker(bind=create_database_engine(DATABASE_URL, sql_stats=False))
+    instrumented = sessionmaker(bind=create_database_engine(DATABASE_URL, sql_stats=True))
+
+    print(f"{'statement':22} {'plain p50':>12} {'instrumented':>13} {'overhead':>9}")
+    for label, case in CASES:
+        before, after = measure([plain, instrumented], case, listings, args.repeat)
+        overhead = after["p50_ms"] - before["p50_ms"]
+        print(f"{label:22} {before['p50_ms'] * 1000:10.1f}us {after['p50_ms'] * 1000:11.1f}us "
+              f"{overhead / before['p50_ms'] * 100:8.1f}%")
+    print(f"\n{sql_stats.totals().statements} statements recorded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Start-up cost of the application: `python -X importtime` import time of main.py, and the wall time
+of `python main.py` up to its first menu and out again (answering "6", Exit), with the schema
+current and with a full initialization forced by removing the recorded schema state. Also counts
+the SQL statements prepare_database() issues on both paths.
+
+    python -m benchmarks.bench_startup --repeat 10
+
+benchmarks/suite.py records the same measurements for every scale it runs.
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+
+from sqlalchemy import text
+
+import main as application
+from benchmarks.common import StatementCounter, summarize
+from db import DATABASE_URL, SCHEMA_STATE_TABLE, engine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The application run as a child process: this database, and no slow-query log in the working tree
+CHILD_ENVIRONMENT = {**os.environ, "REAL_ESTATE_DB_URL": DATABASE_URL, "REAL_ESTATE_SLOW_QUERY_LOG": ""}
+
+
+def forget_schema_state():
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {SCHEMA_STATE_TABLE}"))
+
+
+def import_times():
+    """
+    {module: cumulative microseconds} from `python -X importtime -c "import main"`.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT,
+                            env=CHILD_ENVIRONMENT, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, module = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                times[module.strip()] = int(cumulative)
+    return times
+
+
+def run_application():
+    """
+    Seconds `python main.py` takes to reach its menu and exit.
+    """
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "main.py"], cwd=ROOT, env=CHILD_ENVIRONMENT, input="6\n",
+                   stdout=subprocess.DEVNULL, text=True, check=True)
+    return time.perf_counter() - start
+
+
+def prepare_statements():
+    """
+    SQL statements prepare_database() issues in this process, its messages discarded.
+    """
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull), StatementCounter(engine) as counter:
+        application.prepare_database()
+    return counter.count
+
+
+def measure_startup(repeat, full_initialization=False):
+    """
+    Suite-style result of `repeat` application starts: p50/p99 wall time, statements of
+    prepare_database() and the peak resident memory of the largest child process so far.
+    """
+    samples = []
+    for _ in range(repeat):
+        if full_initialization:
+            forget_schema_state()
+        samples.append(run_application())
+    if full_initialization:
+        forget_schema_state()
+    statements = prepare_statements()
+    return {**summarize(samples), "statements": statements,
+            "peak_kb": float(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)}
+
+
+def measure_imports(repeat):
+    """
+    Suite-style result of the cumulative import time of main.py over `repeat` runs.
+    """
+    samples = [import_times()["main"] / 1_000_000 for _ in range(repeat)]
+    return {**summarize(samples), "statements": 0, "peak_kb": 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10, help="starts per measurement")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports listed")
+    args = parser.parse_args()
+
+    application.prepare_database()
+    times = import_times()
+    print(f"import main: {times['main'] / 1000:.1f} ms; slowest top-level imports:")
+    top_level = {module: micros for module, micros in times.items() if "." not in module and module != "main"}
+    for module, micros in sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {module:32} {micros / 1000:8.1f} ms")
+
+    print(f"\n{'start-up':26} {'p50':>10} {'p99':>10} {'stmts':>6}")
+    for label, full in (("schema current", False), ("full initialization", True)):
+        result = measure_startup(args.repeat, full)
+        print(f"{label:26} {result['p50_ms']:8.1f}ms {result['p99_ms']:8.1f}ms {result['statements']:6}")
+
+
+if __name__ == "__main__":
+    main()
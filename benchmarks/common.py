@@ -0,0 +1,107 @@
+"""
+Helpers shared by the benchmark scripts: driving the interactive feature functions
+with scripted answers and summarizing timings.
+"""
+import builtins
+import os
+import statistics
+import time
+from contextlib import contextmanager, redirect_stdout
+
+from sqlalchemy import event
+
+
+@contextmanager
+def scripted_input(answers):
+    """
+    Feeds the given answers to input() in order and discards everything printed.
+    """
+    answers = iter(answers)
+    original_input = builtins.input
+    builtins.input = lambda prompt="": next(answers)
+    try:
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            yield
+    finally:
+        builtins.input = original_input
+
+
+class StatementCounter:
+    """
+    Counts the SQL statements an engine executes while active.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def time_call(func, answers=(), repeat=5):
+    """
+    Runs an interactive feature function `repeat` times with the same scripted answers.
+    Returns the list of wall-clock durations in seconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        with scripted_input(answers):
+            start = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def percentile(samples, pct):
+    """
+    Returns the pct-th percentile of the samples using nearest-rank.
+    """
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def summarize(samples):
+    """
+    Reduces a list of durations (seconds) to milliseconds statistics.
+    """
+    return {
+        "runs": len(samples),
+        "mean_ms": round(statistics.mean(samples) * 1000, 3),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+    }
+
+
+def parse_scales(value):
+    """
+    Parses a comma separated list of scales such as "10k,100k,1M".
+    """
+    multipliers = {"k": 1_000, "m": 1_000_000}
+    scales = []
+    for item in value.split(","):
+        item = item.strip().lower()
+        if item and item[-1] in multipliers:
+            scales.append(int(float(item[:-1]) * multipliers[item[-1]]))
+        elif item:
+            scales.append(int(item))
+    return scales
+
+
+def disable_query_cache():
+    """
+    Turns the process-wide query cache off, here and in any child process started later, so that
+    repeated queries are timed as SQL rather than as cache hits.
+    """
+    from query_cache import NullCache, set_query_cache
+
+    os.environ["REAL_ESTATE_QUERY_CACHE"] = "off"
+    set_query_cache(NullCache())
@@ -0,0 +1,75 @@
+"""
+Reports the SQL statements every entity-listing screen in features_edit.py and features_remove.py
+issues at several data sizes. tests/test_query_counts.py runs the same screens and fails when a
+count grows with the number of rows or exceeds MAX_STATEMENTS.
+
+    python -m benchmarks.query_counts --scales 1k,20k
+"""
+import argparse
+
+from benchmarks.common import StatementCounter, scripted_input, parse_scales
+from benchmarks.synthetic import generate
+from db import engine
+from features_edit import edit_owner, edit_property, edit_address, edit_listing, edit_agency, edit_city
+from features_remove import remove_owner, remove_property, remove_listing, remove_agency_listings
+
+# Upper bound on statements for any single screen
+MAX_STATEMENTS = 10
+
+# (label, screen, scripted answers); "0" picks no entity, so only the listing screen runs.
+# The edit screens also run end to end with blank answers, which keep the current values, and
+# the owner and agency removals run last, deleting every row that depends on owner 1 and agency 1.
+SCREENS = [
+    ("edit_owner", edit_owner, ["0"]),
+    ("edit_owner (save)", edit_owner, ["1", "", "", ""]),
+    ("edit_property", edit_property, ["0"]),
+    ("edit_property (save)", edit_property, ["1", "", ""]),
+    ("edit_address", edit_address, ["0"]),
+    ("edit_address (save)", edit_address, ["1", "", "", "", ""]),
+    ("edit_listing", edit_listing, ["0"]),
+    ("edit_listing (save)", edit_listing, ["1", "", ""]),
+    ("edit_agency", edit_agency, ["0"]),
+    ("edit_agency (save)", edit_agency, ["1", "", ""]),
+    ("edit_city", edit_city, ["0"]),
+    ("edit_city (save)", edit_city, ["1", ""]),
+    ("remove_owner", remove_owner, ["0"]),
+    ("remove_property", remove_property, ["0"]),
+    ("remove_listing", remove_listing, ["0"]),
+    ("remove_agency_listings", remove_agency_listings, ["0"]),
+    ("remove_agency_listings (save)", remove_agency_listings, ["1", "yes"]),
+    ("remove_owner (save)", remove_owner, ["1"]),
+]
+
+
+def count_screens(bind=engine):
+    """
+    Runs every screen and returns {label: statement count}; bind is the engine the screens' sessions use.
+    """
+    counts = {}
+    for label, screen, answers in SCREENS:
+        with StatementCounter(bind) as counter, scripted_input(answers):
+            screen()
+        counts[label] = counter.count
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="1k,20k", help="listing counts to compare")
+    args = parser.parse_args()
+
+    results = {}
+    for scale in parse_scales(args.scales):
+        generate(engine, scale)
+        results[scale] = count_screens()
+
+    scales = list(results)
+    print(f"{'screen':30}" + "".join(f"{scale:>10}" for scale in scales))
+    for label, _, _ in SCREENS:
+        counts = [results[scale][label] for scale in scales]
+        unbounded = len(set(counts)) > 1 or max(counts) > MAX_STATEMENTS
+        print(f"{label:30}" + "".join(f"{count:>10}" for count in counts) + ("  unbounded" if unbounded else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Benchmark suite for every menu operation: each screen of features_read.py, features_add.py,
+features_edit.py and features_remove.py (plus the market statistics and price history screens)
+runs non-interactively with scripted answers on synthetic data at several scales. For every
+operation it reports p50/p99 latency, the SQL statements one run issues and the peak Python
+memory one run allocates; results can be saved as JSON and compared with an earlier run.
+
+    python -m benchmarks.suite --scales 10k,100k,1M --skew 1.0 --json results.json
+    python -m benchmarks.suite --scales 10k,100k --compare results.json
+
+Reads run before writes, and removals last, so every operation sees the data it expects. The query
+cache is cleared before every run, so the figures are those of a cold cache. Each scale also records
+the start-up of main.py (see benchmarks/bench_startup.py), so a slower start counts as a regression
+as well; its peak is the resident memory of the application process.
+"""
+import argparse
+import json
+import platform
+import sqlite3
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+
+import features_add
+import features_edit
+import features_read
+import features_remove
+from analytics import market_statistics_menu
+from benchmarks.bench_startup import measure_imports, measure_startup
+from benchmarks.common import StatementCounter, scripted_input, summarize, parse_scales
+from benchmarks.synthetic import generate, city_name, city_centre
+from db import engine
+from geo_search import ensure_geo_index
+from price_history import price_trend_menu, ensure_price_history
+from query_cache import clear_query_cache
+from search_index import ensure_search_index
+
+# answers(run, data) returns the scripted input() answers for the run-th run of an operation
+Operation = namedtuple("Operation", ["name", "function", "answers", "kwargs"])
+
+# Sizes of the generated data set that the scripted answers refer to
+DataSet = namedtuple("DataSet", ["listings", "properties", "owners", "cities", "agencies", "seed"])
+
+
+def _location(data):
+    latitude, longitude = city_centre(1, data.seed)
+    return f"{latitude}, {longitude}"
+
+
+OPERATIONS = [
+    Operation("search_properties_by_city (largest city)", features_read.search_properties_by_city,
+              lambda run, data: [city_name(1)], {}),
+    Operation("search_properties_by_city (median city)", features_read.search_properties_by_city,
+              lambda run, data: [city_name(data.cities // 2)], {}),
+    Operation("view_prices_by_registry_number", features_read.view_prices_by_registry_number,
+              lambda run, data: [f"REG-{run * 7919 % data.properties + 1:08d}"], {}),
+    Operation("advanced_search", features_read.advanced_search,
+              lambda run, data: [city_name(1), "100000", "500000", "", ""], {}),
+    Operation("full_text_search", features_read.full_text_search,
+              lambda run, data: [f"first{run + 1} last{run + 1}", ""], {}),
+    Operation("nearby_search", features_read.nearby_search,
+              lambda run, data: [_location(data), "5", "", "", "", ""], {}),
+    Operation("market_statistics_menu", market_statistics_menu,
+              lambda run, data: ["city", "sqm"], {}),
+    Operation("price_trend_menu", price_trend_menu,
+              lambda run, data: ["city", city_name(1), "90", "week"], {}),
+    Operation("show_all_owners_with_properties (first page)", features_read.show_all_owners_with_properties,
+              lambda run, data: ["q"], {"page_size": 50}),
+    Operation("show_all_properties_by_agency (first page)", features_read.show_all_properties_by_agency,
+              lambda run, data: ["q"], {"page_size": 50}),
+    Operation("show_all_properties (first page)", features_read.show_all_properties,
+              lambda run, data: ["q"], {"page_size": 50}),
+    Operation("set_report_page_size", features_read.set_report_page_size,
+              lambda run, data: [str(features_read.REPORT_PAGE_SIZE)], {}),
+    Operation("add_owner", features_add.add_owner,
+              lambda run, data: ["Bench", f"Owner{run}", f"+371{run:08d}", "no"], {}),
+    Operation("add_property", features_add.add_property,
+              lambda run, data: ["1", f"{run} Bench Street", "LT-00000", city_name(1), "80", f"BENCH-{run:08d}", ""],
+              {}),
+    Operation("add_agency", features_add.add_agency,
+              lambda run, data: ["Bench Agency", f"BENCH{run:05d}"], {}),
+    Operation("add_listing", features_add.add_listing,
+              lambda run, data: [str(run + 1), "1", "250000", ""], {}),
+    Operation("edit_owner", features_edit.edit_owner, lambda run, data: [str(run + 1), "", "", ""], {}),
+    Operation("edit_property", features_edit.edit_property, lambda run, data: [str(run + 1), "", ""], {}),
+    Operation("edit_address", features_edit.edit_address, lambda run, data: [str(run + 1), "", "", "", ""], {}),
+    Operation("edit_listing", features_edit.edit_listing, lambda run, data: [str(run + 1), "", "1000"], {}),
+    Operation("edit_agency", features_edit.edit_agency, lambda run, data: [str(run + 1), "", ""], {}),
+    Operation("edit_city", features_edit.edit_city, lambda run, data: [str(run + 1), ""], {}),
+    Operation("remove_listing", features_remove.remove_listing,
+              lambda run, data: [str(data.listings - run)], {}),
+    Operation("remove_property", features_remove.remove_property,
+              lambda run, data: [str(data.properties - run)], {}),
+    Operation("remove_owner", features_remove.remove_owner,
+              lambda run, data: [str(data.owners - run)], {}),
+    Operation("remove_agency_listings", features_remove.remove_agency_listings,
+              lambda run, data: [str(max(1, data.agencies - run)), "yes"], {}),
+]
+
+
+def run_once(operation, run, data, trace_memory=False):
+    """
+    Runs an operation once. Returns (seconds, SQL statements, peak bytes allocated or None).
+    """
+    clear_query_cache()
+    answers = operation.answers(run, data)
+    with StatementCounter(engine) as counter, scripted_input(answers):
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            operation.function(**operation.kwargs)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+    return elapsed, counter.count, peak
+
+
+def measure(operation, data, repeat):
+    """
+    `repeat` timed runs followed by one run under tracemalloc, which slows the code it traces.
+    """
+    samples, statements = [], []
+    for run in range(repeat):
+        elapsed, count, _ = run_once(operation, run, data)
+        samples.append(elapsed)
+        statements.append(count)
+    _, count, peak = run_once(operation, repeat, data, trace_memory=True)
+    statements.append(count)
+    return {**summarize(samples), "statements": max(statements), "peak_kb": round(peak / 1024, 1)}
+
+
+def run_suite(scale, repeat, skew, seed, cities, agencies):
+    """
+    Generates a data set of `scale` listings and measures every operation on it.
+    """
+    started = time.perf_counter()
+    generate(engine, scale, seed, cities, agencies, skew=skew)
+    ensure_search_index()
+    ensure_geo_index()
+    ensure_price_history()
+    properties = max(1, scale // 2)
+    data = DataSet(scale, properties, max(1, properties // 4), cities, agencies, seed)
+    print(f"\n{scale} listings, skew {skew} (generated in {time.perf_counter() - started:.1f}s)")
+
+    print(f"  {'operation':46} {'p50':>10} {'p99':>10} {'stmts':>6} {'peak':>10}")
+    results = {}
+    for operation in OPERATIONS:
+        result = results[operation.name] = measure(operation, data, repeat)
+        print(f"  {operation.name:46} {result['p50_ms']:8.2f}ms {result['p99_ms']:8.2f}ms "
+              f"{result['statements']:6} {result['peak_kb']:8.1f}KB")
+
+    # A full initialization rebuilds the derived indexes, so it is timed once per scale
+    startup = {"import main": measure_imports(repeat),
+               "start-up (schema current)": measure_startup(repeat),
+               "start-up (full initialization)": measure_startup(1, full_initialization=True)}
+    for name, result in startup.items():
+        results[name] = result
+        print(f"  {name:46} {result['p50_ms']:8.2f}ms {result['p99_ms']:8.2f}ms "
+              f"{result['statements']:6} {result['peak_kb']:8.1f}KB")
+    return results
+
+
+def compare(results, baseline, threshold, min_ms):
+    """
+    Lists operations slower than `threshold` times their baseline p50 (and by more than min_ms),
+    or issuing more statements than before, for the scales both runs measured.
+    """
+    regressions = []
+    for scale, operations in results.items():
+        for name, result in operations.items():
+            before = baseline.get(scale, {}).get(name)
+            if before is None:
+                continue
+            slower = (result["p50_ms"] > before["p50_ms"] * threshold
+                      and result["p50_ms"] - before["p50_ms"] > min_ms)
+            if slower or result["statements"] > before["statements"]:
+                regressions.append(f"{scale} {name}: p50 {before['p50_ms']:.2f} -> {result['p50_ms']:.2f} ms, "
+                                   f"statements {before['statements']} -> {result['statements']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="10k,100k", help="listing counts, e.g. 10k,100k,1M")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per operation")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of city, agency and owner sizes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cities", type=int, default=200)
+    parser.add_argument("--agencies", type=int, default=50)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="results file of an earlier run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.5, help="p50 ratio counted as a regression")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    results = {str(scale): run_suite(scale, args.repeat, args.skew, args.seed, args.cities, args.agencies)
+               for scale in parse_scales(args.scales)}
+
+    if args.json:
+        meta = {"scales": list(results), "repeat": args.repeat, "skew": args.skew, "seed": args.seed,
+                "cities": args.cities, "agencies": args.agencies, "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version, "created": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        with open(args.json, "w") as file:
+            json.dump({"meta": meta, "results": results}, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if baseline["meta"]["skew"] != args.skew or baseline["meta"]["seed"] != args.seed:
+            print("\nWarning: the baseline was generated with a different skew or seed.")
+        regressions = compare(results, baseline["results"], args.threshold, args.min_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regressions against {args.compare}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.compare}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Deterministic synthetic data for benchmarks.
+
+The same arguments always produce the same database. With the default skew of 0 cities, agencies
+and owners are picked uniformly; a positive skew draws them from Zipf-like distributions instead,
+so a few large cities and agencies hold most of the listings and a few owners hold many properties.
+
+    python -m benchmarks.synthetic 100k --skew 1.0
+"""
+import argparse
+import random
+import time
+from bisect import bisect_left
+from itertools import accumulate
+
+from benchmarks.common import parse_scales
+from db import engine, Base, Session, Owner, City, Address, Property, Agency, Listing
+from price_summary import rebuild_price_summary
+from reference_cache import reference_cache
+
+CHUNK_SIZE = 50_000
+
+# Synthetic cities are scattered over roughly the area of Lithuania: (south, west, north, east)
+REGION = (54.0, 21.1, 56.3, 26.6)
+
+# Standard deviation in degrees of an address's distance from its city centre (about 5 km)
+CITY_SPREAD = 0.045
+
+# Owner ranks are drawn with this fraction of the skew: at skew 1 the largest owner of 100k holds
+# about 0.2% of the properties rather than the 8% a full Zipf distribution would give them
+OWNER_SKEW_FACTOR = 0.5
+
+
+def city_name(index):
+    """
+    Name of the synthetic city with the given index.
+    """
+    return f"City {index:04d}"
+
+
+def _insert_chunked(connection, table, rows):
+    """
+    Inserts an iterable of row dicts with executemany in fixed-size chunks.
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            connection.execute(table.insert(), chunk)
+            chunk = []
+    if chunk:
+        connection.execute(table.insert(), chunk)
+
+
+def city_centre(index, seed=42):
+    """
+    (latitude, longitude) around which the addresses of the synthetic city with the given index lie.
+    """
+    rng = random.Random(f"{seed}-city-{index}")
+    south, west, north, east = REGION
+    return rng.uniform(south, north), rng.uniform(west, east)
+
+
+def skewed_index(rng, count, skew):
+    """
+    Returns a function drawing indexes 1..count, where index k has weight 1 / k ** skew.
+    Skew 0 draws uniformly with rng.randint, consuming the generator exactly as before skew existed.
+    """
+    if not skew:
+        return lambda: rng.randint(1, count)
+    cumulative = list(accumulate(1 / k ** skew for k in range(1, count + 1)))
+    total = cumulative[-1]
+    return lambda: bisect_left(cumulative, rng.random() * total) + 1
+
+
+def generate(engine, listings, seed=42, cities=200, agencies=50, properties=None, owners=None, skew=0.0):
+    """
+    Recreates all tables and fills them with `listings` listings.
+    By default every property gets on average two listings, every owner four properties,
+    and every address coordinates near its city's centre. With a positive skew, city, agency and
+    owner 1 are the largest and sizes fall off with the ID (see skewed_index()).
+    """
+    rng = random.Random(seed)
+    # Coordinates come from their own generator so the rest of the data does not depend on them
+    location_rng = random.Random(seed + 1)
+    centres = [None] + [city_centre(i, seed) for i in range(1, cities + 1)]
+    properties = properties or max(1, listings // 2)
+    owners = owners or max(1, properties // 4)
+    city_of = skewed_index(rng, cities, skew)
+    agency_of = skewed_index(rng, agencies, skew)
+    owner_of = skewed_index(rng, owners, skew * OWNER_SKEW_FACTOR)
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    # IDs are reused for different rows, so nothing cached for the previous data set still holds
+    reference_cache.clear()
+
+    with engine.begin() as connection:
+        _insert_chunked(connection, City.__table__,
+                        ({"city_id": i, "name": city_name(i)} for i in range(1, cities + 1)))
+        _insert_chunked(connection, Agency.__table__,
+                        ({"agency_id": i, "name": f"Agency {i}", "company_code": f"AG{i:05d}"}
+                         for i in range(1, agencies + 1)))
+        _insert_chunked(connection, Owner.__table__,
+                        ({"owner_id": i, "first_name": f"First{i}", "last_name": f"Last{i}",
+                          "phone_number": f"+370{i:08d}"} for i in range(1, owners + 1)))
+        _insert_chunked(connection, Address.__table__,
+                        (_address_row(rng, location_rng, i, city_of, centres) for i in range(1, properties + 1)))
+        _insert_chunked(connection, Property.__table__,
+                        ({"property_id": i, "owner_id": owner_of(), "address_id": i,
+                          "area_sqm": round(rng.uniform(25, 250), 1), "registry_number": f"REG-{i:08d}"}
+                         for i in range(1, properties + 1)))
+        _insert_chunked(connection, Listing.__table__, (_listing_row(rng, i, properties, agency_of)
+                                                        for i in range(1, listings + 1)))
+
+    db_session = Session(bind=engine)
+    try:
+        rebuild_price_summary(db_session)
+    finally:
+        db_session.close()
+
+
+def _address_row(rng, location_rng, address_id, city_of, centres):
+    row = {"address_id": address_id, "street_address": f"{rng.randint(1, 200)} Street {address_id}",
+           "postal_code": f"LT-{rng.randint(10000, 99999)}", "city_id": city_of()}
+    latitude, longitude = centres[row["city_id"]]
+    row["latitude"] = round(latitude + location_rng.gauss(0, CITY_SPREAD), 6)
+    # A degree of longitude is only about 0.6 of a degree of latitude this far north
+    row["longitude"] = round(longitude + location_rng.gauss(0, CITY_SPREAD * 1.7), 6)
+    return row
+
+
+def _listing_row(rng, listing_id, properties, agency_of):
+    """
+    A listing that is for sale, for rent, or both.
+    """
+    kind = rng.random()
+    return {
+        "listing_id": listing_id,
+        "property_id": rng.randint(1, properties),
+        "agency_id": agency_of(),
+        "sale_price": round(rng.uniform(30_000, 900_000), -2) if kind < 0.7 else None,
+        "rental_price": round(rng.uniform(300, 3_000), 0) if kind > 0.5 else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill the benchmark database (REAL_ESTATE_DB_URL) with synthetic data.")
+    parser.add_argument("listings", help="listing count, e.g. 100k")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cities", type=int, default=200)
+    parser.add_argument("--agencies", type=int, default=50)
+    parser.add_argument("--properties", help="default half the listings")
+    parser.add_argument("--owners", help="default a quarter of the properties")
+    parser.add_argument("--skew", type=float, default=0.0, help="Zipf exponent for city, agency and owner sizes")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    generate(engine, parse_scales(args.listings)[0], args.seed, args.cities, args.agencies,
+             parse_scales(args.properties)[0] if args.properties else None,
+             parse_scales(args.owners)[0] if args.owners else None, args.skew)
+    print(f"Generated {args.listings} listings in {engine.url.database} in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,287 @@
+"""
+Streaming export of the full property catalog (everything the show-all reports display)
+to CSV, JSONL, Parquet or a simple column-chunked binary format.
+
+Column-chunked format (.rcol), used when pyarrow is not installed:
+
+    file    := MAGIC header chunk* end
+    MAGIC   := b"RCOL0001"
+    header  := uint32 length, UTF-8 JSON {"columns": [{"name": str, "type": "int64" | "float64" | "string"}]}
+    chunk   := uint32 row_count (> 0), then one column block per column in header order
+    block   := uint32 byte length, null bitmap (ceil(row_count / 8) bytes, bit set = NULL), values
+    values  := int64/float64: row_count little-endian 8-byte values (0 for NULL)
+               string: (row_count + 1) uint32 offsets into the UTF-8 data that follows
+    end     := uint32 0
+
+All integers are little-endian. read_columnar() reads the format back chunk by chunk.
+"""
+import argparse
+import csv
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+
+from sqlalchemy.sql import select
+
+from db import engine, Owner, Property, Address, Agency, City, Listing
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Rows fetched from the cursor and written per chunk
+DEFAULT_CHUNK_SIZE = 50_000
+
+COLUMNAR_MAGIC = b"RCOL0001"
+
+# Exported columns with their columnar types, in file order
+EXPORT_COLUMNS = [
+    ("property_id", Property.property_id, "int64"),
+    ("registry_number", Property.registry_number, "string"),
+    ("area_sqm", Property.area_sqm, "float64"),
+    ("owner_id", Property.owner_id, "int64"),
+    ("owner_name", (Owner.first_name + " " + Owner.last_name), "string"),
+    ("street_address", Address.street_address, "string"),
+    ("postal_code", Address.postal_code, "string"),
+    ("city", City.name, "string"),
+    ("listing_id", Listing.listing_id, "int64"),
+    ("agency_id", Agency.agency_id, "int64"),
+    ("agency_name", Agency.name, "string"),
+    ("company_code", Agency.company_code, "string"),
+    ("sale_price", Listing.sale_price, "float64"),
+    ("rental_price", Listing.rental_price, "float64"),
+]
+
+EXPORT_FORMATS = ["csv", "jsonl", "parquet", "columnar"]
+
+
+def catalog_query():
+    """
+    One row per listing; properties without listings appear once with empty listing columns.
+    Ordered by property and listing so exports are reproducible.
+    """
+    return (select(*(column.label(name) for name, column, _ in EXPORT_COLUMNS))
+            .select_from(Property)
+            .join(Address, Property.address_id == Address.address_id)
+            .join(City, Address.city_id == City.city_id)
+            .outerjoin(Owner, Property.owner_id == Owner.owner_id)
+            .outerjoin(Listing, Property.property_id == Listing.property_id)
+            .outerjoin(Agency, Listing.agency_id == Agency.agency_id)
+            .order_by(Property.property_id, Listing.listing_id))
+
+
+def stream_catalog(chunk_size=DEFAULT_CHUNK_SIZE, bind=engine):
+    """
+    Yields the catalog as lists of row tuples, holding at most one chunk in memory.
+    """
+    with bind.connect() as connection:
+        result = connection.execution_options(yield_per=chunk_size).execute(catalog_query())
+        for partition in result.partitions():
+            yield partition
+
+
+class CsvWriter:
+    def __init__(self, path):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(name for name, _, _ in EXPORT_COLUMNS)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class JsonlWriter:
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+        self.names = [name for name, _, _ in EXPORT_COLUMNS]
+
+    def write(self, rows):
+        self.file.writelines(json.dumps(dict(zip(self.names, row))) + "\n" for row in rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    def __init__(self, path):
+        if pyarrow is None:
+            raise RuntimeError("Parquet export needs pyarrow; use the 'columnar' format instead.")
+        arrow_types = {"int64": pyarrow.int64(), "float64": pyarrow.float64(), "string": pyarrow.string()}
+        self.schema = pyarrow.schema([(name, arrow_types[kind]) for name, _, kind in EXPORT_COLUMNS])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        self.writer.write_table(pyarrow.Table.from_arrays(
+            [pyarrow.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+class ColumnarWriter:
+    """
+    Writes the column-chunked format described in the module docstring.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "wb")
+        header = json.dumps({"columns": [{"name": name, "type": kind} for name, _, kind in EXPORT_COLUMNS]})
+        header = header.encode("utf-8")
+        self.file.write(COLUMNAR_MAGIC + struct.pack("<I", len(header)) + header)
+
+    def write(self, rows):
+        self.file.write(struct.pack("<I", len(rows)))
+        for (_, _, kind), values in zip(EXPORT_COLUMNS, zip(*rows)):
+            block = _null_bitmap(values) + _encode_values(kind, values)
+            self.file.write(struct.pack("<I", len(block)) + block)
+
+    def close(self):
+        self.file.write(struct.pack("<I", 0))
+        self.file.close()
+
+
+def _null_bitmap(values):
+    """
+    One bit per value, set when the value is NULL.
+    """
+    bitmap = bytearray((len(values) + 7) // 8)
+    for position, value in enumerate(values):
+        if value is None:
+            bitmap[position >> 3] |= 1 << (position & 7)
+    return bytes(bitmap)
+
+
+def _encode_values(kind, values):
+    """
+    Encodes one column of a chunk as described in the module docstring.
+    """
+    if kind == "string":
+        encoded = [value.encode("utf-8") if value is not None else b"" for value in values]
+        offsets = array("I", [0])
+        for item in encoded:
+            offsets.append(offsets[-1] + len(item))
+        return _little_endian(offsets) + b"".join(encoded)
+
+    typecode, empty = ("q", 0) if kind == "int64" else ("d", 0.0)
+    return _little_endian(array(typecode, (empty if value is None else value for value in values)))
+
+
+def _little_endian(values):
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def read_columnar(path):
+    """
+    Reads a column-chunked file back, yielding one {column name: list of values} dict per chunk.
+    """
+    with open(path, "rb") as file:
+        if file.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"'{path}' is not a column-chunked export.")
+        (header_length,) = struct.unpack("<I", file.read(4))
+        columns = json.loads(file.read(header_length))["columns"]
+
+        while True:
+            (row_count,) = struct.unpack("<I", file.read(4))
+            if row_count == 0:
+                return
+            chunk = {}
+            for column in columns:
+                (block_length,) = struct.unpack("<I", file.read(4))
+                chunk[column["name"]] = _decode_block(column["type"], row_count, file.read(block_length))
+            yield chunk
+
+
+def _decode_block(kind, row_count, block):
+    bitmap_length = (row_count + 7) // 8
+    nulls = [bool(block[position >> 3] & (1 << (position & 7))) for position in range(row_count)]
+    data = block[bitmap_length:]
+
+    if kind == "string":
+        offsets = array("I")
+        offsets.frombytes(data[:(row_count + 1) * 4])
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        text = data[(row_count + 1) * 4:]
+        return [None if nulls[i] else text[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(row_count)]
+
+    values = array("q" if kind == "int64" else "d")
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return [None if nulls[i] else values[i] for i in range(row_count)]
+
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonlWriter, "parquet": ParquetWriter, "columnar": ColumnarWriter}
+
+
+def export_catalog(path, export_format, chunk_size=DEFAULT_CHUNK_SIZE, bind=engine):
+    """
+    Streams the catalog into `path`. Returns (rows written, seconds taken).
+    """
+    start = time.perf_counter()
+    writer = WRITERS[export_format](path)
+    rows_written = 0
+    try:
+        for rows in stream_catalog(chunk_size, bind):
+            writer.write(rows)
+            rows_written += len(rows)
+    finally:
+        writer.close()
+    return rows_written, time.perf_counter() - start
+
+
+def default_format():
+    """
+    Parquet when pyarrow is installed, otherwise the column-chunked format.
+    """
+    return "parquet" if pyarrow is not None else "columnar"
+
+
+def print_export_report(path, rows_written, elapsed):
+    rate = rows_written / elapsed if elapsed else 0.0
+    size_mb = os.path.getsize(path) / 1_000_000
+    print(f"Exported {rows_written} rows to '{path}' in {elapsed:.1f}s ({rate:,.0f} rows/sec, {size_mb:.1f} MB)")
+
+
+def bulk_export_menu():
+    """
+    Exports the catalog from the menu.
+    """
+    print("\n--- Export Property Catalog ---")
+    export_format = input(f"Enter format ({', '.join(EXPORT_FORMATS)}; blank for {default_format()}): ").strip()
+    export_format = export_format or default_format()
+    if export_format not in WRITERS:
+        print(f"Unknown format '{export_format}'.")
+        return
+    if export_format == "parquet" and pyarrow is None:
+        print("Parquet export needs pyarrow. Use the 'columnar' format instead.")
+        return
+
+    path = input("Enter the output file path: ").strip()
+    if not path:
+        print("No output path given.")
+        return
+    print_export_report(path, *export_catalog(path, export_format))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the full property catalog.")
+    parser.add_argument("path", help="output file")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="defaults to parquet if pyarrow is installed, "
+                                                                 "otherwise columnar")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per chunk")
+    args = parser.parse_args()
+
+    print_export_report(args.path, *export_catalog(args.path, args.format or default_format(), args.chunk_size))
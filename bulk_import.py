@@ -0,0 +1,285 @@
+import argparse
+import csv
+import json
+import os
+import time
+
+from sqlalchemy.sql import func, select
+
+from db import engine, Owner, Property, Address, Agency, City, Listing
+from price_summary import refresh_property_summaries
+from query_cache import clear_query_cache
+
+# Rows written per transaction
+DEFAULT_CHUNK_SIZE = 10_000
+
+# Columns of one feed row; every row describes a property and, if it has a price, one listing of it
+FEED_COLUMNS = ["first_name", "last_name", "phone_number",
+                "street_address", "postal_code", "city", "area_sqm", "registry_number",
+                "agency_name", "company_code", "sale_price", "rental_price"]
+
+
+class ImportStats:
+    """
+    Counters reported at the end of an import.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.skipped = 0
+        self.errors = []
+        self.created = {"cities": 0, "owners": 0, "agencies": 0, "properties": 0, "listings": 0}
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+class LookupMaps:
+    """
+    In-memory natural key -> ID maps used to resolve or create referenced rows without a query per row.
+
+    IDs for new rows are allocated here, so every chunk can be written with plain executemany inserts.
+    This assumes nothing else writes to the database while the import runs.
+    """
+
+    def __init__(self, connection):
+        self.cities = dict(connection.execute(select(City.name, City.city_id)).all())
+        self.owners = dict(connection.execute(select(Owner.phone_number, Owner.owner_id)
+                                              .where(Owner.phone_number.isnot(None))).all())
+        self.agencies = dict(connection.execute(select(Agency.company_code, Agency.agency_id)
+                                                .where(Agency.company_code.isnot(None))).all())
+        self.properties = dict(connection.execute(select(Property.registry_number, Property.property_id)
+                                                  .where(Property.registry_number.isnot(None))).all())
+        self.next_ids = {
+            model: (connection.execute(select(func.max(key))).scalar() or 0) + 1
+            for model, key in ((City, City.city_id), (Owner, Owner.owner_id), (Agency, Agency.agency_id),
+                               (Address, Address.address_id), (Property, Property.property_id),
+                               (Listing, Listing.listing_id))
+        }
+
+    def allocate(self, model):
+        """
+        Returns the next free primary key for a model.
+        """
+        new_id = self.next_ids[model]
+        self.next_ids[model] += 1
+        return new_id
+
+
+class ChunkBuffer:
+    """
+    Rows collected for one chunk, grouped by table in foreign-key order.
+    """
+
+    def __init__(self):
+        self.rows = {City: [], Owner: [], Agency: [], Address: [], Property: [], Listing: []}
+        self.touched_properties = set()
+
+    def __len__(self):
+        return sum(len(rows) for rows in self.rows.values())
+
+    def flush(self, connection):
+        """
+        Writes the buffered rows with one executemany per table and refreshes the affected price summaries.
+        """
+        for model, rows in self.rows.items():
+            if rows:
+                connection.execute(model.__table__.insert(), rows)
+        if self.touched_properties:
+            refresh_property_summaries(connection, self.touched_properties)
+
+
+def read_feed(path, file_format=None):
+    """
+    Streams the records of a CSV (with header) or JSONL file: dicts for CSV rows, the text of every
+    non-blank line for JSONL. feed_row() turns a record into a row, so a malformed line is rejected
+    together with its row instead of ending the whole file.
+    """
+    file_format = file_format or ("jsonl" if path.endswith((".jsonl", ".json")) else "csv")
+    with open(path, newline="", encoding="utf-8") as file:
+        if file_format == "csv":
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield line
+
+
+def feed_row(record):
+    """
+    The row dict of a record from read_feed(). Raises ValueError for a line that is not a JSON object.
+    """
+    if isinstance(record, dict):
+        return record
+    try:
+        row = json.loads(record)
+    except ValueError as error:
+        raise ValueError(f"invalid JSON: {error}") from None
+    if not isinstance(row, dict):
+        raise ValueError(f"expected a JSON object, got {type(row).__name__}")
+    return row
+
+
+def _text(row, column):
+    """
+    Returns a stripped string value or None for blank/missing values.
+    """
+    value = row.get(column)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _number(row, column):
+    """
+    Returns a float value or None for blank/missing values.
+    """
+    value = _text(row, column)
+    return float(value) if value is not None else None
+
+
+def stage_row(row, maps, buffer, stats):
+    """
+    Resolves or creates the city, owner, agency and property of one feed row and buffers the inserts.
+    Raises ValueError for rows that cannot be imported.
+    """
+    registry_number = _text(row, "registry_number")
+    if registry_number is None:
+        raise ValueError("registry_number is required")
+
+    # Parse everything up front so a bad value never leaves half a row buffered
+    area_sqm = _number(row, "area_sqm")
+    sale_price = _number(row, "sale_price")
+    rental_price = _number(row, "rental_price")
+    company_code = _text(row, "company_code")
+    if (sale_price is not None or rental_price is not None) and company_code is None:
+        raise ValueError("company_code is required for a listing")
+
+    property_id = maps.properties.get(registry_number)
+    if property_id is None:
+        city_name = _text(row, "city")
+        if city_name is None:
+            raise ValueError("city is required for a new property")
+
+        city_id = maps.cities.get(city_name)
+        if city_id is None:
+            city_id = maps.cities[city_name] = maps.allocate(City)
+            buffer.rows[City].append({"city_id": city_id, "name": city_name})
+            stats.created["cities"] += 1
+
+        phone_number = _text(row, "phone_number")
+        owner_id = maps.owners.get(phone_number) if phone_number else None
+        if owner_id is None:
+            owner_id = maps.allocate(Owner)
+            if phone_number:
+                maps.owners[phone_number] = owner_id
+            buffer.rows[Owner].append({"owner_id": owner_id, "first_name": _text(row, "first_name"),
+                                       "last_name": _text(row, "last_name"), "phone_number": phone_number})
+            stats.created["owners"] += 1
+
+        address_id = maps.allocate(Address)
+        buffer.rows[Address].append({"address_id": address_id, "street_address": _text(row, "street_address"),
+                                     "postal_code": _text(row, "postal_code"), "city_id": city_id})
+
+        property_id = maps.properties[registry_number] = maps.allocate(Property)
+        buffer.rows[Property].append({"property_id": property_id, "owner_id": owner_id, "address_id": address_id,
+                                      "area_sqm": area_sqm, "registry_number": registry_number})
+        stats.created["properties"] += 1
+
+    # Rows without prices only describe the property
+    if sale_price is None and rental_price is None:
+        return
+
+    agency_id = maps.agencies.get(company_code)
+    if agency_id is None:
+        agency_id = maps.agencies[company_code] = maps.allocate(Agency)
+        buffer.rows[Agency].append({"agency_id": agency_id, "name": _text(row, "agency_name"),
+                                    "company_code": company_code})
+        stats.created["agencies"] += 1
+
+    buffer.rows[Listing].append({"listing_id": maps.allocate(Listing), "property_id": property_id,
+                                 "agency_id": agency_id, "sale_price": sale_price, "rental_price": rental_price})
+    buffer.touched_properties.add(property_id)
+    stats.created["listings"] += 1
+
+
+def import_feed(path, file_format=None, chunk_size=DEFAULT_CHUNK_SIZE, bind=engine, progress=True):
+    """
+    Imports a feed file in chunks, one transaction per chunk. Returns the ImportStats.
+    Invalid rows are skipped and reported; a database error stops the import,
+    keeping the chunks committed before it.
+    """
+    stats = ImportStats()
+    with bind.connect() as connection:
+        maps = LookupMaps(connection)
+
+    buffer = ChunkBuffer()
+    for record_number, record in enumerate(read_feed(path, file_format), start=1):
+        try:
+            stage_row(feed_row(record), maps, buffer, stats)
+            stats.rows += 1
+        except ValueError as error:
+            stats.skipped += 1
+            stats.errors.append(f"record {record_number}: {error}")
+
+        if stats.rows and stats.rows % chunk_size == 0 and len(buffer):
+            _write_chunk(bind, buffer, stats, progress)
+            buffer = ChunkBuffer()
+
+    if len(buffer):
+        _write_chunk(bind, buffer, stats, progress)
+    return stats
+
+
+def _write_chunk(bind, buffer, stats, progress):
+    """
+    Writes one chunk in its own transaction and prints the running throughput.
+    """
+    with bind.begin() as connection:
+        buffer.flush(connection)
+    # Core inserts skip the per-entity invalidation hooks, so cached results may be stale
+    clear_query_cache()
+    if progress:
+        print(f"  {stats.rows} rows imported ({stats.rows_per_second:,.0f} rows/sec)")
+
+
+def print_import_report(stats):
+    """
+    Prints the summary of a finished import.
+    """
+    print(f"\nImported {stats.rows} rows in {stats.elapsed:.1f}s ({stats.rows_per_second:,.0f} rows/sec)")
+    print("Created: " + ", ".join(f"{count} {name}" for name, count in stats.created.items()))
+    if stats.skipped:
+        print(f"Skipped {stats.skipped} invalid rows:")
+        for error in stats.errors[:20]:
+            print(f"  {error}")
+
+
+def bulk_import_menu():
+    """
+    Imports a feed file from the menu.
+    """
+    print("\n--- Bulk Import ---")
+    print(f"Expected columns: {', '.join(FEED_COLUMNS)}")
+    path = input("Enter the path of the CSV or JSONL file: ").strip()
+    if not os.path.isfile(path):
+        print(f"File '{path}' not found.")
+        return
+    print_import_report(import_feed(path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import owners, properties, agencies and listings.")
+    parser.add_argument("path", help="CSV (with header) or JSONL feed file")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per transaction")
+    args = parser.parse_args()
+
+    print_import_report(import_feed(args.path, args.format, args.chunk_size))
@@ -0,0 +1,318 @@
+"""
+Bulk repricing of listings.
+
+Two kinds of change are supported:
+- adjustments: a percentage or an absolute amount applied to the sale or rental price of every
+  listing matching a city, agency and price range filter, e.g. "+3% on all rentals in Vilnius".
+  The matching listings are collected into a temporary table and changed by a single UPDATE.
+- repricing files: CSV or JSONL rows of listing_id, sale_price and rental_price, applied in chunks
+  with one executemany UPDATE per chunk. A blank price keeps the listing's current one.
+
+Both can run as a dry run that only counts the listings they would change. Price summaries are
+refreshed set-based for the affected properties, and the price history triggers record every change.
+"""
+import argparse
+import os
+import time
+
+from sqlalchemy import text, update
+from sqlalchemy.sql import func, select, table, column
+
+from bulk_import import read_feed, feed_row, DEFAULT_CHUNK_SIZE
+from db import engine, session_scope, Listing, Property, Address
+from price_summary import refresh_property_summaries
+from query_cache import clear_query_cache
+from services import find_city_id
+
+PRICE_COLUMNS = {"sale": Listing.sale_price, "rental": Listing.rental_price}
+
+# Columns of one repricing file row
+REPRICE_COLUMNS = ["listing_id", "sale_price", "rental_price"]
+
+# Listings an adjustment changes, collected before the UPDATE so their properties are still known afterwards
+_targets = table("reprice_targets", column("listing_id"), column("property_id"))
+
+_UPDATE_LISTING = text("UPDATE listings SET sale_price = coalesce(:sale_price, sale_price), "
+                       "rental_price = coalesce(:rental_price, rental_price) WHERE listing_id = :listing_id")
+
+
+class RepriceStats:
+    """
+    Counters reported at the end of a repricing run.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.updated = 0
+        self.skipped = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+def parse_change(value):
+    """
+    Parses a price change such as "+3%", "-2.5%" or "+150" into (percent, amount), one of them None.
+    Raises ValueError for anything else.
+    """
+    value = value.strip().replace(" ", "")
+    try:
+        if value.endswith("%"):
+            return float(value[:-1]), None
+        return None, float(value)
+    except ValueError:
+        raise ValueError(f"'{value}' is not a change like +3%, -2.5% or +150.") from None
+
+
+def _price_column(price):
+    if price not in PRICE_COLUMNS:
+        raise ValueError(f"Unknown price '{price}'; choose one of {', '.join(PRICE_COLUMNS)}.")
+    return PRICE_COLUMNS[price]
+
+
+def matching_listings(price, city_id=None, agency_id=None, min_price=None, max_price=None):
+    """
+    SELECT of (listing_id, property_id) of the listings that have the given price ("sale" or
+    "rental") and match every filter given; the price range applies to that price.
+    """
+    price_column = _price_column(price)
+    query = select(Listing.listing_id, Listing.property_id).where(price_column.isnot(None))
+    if city_id is not None:
+        query = (query.join(Property, Listing.property_id == Property.property_id)
+                 .join(Address, Property.address_id == Address.address_id)
+                 .where(Address.city_id == city_id))
+    if agency_id is not None:
+        query = query.where(Listing.agency_id == agency_id)
+    if min_price is not None:
+        query = query.where(price_column >= min_price)
+    if max_price is not None:
+        query = query.where(price_column <= max_price)
+    return query
+
+
+def adjust_prices(price, percent=None, amount=None, city_id=None, agency_id=None, min_price=None, max_price=None,
+                  dry_run=False, bind=engine):
+    """
+    Raises or lowers the sale or rental price of the matching listings (see matching_listings()) by
+    a percentage or an absolute amount in one transaction. Prices are rounded to cents and never go
+    below zero. A dry run only counts the listings. Returns the RepriceStats.
+    """
+    if (percent is None) == (amount is None):
+        raise ValueError("Give either a percentage or an amount.")
+    if percent is not None and percent <= -100:
+        raise ValueError("A price cut must be smaller than 100%.")
+    price_column = _price_column(price)
+    targets = matching_listings(price, city_id, agency_id, min_price, max_price)
+    new_price = price_column * (1 + percent / 100) if percent is not None else price_column + amount
+
+    stats = RepriceStats()
+    with bind.begin() as connection:
+        if dry_run:
+            stats.rows = stats.updated = connection.execute(
+                select(func.count()).select_from(targets.subquery())).scalar()
+            return stats
+
+        connection.execute(text("DROP TABLE IF EXISTS temp.reprice_targets"))
+        connection.execute(text("CREATE TEMP TABLE reprice_targets (listing_id INTEGER PRIMARY KEY, "
+                                "property_id INTEGER)"))
+        connection.execute(_targets.insert().from_select(["listing_id", "property_id"], targets))
+        stats.rows = stats.updated = connection.execute(
+            update(Listing)
+            .where(Listing.listing_id.in_(select(_targets.c.listing_id)))
+            .values({price_column: func.max(func.round(new_price, 2), 0)})).rowcount
+        refresh_property_summaries(connection, select(_targets.c.property_id).distinct())
+        connection.execute(text("DROP TABLE temp.reprice_targets"))
+    # Core updates skip the per-entity invalidation hooks, so cached results may be stale
+    clear_query_cache()
+    return stats
+
+
+def _price(row, name):
+    """
+    Returns a non-negative price or None for blank/missing values.
+    """
+    value = row.get(name)
+    if value is None or not str(value).strip():
+        return None
+    # Through str(), so a JSON list or object fails as a ValueError like any other bad value
+    value = float(str(value))
+    if value < 0:
+        raise ValueError(f"{name} must not be negative")
+    return value
+
+
+def stage_update(row):
+    """
+    Parses one repricing file row into executemany parameters. Raises ValueError for invalid rows.
+    """
+    listing_id = str(row.get("listing_id") or "").strip()
+    if not listing_id.isdigit():
+        raise ValueError("listing_id is required")
+    update_row = {"listing_id": int(listing_id), "sale_price": _price(row, "sale_price"),
+                  "rental_price": _price(row, "rental_price")}
+    if update_row["sale_price"] is None and update_row["rental_price"] is None:
+        raise ValueError("sale_price or rental_price is required")
+    return update_row
+
+
+def reprice_from_file(path, file_format=None, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False, bind=engine,
+                      progress=True):
+    """
+    Applies a repricing file in chunks, one transaction per chunk. Invalid rows and unknown listing
+    IDs are skipped and reported; a dry run only checks and counts them. Returns the RepriceStats.
+    """
+    stats = RepriceStats()
+    chunk = []
+    for record_number, record in enumerate(read_feed(path, file_format), start=1):
+        try:
+            chunk.append(stage_update(feed_row(record)))
+            stats.rows += 1
+        except ValueError as error:
+            stats.skipped += 1
+            stats.errors.append(f"record {record_number}: {error}")
+
+        if len(chunk) == chunk_size:
+            _write_chunk(bind, chunk, stats, dry_run, progress)
+            chunk = []
+
+    if chunk:
+        _write_chunk(bind, chunk, stats, dry_run, progress)
+    return stats
+
+
+def _write_chunk(bind, chunk, stats, dry_run, progress):
+    """
+    Updates the chunk's known listings with one executemany and refreshes their properties' summaries.
+    """
+    listing_ids = [row["listing_id"] for row in chunk]
+    with bind.begin() as connection:
+        known = set(connection.execute(select(Listing.listing_id).where(Listing.listing_id.in_(listing_ids)))
+                    .scalars())
+        rows = [row for row in chunk if row["listing_id"] in known]
+        for listing_id in sorted(set(listing_ids) - known):
+            stats.skipped += 1
+            stats.errors.append(f"listing {listing_id}: not found")
+        if rows and not dry_run:
+            connection.execute(_UPDATE_LISTING, rows)
+            refresh_property_summaries(connection, select(Listing.property_id)
+                                       .where(Listing.listing_id.in_(list(known))).distinct())
+    stats.updated += len(rows)
+    if dry_run:
+        return
+    clear_query_cache()
+    if progress:
+        print(f"  {stats.updated} listings repriced ({stats.rows_per_second:,.0f} rows/sec)")
+
+
+def print_reprice_report(stats, dry_run=False):
+    """
+    Prints the summary of a finished (or dry) repricing run.
+    """
+    if dry_run:
+        print(f"\n{stats.updated} listings would be repriced.")
+    else:
+        print(f"\nRepriced {stats.updated} listings in {stats.elapsed:.2f}s "
+              f"({stats.rows_per_second:,.0f} listings/sec)")
+    if stats.skipped:
+        print(f"Skipped {stats.skipped} rows:")
+        for error in stats.errors[:20]:
+            print(f"  {error}")
+
+
+def _optional_number(prompt):
+    value = input(prompt).strip()
+    return float(value) if value else None
+
+
+def _adjustment_prompts():
+    """
+    Asks for an adjustment and returns adjust_prices() keyword arguments, or None when cancelled.
+    """
+    price = input("Which price to change? (sale/rental): ").strip().lower()
+    percent, amount = parse_change(input("Change, e.g. +3%, -2.5% or +150: "))
+    city_name = input("City (blank for all): ").strip()
+    city_id = None
+    if city_name:
+        with session_scope() as session:
+            city_id = find_city_id(session, city_name)
+        if city_id is None:
+            print(f"No city found for '{city_name}'.")
+            return None
+    agency_id = input("Agency ID (blank for all): ").strip()
+    return {"price": price, "percent": percent, "amount": amount, "city_id": city_id,
+            "agency_id": int(agency_id) if agency_id else None,
+            "min_price": _optional_number(f"Only {price} prices from (blank for no minimum): "),
+            "max_price": _optional_number(f"Only {price} prices up to (blank for no maximum): ")}
+
+
+def bulk_reprice_menu():
+    """
+    Reprices listings by an adjustment or from a file, showing a dry-run count before applying it.
+    """
+    print("\n--- Bulk Reprice Listings ---")
+    source = input("Adjust prices by filter or apply a repricing file? (filter/file): ").strip().lower()
+    if source == "filter":
+        try:
+            arguments = _adjustment_prompts()
+            if arguments is None:
+                return
+            stats = adjust_prices(dry_run=True, **arguments)
+        except ValueError as e:
+            print(f"Invalid input: {e}")
+            return
+    elif source == "file":
+        print(f"Expected columns: {', '.join(REPRICE_COLUMNS)}")
+        path = input("Enter the path of the CSV or JSONL file: ").strip()
+        if not os.path.isfile(path):
+            print(f"File '{path}' not found.")
+            return
+        stats = reprice_from_file(path, dry_run=True)
+    else:
+        print("Invalid choice.")
+        return
+
+    print_reprice_report(stats, dry_run=True)
+    if not stats.updated:
+        return
+    if input("Apply the changes? (yes/no): ").strip().lower() != "yes":
+        print("No listings repriced.")
+        return
+    print_reprice_report(adjust_prices(**arguments) if source == "filter" else reprice_from_file(path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk reprice listings by adjustment or from a file.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    adjust_parser = subparsers.add_parser("adjust", help='e.g. adjust rental +3%% --city Vilnius')
+    adjust_parser.add_argument("price", choices=list(PRICE_COLUMNS))
+    adjust_parser.add_argument("change", help="percentage like +3%% or -2.5%%, or an amount like +150; "
+                                              "put cuts after the options and '--', e.g. -- -2.5%%")
+    adjust_parser.add_argument("--city", help="only listings in this city")
+    adjust_parser.add_argument("--agency-id", type=int, help="only listings of this agency")
+    adjust_parser.add_argument("--min-price", type=float, help="only listings priced at least this")
+    adjust_parser.add_argument("--max-price", type=float, help="only listings priced at most this")
+    adjust_parser.add_argument("--dry-run", action="store_true", help="only count the listings")
+    file_parser = subparsers.add_parser("file", help="apply a CSV or JSONL file of listing_id, sale_price, rental_price")
+    file_parser.add_argument("path")
+    file_parser.add_argument("--format", choices=["csv", "jsonl"], help="defaults to the file extension")
+    file_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per transaction")
+    file_parser.add_argument("--dry-run", action="store_true", help="only check and count the rows")
+    args = parser.parse_args()
+
+    if args.command == "adjust":
+        change_percent, change_amount = parse_change(args.change)
+        with session_scope() as db_session:
+            args_city_id = find_city_id(db_session, args.city) if args.city else None
+        if args.city and args_city_id is None:
+            parser.error(f"no city named '{args.city}'")
+        print_reprice_report(adjust_prices(args.price, change_percent, change_amount, args_city_id, args.agency_id,
+                                           args.min_price, args.max_price, args.dry_run), args.dry_run)
+    else:
+        print_reprice_report(reprice_from_file(args.path, args.format, args.chunk_size, args.dry_run), args.dry_run)
@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.pool import QueuePool, SingletonThreadPool
+
+from db import DATABASE_URL, DATABASE_PROFILE, DATABASE_PRAGMAS, create_database_engine
+import services
+
+# Connection pool strategies for SQLite:
+# - "queue": a shared pool of pool_size connections handed to whichever thread needs one
+# - "singleton": one dedicated connection per thread, kept for the thread's lifetime
+POOL_CLASSES = {"queue": QueuePool, "singleton": SingletonThreadPool}
+
+
+class ConcurrentReadService:
+    """
+    Thread-safe access to the read-side searches for several simultaneous clients.
+
+    Searches run in a thread pool; every worker thread uses its own scoped session, which is
+    removed after each call so no ORM state is shared between requests. With the WAL journal
+    (the default "fast" profile) readers never block each other or the writer.
+    Results are plain Row tuples that can safely be handed between threads.
+    """
+
+    def __init__(self, workers=8, pool="queue", url=DATABASE_URL, profile=DATABASE_PROFILE):
+        if pool not in POOL_CLASSES:
+            raise ValueError(f"Unknown pool '{pool}'. Choose one of: {', '.join(POOL_CLASSES)}")
+
+        pool_options = {"pool_size": workers, "max_overflow": 0} if pool == "queue" else {"pool_size": workers}
+        # PRAGMA query_only guards against accidental writes through the read service
+        overrides = ",".join(filter(None, [DATABASE_PRAGMAS, "query_only=1"]))
+        self.engine = create_database_engine(url, profile, overrides, poolclass=POOL_CLASSES[pool], **pool_options)
+        self.sessions = scoped_session(sessionmaker(bind=self.engine))
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="read-service")
+
+    def _run(self, query, *args, **kwargs):
+        """
+        Runs a services.py query with the calling thread's session, then releases the session.
+        """
+        session = self.sessions()
+        try:
+            return query(session, *args, **kwargs)
+        finally:
+            self.sessions.remove()
+
+    def search_by_city(self, city_name):
+        """
+        Properties in a city with average prices, or None if the city does not exist.
+        """
+        return self._run(services.search_by_city, city_name)
+
+    def prices_by_registry_number(self, registry_number):
+        """
+        (property, listings) for a registry number, or None if no such property exists.
+        """
+        return self._run(services.prices_by_registry_number, registry_number)
+
+    def advanced_search(self, city_name, min_sale_price=None, max_sale_price=None,
+                        min_rental_price=None, max_rental_price=None):
+        """
+        Properties in a city within the price ranges, or None if the city does not exist.
+        """
+        return self._run(services.advanced_search, city_name, min_sale_price, max_sale_price,
+                         min_rental_price, max_rental_price)
+
+    def submit(self, method_name, *args, **kwargs):
+        """
+        Schedules one of the search methods on the thread pool and returns its Future,
+        e.g. service.submit("search_by_city", "Vilnius").
+        """
+        return self.executor.submit(getattr(self, method_name), *args, **kwargs)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.engine.dispose()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
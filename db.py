@@ -1,14 +1,138 @@
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, Float, Table
+import hashlib
+import os
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+
+from sqlalchemy import create_engine, event, Column, Integer, String, ForeignKey, Float, Table, Index, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 
+from sql_stats import SQL_STATS_ENABLED, install_sql_stats, operation_scope
+
 # Base class for all ORM models
 Base = declarative_base()
 
+# Database location, overridable for benchmarks and scripted runs
+DATABASE_URL = os.environ.get("REAL_ESTATE_DB_URL", "sqlite:///real_estate.db")
+
+# SQLite pragmas applied to every new connection, by performance profile
+SQLITE_PROFILES = {
+    # SQLite's own defaults: rollback journal and a full fsync on every commit
+    "default": {"journal_mode": "DELETE", "synchronous": "FULL"},
+    # WAL with a full fsync on every commit; readers no longer block the writer
+    "durable": {"journal_mode": "WAL", "synchronous": "FULL", "busy_timeout": 5000},
+    # WAL without the per-commit fsync (safe against application crashes, a power loss may drop the last
+    # commits), plus memory-mapped reads, a 64 MB page cache and in-memory temp tables
+    "fast": {"journal_mode": "WAL", "synchronous": "NORMAL", "mmap_size": 268435456, "cache_size": -65536,
+             "temp_store": "MEMORY", "busy_timeout": 5000},
+}
+
+# Selected profile, plus optional per-pragma overrides such as "mmap_size=0,cache_size=-2000"
+DATABASE_PROFILE = os.environ.get("REAL_ESTATE_DB_PROFILE", "fast")
+DATABASE_PRAGMAS = os.environ.get("REAL_ESTATE_DB_PRAGMAS", "")
+
+
+def sqlite_pragmas(profile=DATABASE_PROFILE, overrides=DATABASE_PRAGMAS):
+    """
+    Returns the pragmas of a profile with the "name=value,..." overrides applied.
+    """
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown database profile '{profile}'. Choose one of: {', '.join(SQLITE_PROFILES)}")
+
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for item in overrides.split(","):
+        if item.strip():
+            name, _, value = item.partition("=")
+            pragmas[name.strip()] = value.strip()
+    return pragmas
+
+
+def install_sqlite_pragmas(sync_engine, profile=DATABASE_PROFILE, overrides=DATABASE_PRAGMAS):
+    """
+    Makes a (sync) engine apply the profile's pragmas to every SQLite connection it opens.
+    """
+    pragmas = sqlite_pragmas(profile, overrides)
+
+    @event.listens_for(sync_engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def create_database_engine(url=DATABASE_URL, profile=DATABASE_PROFILE, overrides=DATABASE_PRAGMAS,
+                           sql_stats=SQL_STATS_ENABLED, **engine_options):
+    """
+    Creates an engine that applies the profile's pragmas to every SQLite connection it opens and,
+    unless sql_stats is false, records its statements in sql_stats.
+    Extra keyword arguments (pool settings and the like) go to create_engine().
+    """
+    new_engine = create_engine(url, **engine_options)
+    if new_engine.dialect.name == "sqlite":
+        install_sqlite_pragmas(new_engine, profile, overrides)
+    if sql_stats:
+        install_sql_stats(new_engine)
+    return new_engine
+
+
+@lru_cache(maxsize=64)
+def _url_identity(url):
+    url = url.set(drivername=url.get_backend_name())
+    if url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:"):
+        url = url.set(database=os.path.abspath(url.database))
+    return url.render_as_string(hide_password=True)
+
+
+def database_identity(bind):
+    """
+    Names the database an engine or connection reaches, for caches shared by several engines: the
+    sync, async and read-service engines of one database get the same name, other databases and
+    every in-memory database a different one.
+    """
+    engine = bind.engine
+    if engine.dialect.name == "sqlite" and engine.url.database in (None, "", ":memory:"):
+        return f"{_url_identity(engine.url)}#{id(engine)}"
+    return _url_identity(engine.url)
+
+
 # Creating an SQLite database and a session factory
-engine = create_engine("sqlite:///real_estate.db")
+engine = create_database_engine()
 Session = sessionmaker(bind=engine)
-session = Session()
+
+
+@contextmanager
+def session_scope():
+    """
+    One unit of work: yields a new session, commits when the block succeeds, rolls back when it raises,
+    and always closes the session so nothing it loaded outlives the operation.
+    """
+    db_session = Session()
+    try:
+        yield db_session
+        db_session.commit()
+    except Exception:
+        db_session.rollback()
+        raise
+    finally:
+        db_session.close()
+
+
+def unit_of_work(func):
+    """
+    Runs a feature function inside session_scope(), passing the session as its first argument.
+    Callers omit that argument: add_owner() runs add_owner(session) in its own unit of work.
+    Its statements are attributed to the function in the SQL statistics.
+    """
+    operation = f"{func.__module__}.{func.__name__}"
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with operation_scope(operation), session_scope() as db_session:
+            return func(db_session, *args, **kwargs)
+
+    return wrapper
 
 
 # Models
@@ -19,7 +143,8 @@ class Owner(Base):
     __tablename__ = "owners"
     owner_id = Column(Integer, primary_key=True)
     first_name = Column(String)
-    last_name = Column(String)
+    # Indexed for the prefix filter of the owner picker
+    last_name = Column(String, index=True)
     phone_number = Column(String, unique=True)
 
 
@@ -38,9 +163,13 @@ class Address(Base):
     """
     __tablename__ = "addresses"
     address_id = Column(Integer, primary_key=True)
-    street_address = Column(String)
+    # Indexed for the prefix filter of the address picker
+    street_address = Column(String, index=True)
     postal_code = Column(String)
-    city_id = Column(Integer, ForeignKey("cities.city_id"))
+    city_id = Column(Integer, ForeignKey("cities.city_id"), index=True)
+    # Optional WGS84 coordinates in degrees, indexed for proximity search by geo_search.py
+    latitude = Column(Float)
+    longitude = Column(Float)
     city = relationship("City")
 
 
@@ -50,8 +179,8 @@ class Property(Base):
     """
     __tablename__ = "properties"
     property_id = Column(Integer, primary_key=True)
-    owner_id = Column(Integer, ForeignKey("owners.owner_id"))
-    address_id = Column(Integer, ForeignKey("addresses.address_id"))
+    owner_id = Column(Integer, ForeignKey("owners.owner_id"), index=True)
+    address_id = Column(Integer, ForeignKey("addresses.address_id"), index=True)
     area_sqm = Column(Float)
     registry_number = Column(String, unique=True)
     address = relationship("Address")
@@ -73,18 +202,196 @@ class Listing(Base):
     Represents a property listing for sale or rent.
     """
     __tablename__ = "listings"
+    __table_args__ = (
+        # Covers the per-property price aggregates without touching the table rows
+        Index("ix_listings_property_prices", "property_id", "sale_price", "rental_price"),
+        Index("ix_listings_sale_price", "sale_price"),
+        Index("ix_listings_rental_price", "rental_price"),
+    )
     listing_id = Column(Integer, primary_key=True)
     property_id = Column(Integer, ForeignKey("properties.property_id"))
-    agency_id = Column(Integer, ForeignKey("agencies.agency_id"))
+    agency_id = Column(Integer, ForeignKey("agencies.agency_id"), index=True)
     sale_price = Column(Float)
     rental_price = Column(Float)
     property = relationship("Property")
     agency = relationship("Agency")
 
 
+class PropertyPriceSummary(Base):
+    """
+    Pre-aggregated listing prices per property, kept in sync by price_summary.py.
+    Only properties with at least one listing have a row.
+    """
+    __tablename__ = "property_price_summary"
+    property_id = Column(Integer, ForeignKey("properties.property_id"), primary_key=True)
+    listing_count = Column(Integer, nullable=False)
+    min_sale_price = Column(Float)
+    avg_sale_price = Column(Float)
+    max_sale_price = Column(Float)
+    min_rental_price = Column(Float)
+    avg_rental_price = Column(Float)
+    max_rental_price = Column(Float)
+
+
+class ListingPriceHistory(Base):
+    """
+    Append-only log of listing prices, written by the triggers of price_history.py whenever a listing
+    is added, repriced or removed. Rows outlive their listing and property, so the IDs are plain
+    integers without foreign keys, and the listing's city is recorded with them.
+    """
+    __tablename__ = "listing_price_history"
+    __table_args__ = (
+        Index("ix_listing_price_history_property_ts", "property_id", "ts"),
+        Index("ix_listing_price_history_city_ts", "city_id", "ts"),
+        Index("ix_listing_price_history_agency_ts", "agency_id", "ts"),
+    )
+    history_id = Column(Integer, primary_key=True)
+    # Unix time in seconds
+    ts = Column(Integer, nullable=False)
+    # One of price_history.EVENTS
+    event = Column(Integer, nullable=False)
+    listing_id = Column(Integer, nullable=False)
+    property_id = Column(Integer)
+    city_id = Column(Integer)
+    agency_id = Column(Integer)
+    sale_price = Column(Float)
+    rental_price = Column(Float)
+
+
+def add_missing_columns(bind=engine):
+    """
+    Adds any declared column that is missing from an existing table, like create_missing_indexes()
+    does for indexes. Only suitable for nullable columns without defaults. Returns "table.column" names.
+    """
+    added = []
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {row[1] for row in connection.execute(text(f"PRAGMA table_info('{table.name}')"))}
+            if not existing:
+                continue
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=connection.dialect)
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                    added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def create_missing_indexes(bind=engine):
+    """
+    Adds any declared index that is missing from an existing database.
+    create_all() skips tables that already exist, so databases created before an index
+    was declared only pick it up here. Returns the names of the indexes created.
+    """
+    created = []
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {row[1] for row in connection.execute(text(f"PRAGMA index_list('{table.name}')"))}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(connection)
+                    created.append(index.name)
+
+        # Refresh the planner statistics so the new indexes are actually chosen
+        if created:
+            connection.execute(text("ANALYZE"))
+    return created
+
+
+def drop_declared_indexes(bind=engine):
+    """
+    Drops every declared index. Used by the index benchmark to measure the unindexed baseline.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.drop(bind, checkfirst=True)
+
+
 def initialize_database():
     """
-    Initializes the database by creating all defined tables.
+    Initializes the database by creating all defined tables and any missing columns and indexes.
     """
     Base.metadata.create_all(engine)
+    added = add_missing_columns()
+    if added:
+        print(f"Added {len(added)} missing column(s): {', '.join(added)}")
+    created = create_missing_indexes()
+    if created:
+        print(f"Added {len(created)} missing index(es): {', '.join(created)}")
     print("Database initialized.")
+
+
+def _normalized_sql(statement):
+    return " ".join(statement.split())
+
+
+def replace_stale_objects(connection, objects):
+    """
+    Creates the derived objects (name -> CREATE statement, in creation order) that are missing, and
+    drops and recreates those whose SQL in sqlite_master differs from their statement, so that a
+    trigger or virtual table changed in code or by hand is not left behind. Returns the names created.
+    """
+    stored = {row.name: row for row in connection.execute(text("SELECT type, name, sql FROM sqlite_master"))}
+    created = []
+    for name, statement in objects.items():
+        if name in stored:
+            if _normalized_sql(stored[name].sql or "") == _normalized_sql(statement):
+                continue
+            connection.execute(text(f"DROP {stored[name].type.upper()} {name}"))
+        connection.execute(text(statement))
+        created.append(name)
+    return created
+
+
+# Records the schema a database was last initialized for. Not a model: drop_all() leaves it, and the
+# schema cookie comparison in schema_is_current() notices the dropped tables instead
+SCHEMA_STATE_TABLE = "schema_state"
+
+
+def schema_fingerprint(*derived_objects):
+    """
+    Digest of the declared tables, columns and indexes and the CREATE statements of the derived
+    objects (triggers, virtual tables) that start-up creates besides them.
+    """
+    parts = []
+    for table in Base.metadata.sorted_tables:
+        parts.append(table.name)
+        parts += [f"{column.name} {column.type!r} {column.nullable} {column.primary_key}" for column in table.columns]
+        parts += sorted(f"{index.name} {[column.name for column in index.columns]} {index.unique}"
+                        for index in table.indexes)
+    parts += sorted(_normalized_sql(statement) for statement in derived_objects)
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def schema_is_current(fingerprint, bind=engine):
+    """
+    True when the database was initialized for this fingerprint and its schema has not changed since
+    (SQLite bumps the schema cookie on every CREATE, DROP or ALTER). Costs one query, where
+    initialize_database() reflects every table. Always False for databases other than SQLite.
+    """
+    if bind.dialect.name != "sqlite":
+        return False
+    try:
+        with bind.connect() as connection:
+            row = connection.execute(text(f"SELECT fingerprint, schema_cookie, "
+                                          f"(SELECT schema_version FROM pragma_schema_version) "
+                                          f"FROM {SCHEMA_STATE_TABLE} WHERE id = 1")).first()
+    except OperationalError:
+        return False
+    return row is not None and row.fingerprint == fingerprint and row.schema_cookie == row[2]
+
+
+def mark_schema_current(fingerprint, bind=engine):
+    """
+    Records that the database is initialized for this fingerprint, at its current schema cookie.
+    """
+    if bind.dialect.name != "sqlite":
+        return
+    with bind.begin() as connection:
+        connection.execute(text(f"CREATE TABLE IF NOT EXISTS {SCHEMA_STATE_TABLE} ("
+                                f"id INTEGER PRIMARY KEY CHECK (id = 1), fingerprint TEXT NOT NULL, "
+                                f"schema_cookie INTEGER NOT NULL)"))
+        # Read after the CREATE above, which itself changes the cookie the first time
+        connection.execute(text(f"INSERT OR REPLACE INTO {SCHEMA_STATE_TABLE} (id, fingerprint, schema_cookie) "
+                                f"VALUES (1, :fingerprint, (SELECT schema_version FROM pragma_schema_version))"),
+                           {"fingerprint": fingerprint})
@@ -1,7 +1,12 @@
-from db import session, Owner, Property, Address, Agency, City, Listing
+from db import unit_of_work
+from geo_search import parse_coordinates
+from picker import pick, OWNERS, PROPERTIES, AGENCIES
+from services import create_owner, create_listing, create_property, create_agency, find_agency, find_owner, \
+    find_property, get_or_create_city_id
 
 
-def add_owner():
+@unit_of_work
+def add_owner(session):
     """
     Adds a new owner to the database and optionally allows adding a property for them.
     """
@@ -11,8 +16,7 @@ def add_owner():
     phone = input("Enter phone number: ")
 
     # Create and save a new owner
-    owner = Owner(first_name=first_name, last_name=last_name, phone_number=phone)
-    session.add(owner)
+    owner = create_owner(session, first_name, last_name, phone)
     session.commit()
     print("Owner added successfully.")
 
@@ -27,7 +31,8 @@ def add_owner():
             print("Invalid input. Please enter 'yes' or 'no'.")
 
 
-def add_property(owner_id=None):
+@unit_of_work
+def add_property(session, owner_id=None):
     """
     Adds a new property to the database. If no owner ID is provided, the user is prompted to select one.
     """
@@ -35,19 +40,14 @@ def add_property(owner_id=None):
 
     # If owner_id is not provided, prompt the user to choose an existing owner
     if owner_id is None:
-        owners = session.query(Owner).all()
-        if not owners:
-            print("No owners found. Please add an owner first.")
-            return
-
         print("\nAvailable Owners:")
-        for owner in owners:
-            print(f"Owner ID: {owner.owner_id}, Name: {owner.first_name} {owner.last_name}, Phone: {owner.phone_number}")
-
         while True:
+            answer = pick(session, OWNERS, "own this property", "No owners found. Please add an owner first.")
+            if answer is None:
+                return
             try:
-                owner_id = int(input("Enter the ID of the owner for this property: "))
-                selected_owner = session.query(Owner).filter_by(owner_id=owner_id).first()
+                owner_id = int(answer)
+                selected_owner = find_owner(session, owner_id)
                 if selected_owner:
                     break
                 else:
@@ -61,30 +61,28 @@ def add_property(owner_id=None):
     city_name = input("Enter property city: ")
     area_sqm = float(input("Enter property area (sqm): "))
     registry_number = input("Enter unique property registry number: ")
+    try:
+        latitude, longitude = parse_coordinates(
+            input("Enter coordinates as 'latitude, longitude' (leave blank to skip): "))
+    except ValueError as e:
+        print(f"Invalid coordinates: {e}")
+        return
 
     # Check if the city already exists, otherwise create a new city entry
-    city = session.query(City).filter_by(name=city_name).first()
-    if not city:
-        city = City(name=city_name)
-        session.add(city)
-        session.commit()
+    _, created = get_or_create_city_id(session, city_name)
+    if created:
         print(f"City '{city_name}' added to the database.")
 
-    # Create and save the new address
-    address = Address(street_address=street_address, postal_code=postal_code, city_id=city.city_id)
-    session.add(address)
-    session.commit()
+    # Create the new address and property; property, address and city are committed together
+    create_property(session, owner_id, street_address, postal_code, city_name, area_sqm, registry_number,
+                    latitude, longitude)
     print(f"Address '{street_address}, {city_name}' added successfully!")
-
-    # Create and save the new property
-    property_obj = Property(owner_id=owner_id, address_id=address.address_id, area_sqm=area_sqm,
-                            registry_number=registry_number)
-    session.add(property_obj)
     session.commit()
     print("Property added successfully!")
 
 
-def add_agency():
+@unit_of_work
+def add_agency(session):
     """
     Adds a new real estate agency to the database.
     """
@@ -92,56 +90,39 @@ def add_agency():
     name = input("Enter agency name: ")
     company_code = input("Enter agency company code: ")
 
-    # Check if an agency with the same company code already exists
-    existing_agency = session.query(Agency).filter_by(company_code=company_code).first()
-    if existing_agency:
-        print(f"Error: An agency with company code '{company_code}' already exists.")
+    # Create and save the new agency, unless the company code is already taken
+    try:
+        create_agency(session, name, company_code)
+    except ValueError as error:
+        print(f"Error: {error}")
         return
-
-    # Create and save the new agency
-    agency = Agency(name=name, company_code=company_code)
-    session.add(agency)
     session.commit()
     print(f"Agency '{name}' added successfully!")
 
 
-def add_listing():
+@unit_of_work
+def add_listing(session):
     """
     Adds a new listing for a property, linking it to an agency.
     """
     print("\n--- Add a New Listing ---")
 
-    # Display available properties for selection
+    # Prompt user to select a property
     print("\nAvailable Properties:")
-    properties = session.query(Property).all()
-    if not properties:
-        print("No properties available. Add a property first!")
+    property_id = pick(session, PROPERTIES, "list", "No properties available. Add a property first!")
+    if property_id is None:
         return
-
-    for property in properties:
-        print(f"Property ID: {property.property_id}, Registry Number: {property.registry_number}, "
-              f"Area: {property.area_sqm} sqm")
-
-    # Prompt user to select a property
-    property_id = input("Enter the ID of the property for this listing: ")
-    selected_property = session.query(Property).filter_by(property_id=property_id).first()
+    selected_property = find_property(session, property_id)
     if not selected_property:
         print(f"Error: No property found with ID {property_id}.")
         return
 
-    # Display available agencies for selection
+    # Prompt user to select an agency
     print("\nAvailable Agencies:")
-    agencies = session.query(Agency).all()
-    if not agencies:
-        print("No agencies available. Add an agency first!")
+    agency_id = pick(session, AGENCIES, "list it with", "No agencies available. Add an agency first!")
+    if agency_id is None:
         return
-
-    for agency in agencies:
-        print(f"Agency ID: {agency.agency_id}, Name: {agency.name}")
-
-    # Prompt user to select an agency
-    agency_id = input("Enter the ID of the agency for this listing: ")
-    selected_agency = session.query(Agency).filter_by(agency_id=agency_id).first()
+    selected_agency = find_agency(session, agency_id)
     if not selected_agency:
         print(f"Error: No agency found with ID {agency_id}.")
         return
@@ -160,12 +141,6 @@ def add_listing():
         return
 
     # Create and save the new listing
-    listing = Listing(
-        property_id=selected_property.property_id,
-        agency_id=selected_agency.agency_id,
-        sale_price=sale_price,
-        rental_price=rental_price
-    )
-    session.add(listing)
+    create_listing(session, selected_property.property_id, selected_agency.agency_id, sale_price, rental_price)
     session.commit()
     print("Listing added successfully!")
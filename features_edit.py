@@ -1,25 +1,23 @@
-from db import session, Owner, Property, Address, Agency, City, Listing
+from db import unit_of_work
+from geo_search import parse_coordinates
+from picker import pick, OWNERS, PROPERTIES, ADDRESSES, LISTINGS, AGENCIES, CITIES
+from services import update_owner, update_listing_prices, update_property, update_address, update_agency, update_city, \
+    find_agency, find_owner, find_property, find_address, find_listing, find_city, get_or_create_city_id
 
 
-def edit_owner():
+@unit_of_work
+def edit_owner(session):
     """
     Edits an existing owner's details (first name, last name, phone number).
     """
     print("\n--- Edit Owner ---")
 
-    # Fetch all owners
-    owners = session.query(Owner).all()
-    if not owners:
-        print("No owners found.")
+    # Select an owner by ID
+    owner_id = pick(session, OWNERS, "edit")
+    if owner_id is None:
         return
 
-    # Display available owners
-    for owner in owners:
-        print(f"Owner ID: {owner.owner_id}, Name: {owner.first_name} {owner.last_name}, Phone: {owner.phone_number}")
-
-    # Select an owner by ID
-    owner_id = input("Enter the ID of the owner to edit: ")
-    selected_owner = session.query(Owner).filter_by(owner_id=owner_id).first()
+    selected_owner = find_owner(session, owner_id)
     if not selected_owner:
         print("Owner not found.")
         return
@@ -32,33 +30,24 @@ def edit_owner():
         f"Enter new phone number (current: {selected_owner.phone_number}): ") or selected_owner.phone_number
 
     # Update and commit changes
-    selected_owner.first_name = new_first_name
-    selected_owner.last_name = new_last_name
-    selected_owner.phone_number = new_phone
+    update_owner(session, selected_owner.owner_id, new_first_name, new_last_name, new_phone)
     session.commit()
     print("Owner updated successfully!")
 
 
-def edit_property():
+@unit_of_work
+def edit_property(session):
     """
     Edits an existing property's details (area and registry number).
     """
     print("\n--- Edit Property ---")
 
-    # Fetch all properties
-    properties = session.query(Property).all()
-    if not properties:
-        print("No properties found.")
+    # Select a property by ID
+    property_id = pick(session, PROPERTIES, "edit")
+    if property_id is None:
         return
 
-    # Display available properties
-    for property in properties:
-        print(
-            f"Property ID: {property.property_id}, Registry Number: {property.registry_number}, Area: {property.area_sqm} sqm")
-
-    # Select a property by ID
-    property_id = input("Enter the ID of the property to edit: ")
-    selected_property = session.query(Property).filter_by(property_id=property_id).first()
+    selected_property = find_property(session, property_id)
     if not selected_property:
         print("Property not found.")
         return
@@ -69,33 +58,24 @@ def edit_property():
         f"Enter new registry number (current: {selected_property.registry_number}): ") or selected_property.registry_number
 
     # Update and commit changes
-    selected_property.area_sqm = float(new_area)
-    selected_property.registry_number = new_registry_number
+    update_property(session, selected_property.property_id, float(new_area), new_registry_number)
     session.commit()
     print("Property updated successfully!")
 
 
-def edit_address():
+@unit_of_work
+def edit_address(session):
     """
     Edits an existing address, including street address, postal code, and city.
     """
     print("\n--- Edit Address ---")
 
-    # Fetch all addresses
-    addresses = session.query(Address).all()
-    if not addresses:
-        print("No addresses found.")
+    # Select an address by ID
+    address_id = pick(session, ADDRESSES, "edit")
+    if address_id is None:
         return
 
-    # Display available addresses
-    for address in addresses:
-        city_name = session.query(City).filter_by(city_id=address.city_id).first().name
-        print(
-            f"Address ID: {address.address_id}, Street: {address.street_address}, City: {city_name}, Postal Code: {address.postal_code}")
-
-    # Select an address by ID
-    address_id = input("Enter the ID of the address to edit: ")
-    selected_address = session.query(Address).filter_by(address_id=address_id).first()
+    selected_address = find_address(session, address_id)
     if not selected_address:
         print("Address not found.")
         return
@@ -106,45 +86,42 @@ def edit_address():
     new_postal = input(
         f"Enter new postal code (current: {selected_address.postal_code}): ") or selected_address.postal_code
     new_city = input(
-        f"Enter new city name (current: {session.query(City).filter_by(city_id=selected_address.city_id).first().name}): ")
+        f"Enter new city name (current: {selected_address.city}): ")
+    current_location = (f"{selected_address.latitude}, {selected_address.longitude}"
+                        if selected_address.latitude is not None else "none")
+    try:
+        latitude, longitude = parse_coordinates(
+            input(f"Enter new coordinates as 'latitude, longitude' (current: {current_location}): "))
+    except ValueError as e:
+        print(f"Invalid coordinates: {e}")
+        return
 
-    # Update city if provided
+    # Create the city if needed
     if new_city:
-        city = session.query(City).filter_by(name=new_city).first()
-        if not city:
-            city = City(name=new_city)
-            session.add(city)
-            session.commit()
+        _, created = get_or_create_city_id(session, new_city)
+        if created:
             print(f"City '{new_city}' added to the database.")
-        selected_address.city_id = city.city_id
 
     # Update and commit changes
-    selected_address.street_address = new_street
-    selected_address.postal_code = new_postal
+    update_address(session, selected_address.address_id, new_street, new_postal, new_city or None,
+                   latitude, longitude)
     session.commit()
     print("Address updated successfully!")
 
 
-def edit_listing():
+@unit_of_work
+def edit_listing(session):
     """
     Edits an existing listing by modifying sale price and rental price.
     """
     print("\n--- Edit Listing ---")
 
-    # Fetch all listings
-    listings = session.query(Listing).all()
-    if not listings:
-        print("No listings found.")
+    # Select a listing by ID
+    listing_id = pick(session, LISTINGS, "edit")
+    if listing_id is None:
         return
 
-    # Display available listings
-    for listing in listings:
-        print(
-            f"Listing ID: {listing.listing_id}, Property ID: {listing.property_id}, Agency ID: {listing.agency_id}, Sale Price: {listing.sale_price}, Rental Price: {listing.rental_price}")
-
-    # Select a listing by ID
-    listing_id = input("Enter the ID of the listing to edit: ")
-    selected_listing = session.query(Listing).filter_by(listing_id=listing_id).first()
+    selected_listing = find_listing(session, listing_id)
     if not selected_listing:
         print("Listing not found.")
         return
@@ -156,31 +133,26 @@ def edit_listing():
         f"Enter new rental price (current: {selected_listing.rental_price}): ") or selected_listing.rental_price
 
     # Update and commit changes
-    selected_listing.sale_price = float(new_sale_price) if new_sale_price else None
-    selected_listing.rental_price = float(new_rental_price) if new_rental_price else None
+    update_listing_prices(session, selected_listing.listing_id,
+                          float(new_sale_price) if new_sale_price else None,
+                          float(new_rental_price) if new_rental_price else None)
     session.commit()
     print("Listing updated successfully!")
 
 
-def edit_agency():
+@unit_of_work
+def edit_agency(session):
     """
     Edits an existing agency's name and company code.
     """
     print("\n--- Edit Agency ---")
 
-    # Fetch all agencies
-    agencies = session.query(Agency).all()
-    if not agencies:
-        print("No agencies found.")
+    # Select an agency by ID
+    agency_id = pick(session, AGENCIES, "edit")
+    if agency_id is None:
         return
 
-    # Display available agencies
-    for agency in agencies:
-        print(f"Agency ID: {agency.agency_id}, Name: {agency.name}, Company Code: {agency.company_code}")
-
-    # Select an agency by ID
-    agency_id = input("Enter the ID of the agency to edit: ")
-    selected_agency = session.query(Agency).filter_by(agency_id=agency_id).first()
+    selected_agency = find_agency(session, agency_id)
     if not selected_agency:
         print("Agency not found.")
         return
@@ -191,31 +163,24 @@ def edit_agency():
         f"Enter new company code (current: {selected_agency.company_code}): ") or selected_agency.company_code
 
     # Update and commit changes
-    selected_agency.name = new_name
-    selected_agency.company_code = new_company_code
+    update_agency(session, selected_agency.agency_id, new_name, new_company_code)
     session.commit()
     print("Agency updated successfully!")
 
 
-def edit_city():
+@unit_of_work
+def edit_city(session):
     """
     Edits an existing city's name.
     """
     print("\n--- Edit City ---")
 
-    # Fetch all cities
-    cities = session.query(City).all()
-    if not cities:
-        print("No cities found.")
+    # Select a city by ID
+    city_id = pick(session, CITIES, "edit")
+    if city_id is None:
         return
 
-    # Display available cities
-    for city in cities:
-        print(f"City ID: {city.city_id}, Name: {city.name}")
-
-    # Select a city by ID
-    city_id = input("Enter the ID of the city to edit: ")
-    selected_city = session.query(City).filter_by(city_id=city_id).first()
+    selected_city = find_city(session, city_id)
     if not selected_city:
         print("City not found.")
         return
@@ -224,6 +189,6 @@ def edit_city():
     new_name = input(f"Enter new city name (current: {selected_city.name}): ") or selected_city.name
 
     # Update and commit changes
-    selected_city.name = new_name
+    update_city(session, selected_city.city_id, new_name)
     session.commit()
     print("City updated successfully!")
@@ -1,8 +1,43 @@
-from db import session, Owner, Property, Address, Agency, City, Listing
-from sqlalchemy.sql import func
+import os
 
+from db import unit_of_work, Property, Listing
+from services import find_city_id, properties_in_city, property_by_registry_number, property_listings, \
+    search_properties, properties_near, properties_query, owner_properties_query, agency_listings_query, \
+    stream_report_rows
+from geo_search import parse_coordinates
+from search_index import search, SEARCH_KINDS
 
-def search_properties_by_city():
+# Rows shown per page in the show-all reports; 0 prints everything without pausing
+REPORT_PAGE_SIZE = int(os.environ.get("REAL_ESTATE_PAGE_SIZE", "50"))
+
+
+def _page_size(page_size):
+    return REPORT_PAGE_SIZE if page_size is None else page_size
+
+
+def next_page_prompt():
+    """
+    Asks whether to show the next page of a report.
+    """
+    answer = input("\n-- Press Enter for the next page, or 'q' to stop: ").strip().lower()
+    return answer != "q"
+
+
+def set_report_page_size():
+    """
+    Changes how many rows the show-all reports print before asking for the next page.
+    """
+    global REPORT_PAGE_SIZE
+    print(f"\nCurrent page size: {REPORT_PAGE_SIZE or 'unlimited'}")
+    try:
+        REPORT_PAGE_SIZE = int(input("Enter new page size (0 for no paging): ").strip())
+        print("Page size updated.")
+    except ValueError:
+        print("Invalid input. Page size not changed.")
+
+
+@unit_of_work
+def search_properties_by_city(session):
     """
     Searches for properties in a specified city and displays relevant details.
     Includes:
@@ -15,24 +50,13 @@ def search_properties_by_city():
     city_name = input("Enter the city name to search: ").strip()
 
     # Validate city existence
-    city = session.query(City).filter_by(name=city_name).first()
-    if not city:
+    city_id = find_city_id(session, city_name)
+    if city_id is None:
         print(f"No city found with the name '{city_name}'.")
         return
 
-    # Query properties in the city with average sale/rental prices
-    results = (session.query(Property.property_id,
-                             Property.registry_number,
-                             Property.area_sqm,
-                             Address.street_address,
-                             Address.postal_code,
-                             func.avg(Listing.sale_price).label("average_sale_price"),
-                             func.avg(Listing.rental_price).label("average_rental_price"))
-               .join(Address, Property.address_id == Address.address_id)
-               .join(Listing, Property.property_id == Listing.property_id)
-               .filter(Address.city_id == city.city_id)
-               .group_by(Property.property_id)
-               .all())
+    # Query properties in the city with their average sale/rental prices
+    results = properties_in_city(session, city_id)
 
     if not results:
         print(f"No properties found in '{city_name}'.")
@@ -51,7 +75,8 @@ def search_properties_by_city():
               f"  Average Rental Price: {property.average_rental_price or 'N/A'}\n")
 
 
-def view_prices_by_registry_number():
+@unit_of_work
+def view_prices_by_registry_number(session):
     """
     Displays property details and listing prices based on a given registry number.
     Includes:
@@ -64,15 +89,7 @@ def view_prices_by_registry_number():
     registry_number = input("Enter the property registry number: ").strip()
 
     # Query property details by registry number
-    property_data = (session.query(Property.property_id,
-                                   Property.registry_number,
-                                   Property.area_sqm,
-                                   Address.street_address,
-                                   City.name.label("city"))
-                     .join(Address, Property.address_id == Address.address_id)
-                     .join(City, Address.city_id == City.city_id)
-                     .filter(Property.registry_number == registry_number)
-                     .first())
+    property_data = property_by_registry_number(session, registry_number)
 
     if not property_data:
         print(f"No property found with registry number '{registry_number}'.")
@@ -85,10 +102,7 @@ def view_prices_by_registry_number():
     print(f"  Area: {property_data.area_sqm} sqm")
 
     # Fetch listing prices from agencies
-    listings = (session.query(Listing.sale_price, Listing.rental_price, Agency.name.label("agency_name"))
-                .join(Agency, Listing.agency_id == Agency.agency_id)
-                .filter(Listing.property_id == property_data.property_id)
-                .all())
+    listings = property_listings(session, property_data.property_id)
 
     if not listings:
         print("No listings available for this property.")
@@ -109,7 +123,8 @@ def view_prices_by_registry_number():
         print(f"    Rental Price: {rental_price}")
 
 
-def advanced_search():
+@unit_of_work
+def advanced_search(session):
     """
     Allows searching for properties based on city and price range.
     User can enter:
@@ -122,8 +137,8 @@ def advanced_search():
     city_name = input("Enter the city name to search: ").strip()
 
     # Validate city existence
-    city = session.query(City).filter_by(name=city_name).first()
-    if not city:
+    city_id = find_city_id(session, city_name)
+    if city_id is None:
         print(f"No city found with the name '{city_name}'.")
         return
 
@@ -139,23 +154,7 @@ def advanced_search():
     max_rental_price = float(max_rental_price) if max_rental_price else None
 
     # Query properties matching criteria
-    results = (session.query(Property.property_id,
-                             Property.registry_number,
-                             Property.area_sqm,
-                             Address.street_address,
-                             City.name.label("city"),
-                             func.min(Listing.sale_price).label("cheapest_sale_price"),
-                             func.min(Listing.rental_price).label("cheapest_rental_price"))
-               .join(Address, Property.address_id == Address.address_id)
-               .join(City, Address.city_id == City.city_id)
-               .join(Listing, Property.property_id == Listing.property_id)
-               .filter(Address.city_id == city.city_id)
-               .filter((Listing.sale_price >= min_sale_price if min_sale_price is not None else True) &
-                       (Listing.sale_price <= max_sale_price if max_sale_price is not None else True) &
-                       (Listing.rental_price >= min_rental_price if min_rental_price is not None else True) &
-                       (Listing.rental_price <= max_rental_price if max_rental_price is not None else True))
-               .group_by(Property.property_id)
-               .all())
+    results = search_properties(session, city_id, min_sale_price, max_sale_price, min_rental_price, max_rental_price)
 
     if not results:
         print(f"No properties found in '{city_name}' matching the specified criteria.")
@@ -175,115 +174,152 @@ def advanced_search():
         )
 
 
-from db import session, Owner, Property, Address, Agency, City, Listing
-from sqlalchemy.sql import func
+@unit_of_work
+def full_text_search(session):
+    """
+    Searches addresses, owners, agencies and cities by any words of their names and details.
+    Words match as prefixes, and a single typo is tolerated when nothing matches exactly.
+    """
+    print("\n--- Full-Text Search ---")
+    query = input("Enter search words (street, postal code, city, owner, agency...): ").strip()
+    kind = input(f"Limit to one kind ({', '.join(SEARCH_KINDS)}; leave blank for all): ").strip().lower()
+    if kind and kind not in SEARCH_KINDS:
+        print(f"Unknown kind '{kind}'.")
+        return
+
+    results = search(session, query, [kind] if kind else None)
+    if not results:
+        print(f"Nothing found for '{query}'.")
+        return
+
+    print(f"\nBest matches for '{query}':")
+    for result in results:
+        print(f"  {result.kind.capitalize()} ID: {result.entity_id}, {result.name}"
+              + (f" ({result.detail})" if result.detail else ""))
 
 
-def show_all_owners_with_properties():
+@unit_of_work
+def nearby_search(session):
+    """
+    Finds properties within a radius of a location, nearest first, with the same optional
+    price filters as the advanced search. Only addresses with coordinates can be found.
+    """
+    print("\n--- Search Near a Location ---")
+    try:
+        latitude, longitude = parse_coordinates(input("Enter the location as 'latitude, longitude': "))
+        if latitude is None:
+            print("A location is required.")
+            return
+        radius_km = float(input("Enter the search radius in km: ").strip())
+    except ValueError as e:
+        print(f"Invalid input: {e}")
+        return
+
+    # Get optional price filters
+    min_sale_price = input("Enter minimum sale price (leave blank for no minimum): ").strip()
+    max_sale_price = input("Enter maximum sale price (leave blank for no maximum): ").strip()
+    min_rental_price = input("Enter minimum rental price (leave blank for no minimum): ").strip()
+    max_rental_price = input("Enter maximum rental price (leave blank for no maximum): ").strip()
+
+    min_sale_price = float(min_sale_price) if min_sale_price else None
+    max_sale_price = float(max_sale_price) if max_sale_price else None
+    min_rental_price = float(min_rental_price) if min_rental_price else None
+    max_rental_price = float(max_rental_price) if max_rental_price else None
+
+    try:
+        results = properties_near(session, latitude, longitude, radius_km, min_sale_price, max_sale_price,
+                                  min_rental_price, max_rental_price)
+    except ValueError as e:
+        print(f"Invalid input: {e}")
+        return
+
+    if not results:
+        print(f"No properties found within {radius_km:g} km matching the specified criteria.")
+        return
+
+    print(f"\nProperties within {radius_km:g} km, nearest first:")
+    for property in results:
+        cheapest_sale = property.cheapest_sale_price if property.cheapest_sale_price else "N/A"
+        cheapest_rental = property.cheapest_rental_price if property.cheapest_rental_price else "N/A"
+
+        print(
+            f"Property ID: {property.property_id}, Registry Number: {property.registry_number}\n"
+            f"  Address: {property.street_address}, {property.city} ({property.distance_km:.2f} km)\n"
+            f"  Cheapest Sale Price: {cheapest_sale}\n"
+            f"  Cheapest Rental Price: {cheapest_rental}\n"
+        )
+
+
+@unit_of_work
+def show_all_owners_with_properties(session, page_size=None):
     """
     Displays all owners and their associated properties.
 
     Includes:
     - Owner Name & Phone Number
     - List of Properties (Registry Number, Address, City, Area)
+
+    Rows are streamed in owner order and grouped as they arrive, one page at a time.
     """
     print("\n--- All Owners and Their Properties ---")
 
-    # Query all owners with their associated properties, addresses, and cities
-    owners = (
-        session.query(Owner, Property, Address, City)
-        .join(Property, Owner.owner_id == Property.owner_id)
-        .join(Address, Property.address_id == Address.address_id)
-        .join(City, Address.city_id == City.city_id)
-        .all()
-    )
-
-    if not owners:
+    current_owner_id = None
+
+    # Print an owner header whenever the owner changes
+    rows = stream_report_rows(owner_properties_query(session), (Property.owner_id, Property.property_id),
+                              lambda row: (row.owner_id, row.property_id), _page_size(page_size), next_page_prompt)
+    for row in rows:
+        if row.owner_id != current_owner_id:
+            current_owner_id = row.owner_id
+            print(f"\nOwner ID: {row.owner_id}, Name: {row.first_name} {row.last_name}, "
+                  f"Phone: {row.phone_number}")
+            print("  Properties:")
+        print(f"    Registry Number: {row.registry_number}")
+        print(f"      Address: {row.street_address}, City: {row.city}")
+        print(f"      Area: {row.area_sqm} sqm")
+
+    if current_owner_id is None:
         print("No owners or properties found.")
-        return
 
-    owner_properties = {}
-
-    # Organizing data by owner
-    for owner, property, address, city in owners:
-        if owner.owner_id not in owner_properties:
-            owner_properties[owner.owner_id] = {
-                "owner_name": f"{owner.first_name} {owner.last_name}",
-                "phone_number": owner.phone_number,
-                "properties": []
-            }
-        owner_properties[owner.owner_id]["properties"].append({
-            "registry_number": property.registry_number,
-            "street_address": address.street_address,
-            "city": city.name,
-            "area_sqm": property.area_sqm
-        })
-
-    # Display all owners and their properties
-    for owner_id, owner_info in owner_properties.items():
-        print(f"\nOwner ID: {owner_id}, Name: {owner_info['owner_name']}, Phone: {owner_info['phone_number']}")
-        print("  Properties:")
-        for property in owner_info["properties"]:
-            print(f"    Registry Number: {property['registry_number']}")
-            print(f"      Address: {property['street_address']}, City: {property['city']}")
-            print(f"      Area: {property['area_sqm']} sqm")
-
-
-def show_all_properties_by_agency():
+
+@unit_of_work
+def show_all_properties_by_agency(session, page_size=None):
     """
     Displays all properties managed by real estate agencies.
 
     Includes:
     - Agency Name
     - List of Properties (Registry Number, Address, City, Sale & Rental Prices)
+
+    Rows are streamed in agency order and grouped as they arrive, one page at a time.
     """
     print("\n--- All Properties by Agency ---")
 
-    # Query all agencies along with their listed properties
-    agencies = (session.query(Agency, Property, Address, City, Listing.sale_price, Listing.rental_price)
-                .join(Listing, Agency.agency_id == Listing.agency_id)
-                .join(Property, Listing.property_id == Property.property_id)
-                .join(Address, Property.address_id == Address.address_id)
-                .join(City, Address.city_id == City.city_id)
-                .all())
-
-    if not agencies:
+    current_agency_id = None
+
+    # Print an agency header whenever the agency changes
+    rows = stream_report_rows(agency_listings_query(session), (Listing.agency_id, Listing.listing_id),
+                              lambda row: (row.agency_id, row.listing_id), _page_size(page_size), next_page_prompt)
+    for row in rows:
+        if row.agency_id != current_agency_id:
+            current_agency_id = row.agency_id
+            print(f"\nAgency: {row.agency_name} (ID: {row.agency_id})")
+            print("  Properties:")
+
+        price_per_sqm = (round(row.sale_price / row.area_sqm, 2)
+                         if row.sale_price and row.area_sqm > 0 else "N/A")
+        print(f"    Registry Number: {row.registry_number}")
+        print(f"      Address: {row.street_address}, City: {row.city}")
+        print(f"      Area: {row.area_sqm} sqm")
+        print(f"      Sale Price: {row.sale_price or 'N/A'} || ({price_per_sqm} per sqm)")
+        print(f"      Rental Price: {row.rental_price or 'N/A'}")
+
+    if current_agency_id is None:
         print("No agencies or properties found.")
-        return
 
-    agency_properties = {}
-
-    # Organizing data by agency
-    for agency, property, address, city, sale_price, rental_price in agencies:
-        if agency.agency_id not in agency_properties:
-            agency_properties[agency.agency_id] = {
-                "agency_name": agency.name,
-                "properties": []
-            }
-        agency_properties[agency.agency_id]["properties"].append({
-            "registry_number": property.registry_number,
-            "street_address": address.street_address,
-            "city": city.name,
-            "area_sqm": property.area_sqm,
-            "sale_price": sale_price,
-            "rental_price": rental_price,
-            "price_per_sqm": (round(sale_price / property.area_sqm, 2)
-                              if sale_price and property.area_sqm > 0 else "N/A"),
-        })
-
-    # Display all agencies and their listed properties
-    for agency_id, agency_info in agency_properties.items():
-        print(f"\nAgency: {agency_info['agency_name']} (ID: {agency_id})")
-        print("  Properties:")
-        for property in agency_info["properties"]:
-            print(f"    Registry Number: {property['registry_number']}")
-            print(f"      Address: {property['street_address']}, City: {property['city']}")
-            print(f"      Area: {property['area_sqm']} sqm")
-            print(f"      Sale Price: {property['sale_price'] or 'N/A'} || ({property['price_per_sqm']} per sqm)")
-            print(f"      Rental Price: {property['rental_price'] or 'N/A'}")
-
-
-def show_all_properties():
+
+@unit_of_work
+def show_all_properties(session, page_size=None):
     """
     Displays all properties in the database.
 
@@ -293,33 +329,27 @@ def show_all_properties():
     - Area (sqm)
     - Minimum Sale Price & Rental Price
     - Sale Price per Square Meter (if applicable)
+
+    Rows are streamed in property order, one page at a time.
     """
     print("\n--- All Properties ---")
 
-    # Query all properties with their associated address, city, and price details
-    properties = (session.query(Property,
-                                Address,
-                                City,
-                                func.min(Listing.sale_price).label("sale_price"),
-                                func.min(Listing.rental_price).label("rental_price"))
-                  .join(Address, Property.address_id == Address.address_id)
-                  .join(City, Address.city_id == City.city_id)
-                  .outerjoin(Listing, Property.property_id == Listing.property_id)
-                  .group_by(Property.property_id)
-                  .all())
-
-    if not properties:
-        print("No properties found.")
-        return
+    found = False
 
     # Display all properties
-    for property, address, city, sale_price, rental_price in properties:
-        price_per_sqm = (f"{round(sale_price / property.area_sqm, 2)} per sqm"
-                         if sale_price and property.area_sqm > 0
+    rows = stream_report_rows(properties_query(session), (Property.property_id,),
+                              lambda row: (row.property_id,), _page_size(page_size), next_page_prompt)
+    for row in rows:
+        found = True
+        price_per_sqm = (f"{round(row.sale_price / row.area_sqm, 2)} per sqm"
+                         if row.sale_price and row.area_sqm > 0
                          else "N/A")
 
-        print(f"\nRegistry Number: {property.registry_number}")
-        print(f"  Address: {address.street_address}, City: {city.name}, Postal Code: {address.postal_code}")
-        print(f"  Area: {property.area_sqm} sqm")
-        print(f"  Sale Price: {sale_price or 'N/A'} || ({price_per_sqm})")
-        print(f"  Rental Price: {rental_price or 'N/A'}")
+        print(f"\nRegistry Number: {row.registry_number}")
+        print(f"  Address: {row.street_address}, City: {row.city}, Postal Code: {row.postal_code}")
+        print(f"  Area: {row.area_sqm} sqm")
+        print(f"  Sale Price: {row.sale_price or 'N/A'} || ({price_per_sqm})")
+        print(f"  Rental Price: {row.rental_price or 'N/A'}")
+
+    if not found:
+        print("No properties found.")
@@ -1,83 +1,105 @@
-from db import session, Owner, Property, Address, Agency, City, Listing
+from db import unit_of_work
+from picker import pick, OWNERS, PROPERTIES, LISTINGS, AGENCIES
+from services import delete_owner, delete_property, delete_listing, delete_agency_listings, count_agency_listings, \
+    find_agency, NotFoundError
 
 
-def remove_owner():
+@unit_of_work
+def remove_owner(session):
     """
     Owner record is removed with coresponding property and address records.
     """
     print("\n--- Remove Owner ---")
-    owners = session.query(Owner).all()
-    if not owners:
-        print("No owners found.")
+    owner_id = pick(session, OWNERS, "remove")
+    if owner_id is None:
         return
 
-    for owner in owners:
-        print(f"Owner ID: {owner.owner_id}, Name: {owner.first_name} {owner.last_name}")
-
-    owner_id = input("Enter the ID of the owner to remove: ")
-    selected_owner = session.query(Owner).filter_by(owner_id=owner_id).first()
-    if not selected_owner:
+    try:
+        owner_id = int(owner_id)
+    except ValueError:
+        print("Invalid input. Please enter a valid numeric Owner ID.")
+        return
+    # delete_owner() looks the owner up itself
+    try:
+        removed = delete_owner(session, owner_id)
+    except NotFoundError:
         print("Owner not found.")
         return
-
-    properties = session.query(Property).filter_by(owner_id=owner_id).all()
-    for property in properties:
-        session.query(Listing).filter_by(property_id=property.property_id).delete()
-        session.query(Address).filter_by(address_id=property.address_id).delete()
-        session.delete(property)
-
-    session.delete(selected_owner)
     session.commit()
-    print("Owner and all associated properties removed successfully!")
+    print(f"Owner and all {removed} associated properties removed successfully!")
 
 
-def remove_property():
+@unit_of_work
+def remove_property(session):
     """
     Removes property record with address. City record is left.
     """
     print("\n--- Remove Property ---")
-    properties = session.query(Property).all()
-    if not properties:
-        print("No properties found.")
+    property_id = pick(session, PROPERTIES, "remove")
+    if property_id is None:
         return
 
-    for property in properties:
-        print(f"Property ID: {property.property_id}, Registry Number: {property.registry_number}")
-
-    property_id = input("Enter the ID of the property to remove: ")
-    selected_property = session.query(Property).filter_by(property_id=property_id).first()
-    if not selected_property:
+    try:
+        property_id = int(property_id)
+    except ValueError:
+        print("Invalid input. Please enter a valid numeric Property ID.")
+        return
+    try:
+        delete_property(session, property_id)
+    except NotFoundError:
         print("Property not found.")
         return
-
-    session.query(Listing).filter_by(property_id=property_id).delete()
-
-    session.query(Address).filter_by(address_id=selected_property.address_id).delete()
-
-    session.delete(selected_property)
     session.commit()
     print("Property and associated listings removed successfully!")
 
 
-def remove_listing():
+@unit_of_work
+def remove_listing(session):
     """
     Listing record is removed.
     """
     print("\n--- Remove Listing ---")
-    listings = session.query(Listing).all()
-    if not listings:
-        print("No listings found.")
+    listing_id = pick(session, LISTINGS, "remove")
+    if listing_id is None:
         return
 
-    for listing in listings:
-        print(f"Listing ID: {listing.listing_id}, Property ID: {listing.property_id}, Agency ID: {listing.agency_id}")
-
-    listing_id = input("Enter the ID of the listing to remove: ")
-    selected_listing = session.query(Listing).filter_by(listing_id=listing_id).first()
-    if not selected_listing:
+    try:
+        listing_id = int(listing_id)
+    except ValueError:
+        print("Invalid input. Please enter a valid numeric Listing ID.")
+        return
+    try:
+        delete_listing(session, listing_id)
+    except NotFoundError:
         print("Listing not found.")
         return
+    session.commit()
+    print("Listing removed successfully!")
+
+
+@unit_of_work
+def remove_agency_listings(session):
+    """
+    All listings of an agency are removed at once. The agency record is left.
+    """
+    print("\n--- Remove Agency Listings ---")
+    agency_id = pick(session, AGENCIES, "remove the listings of")
+    if agency_id is None:
+        return
+
+    selected_agency = find_agency(session, agency_id)
+    if not selected_agency:
+        print("Agency not found.")
+        return
+
+    count = count_agency_listings(session, selected_agency.agency_id)
+    if not count:
+        print(f"{selected_agency.name} has no listings.")
+        return
+    if input(f"Remove all {count} listings of {selected_agency.name}? (yes/no): ").strip().lower() != "yes":
+        print("No listings removed.")
+        return
 
-    session.delete(selected_listing)
+    removed = delete_agency_listings(session, selected_agency.agency_id)
     session.commit()
-    print("Listing removed successfully!")
\ No newline at end of file
+    print(f"{removed} listings removed successfully!")
@@ -0,0 +1,134 @@
+"""
+Spatial index over address coordinates with the SQLite R*Tree module.
+
+address_locations holds one zero-size box per address that has both a latitude and a longitude,
+keyed by address_id. Triggers on addresses keep it in sync. Proximity queries first select the
+addresses inside a bounding box through the R*Tree, then filter them by great-circle distance.
+
+R*Tree stores coordinates as 32-bit floats rounded outwards, so the box match can include points
+a fraction of a metre outside it. The exact latitude and longitude columns are used for the
+distance filter.
+"""
+import argparse
+import math
+
+from sqlalchemy import text
+from sqlalchemy.sql import table, column
+
+from db import engine, replace_stale_objects
+from schema_objects import GEO_LOCATION_OF_NEW, GEO_HAS_LOCATION, GEO_OBJECTS
+
+# Mean Earth radius used for great-circle distances
+EARTH_RADIUS_KM = 6371.0088
+
+# Length of one degree of latitude, and of longitude at the equator
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+address_locations = table("address_locations", column("id"), column("min_lat"), column("max_lat"),
+                          column("min_lon"), column("max_lon"))
+
+
+def _reindex(connection):
+    """
+    Replaces every box with one per located address. Returns the number of addresses indexed.
+    """
+    connection.execute(text("DELETE FROM address_locations"))
+    connection.execute(text(f"INSERT INTO address_locations SELECT {GEO_LOCATION_OF_NEW} "
+                            f"FROM addresses AS new WHERE {GEO_HAS_LOCATION}"))
+    return connection.execute(text("SELECT count(*) FROM address_locations")).scalar()
+
+
+def rebuild_geo_index(bind=engine):
+    """
+    Creates or replaces the spatial index and its triggers as needed and re-indexes every located
+    address. Returns the number of addresses indexed.
+    """
+    with bind.begin() as connection:
+        replace_stale_objects(connection, GEO_OBJECTS)
+        return _reindex(connection)
+
+
+def ensure_geo_index(bind=engine):
+    """
+    Builds the index when it or any of its triggers is missing or differs from its statement in
+    schema_objects, e.g. for databases created before it was introduced or changed, or whose tables
+    were recreated.
+    """
+    with bind.begin() as connection:
+        if not replace_stale_objects(connection, GEO_OBJECTS):
+            return
+        count = _reindex(connection)
+    print(f"Spatial index built with {count} entries.")
+
+
+def validate_coordinates(latitude, longitude):
+    """
+    Raises ValueError unless both are given and within range, or both are None.
+    """
+    if latitude is None and longitude is None:
+        return
+    if latitude is None or longitude is None:
+        raise ValueError("Latitude and longitude must be given together.")
+    if not -90 <= latitude <= 90:
+        raise ValueError("Latitude must be between -90 and 90.")
+    if not -180 <= longitude <= 180:
+        raise ValueError("Longitude must be between -180 and 180.")
+
+
+def parse_coordinates(value):
+    """
+    Parses "latitude, longitude" in degrees into a validated (latitude, longitude) pair;
+    a blank value gives (None, None). Raises ValueError for anything else.
+    """
+    if not value or not value.strip():
+        return None, None
+    parts = value.replace(";", ",").split(",")
+    if len(parts) != 2:
+        raise ValueError("Enter coordinates as 'latitude, longitude'.")
+    latitude, longitude = float(parts[0]), float(parts[1])
+    validate_coordinates(latitude, longitude)
+    return latitude, longitude
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    (south, west, north, east) of a box containing every point within radius_km of the centre.
+    Clamped to valid coordinates; boxes are not wrapped across the antimeridian.
+    """
+    latitude_delta = radius_km / KM_PER_DEGREE
+    south, north = max(-90.0, latitude - latitude_delta), min(90.0, latitude + latitude_delta)
+    # Longitude degrees are shortest at the box edge furthest from the equator
+    widest = max(abs(south), abs(north))
+    if widest >= 90:
+        return south, -180.0, north, 180.0
+    longitude_delta = min(180.0, latitude_delta / math.cos(math.radians(widest)))
+    return south, max(-180.0, longitude - longitude_delta), north, min(180.0, longitude + longitude_delta)
+
+
+def haversine_km(latitude1, longitude1, latitude2, longitude2):
+    """
+    Great-circle distance between two points in kilometres.
+    """
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    half_dphi = (phi2 - phi1) / 2
+    half_dlambda = math.radians(longitude2 - longitude1) / 2
+    a = math.sin(half_dphi) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(half_dlambda) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def within_box(south, west, north, east):
+    """
+    Conditions on address_locations selecting the points inside the box. Entries overlapping the box
+    are matched rather than contained in it, so points whose rounded-out entry crosses an edge are kept.
+    """
+    return [address_locations.c.max_lat >= south, address_locations.c.min_lat <= north,
+            address_locations.c.max_lon >= west, address_locations.c.min_lon <= east]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the spatial index of address coordinates.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("rebuild")
+    args = parser.parse_args()
+
+    print(f"Spatial index rebuilt with {rebuild_geo_index()} entries.")
@@ -1,6 +1,32 @@
 from menu import process_menu
-from db import initialize_database
+from db import initialize_database, schema_fingerprint, schema_is_current, mark_schema_current
+from schema_objects import DERIVED_OBJECTS
+
+# What prepare_database() creates; changing any of it makes the next start initialize the database again
+SCHEMA_FINGERPRINT = schema_fingerprint(*DERIVED_OBJECTS.values())
+
+
+def prepare_database():
+    """
+    Creates any missing tables, columns, indexes, triggers and derived data, then records the schema
+    as current. When nothing changed since the last start this is a single query, and the modules
+    that create the derived data are not even imported.
+    """
+    if schema_is_current(SCHEMA_FINGERPRINT):
+        return
+    from price_summary import ensure_price_summary
+    from search_index import ensure_search_index
+    from geo_search import ensure_geo_index
+    from price_history import ensure_price_history
 
-if __name__ == "__main__":
     initialize_database()
+    ensure_price_summary()
+    ensure_search_index()
+    ensure_geo_index()
+    ensure_price_history()
+    mark_schema_current(SCHEMA_FINGERPRINT)
+
+
+if __name__ == "__main__":
+    prepare_database()
     process_menu()
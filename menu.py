@@ -1,9 +1,5 @@
-from features_add import add_owner, add_property, add_agency, add_listing
-from features_edit import edit_owner, edit_agency, edit_listing, edit_city, edit_address, edit_property
-from features_read import (search_properties_by_city, view_prices_by_registry_number, advanced_search,
-                           show_all_owners_with_properties, show_all_properties_by_agency,
-                           show_all_properties)
-from features_remove import remove_owner, remove_property, remove_listing
+# Feature modules are imported by the menu loops that use them, on first use, so starting the
+# application does not load every screen (and NumPy and PyArrow with them) up front
 
 
 def process_menu():
@@ -23,6 +19,8 @@ def process_menu():
         elif choice == "4":
             process_menu_read()
         elif choice == "5":
+            process_menu_maintenance()
+        elif choice == "6":
             print("Goodbye!")
             break
         else:
@@ -38,7 +36,8 @@ def main_menu():
     print("2. Edit Menu...")
     print("3. Remove Menu...")
     print("4. Read Menu...")
-    print("5. Exit")
+    print("5. Maintenance Menu...")
+    print("6. Exit")
 
 
 def add_menu():
@@ -64,7 +63,8 @@ def edit_menu():
     print("4. Edit Listing")
     print("5. Edit Address")
     print("6. Edit City")
-    print("7. Return to Main Menu")
+    print("7. Bulk Reprice Listings")
+    print("8. Return to Main Menu")
 
 
 def remove_menu():
@@ -75,7 +75,8 @@ def remove_menu():
     print("1. Remove Owner")
     print("2. Remove Property")
     print("3. Remove Listing")
-    print("4. Return to Main Menu")
+    print("4. Remove All Listings of an Agency")
+    print("5. Return to Main Menu")
 
 
 def read_menu():
@@ -86,8 +87,27 @@ def read_menu():
     print("1. Search properties by city")
     print("2. View prices by registry number")
     print("3. Advanced search")
-    print("4. Show all properties by category")
-    print("5. Return to Main Menu")
+    print("4. Full-text search")
+    print("5. Search near a location")
+    print("6. Market statistics")
+    print("7. Price history")
+    print("8. Show all properties by category")
+    print("9. Return to Main Menu")
+
+
+def maintenance_menu():
+    """
+    Displays the maintenance menu options.
+    """
+    print("\nMaintenance Menu:")
+    print("1. Rebuild price summary")
+    print("2. Check price summary consistency")
+    print("3. Bulk import from CSV/JSONL file")
+    print("4. Export property catalog")
+    print("5. Query cache statistics")
+    print("6. Compact price history")
+    print("7. SQL statistics")
+    print("8. Return to Main Menu")
 
 
 def show_all_menu():
@@ -98,13 +118,17 @@ def show_all_menu():
     print("1. Agency")
     print("2. Property")
     print("3. Owners")
-    print("4. Return to Read Menu")
+    print("4. Set page size")
+    print("5. Return to Read Menu")
 
 
 def process_all_read():
     """
     Handles the user's selection for viewing all properties by category.
     """
+    from features_read import (show_all_owners_with_properties, show_all_properties_by_agency, show_all_properties,
+                               set_report_page_size)
+
     while True:
         show_all_menu()
 
@@ -116,6 +140,8 @@ def process_all_read():
         elif choice == "3":
             show_all_owners_with_properties()
         elif choice == "4":
+            set_report_page_size()
+        elif choice == "5":
             print("Returning to Read Menu...")
             break
         else:
@@ -126,6 +152,8 @@ def process_menu_add():
     """
     Handles user actions in the add menu.
     """
+    from features_add import add_owner, add_property, add_agency, add_listing
+
     while True:
         add_menu()
 
@@ -149,6 +177,9 @@ def process_menu_edit():
     """
     Handles user actions in the edit menu.
     """
+    from features_edit import edit_owner, edit_agency, edit_listing, edit_city, edit_address, edit_property
+    from bulk_reprice import bulk_reprice_menu
+
     while True:
         edit_menu()
 
@@ -166,6 +197,8 @@ def process_menu_edit():
         elif choice == "6":
             edit_city()
         elif choice == "7":
+            bulk_reprice_menu()
+        elif choice == "8":
             print("Returning to Main Menu...")
             break
         else:
@@ -176,6 +209,8 @@ def process_menu_remove():
     """
     Handles user actions in the remove menu.
     """
+    from features_remove import remove_owner, remove_property, remove_listing, remove_agency_listings
+
     while True:
         remove_menu()
 
@@ -187,6 +222,8 @@ def process_menu_remove():
         elif choice == "3":
             remove_listing()
         elif choice == "4":
+            remove_agency_listings()
+        elif choice == "5":
             print("Returning to Main Menu...")
             break
         else:
@@ -197,6 +234,11 @@ def process_menu_read():
     """
     Handles user actions in the read menu.
     """
+    from features_read import (search_properties_by_city, view_prices_by_registry_number, advanced_search,
+                               full_text_search, nearby_search)
+    from analytics import market_statistics_menu
+    from price_history import price_trend_menu
+
     while True:
         read_menu()
 
@@ -208,8 +250,52 @@ def process_menu_read():
         elif choice == "3":
             advanced_search()
         elif choice == "4":
+            full_text_search()
+        elif choice == "5":
+            nearby_search()
+        elif choice == "6":
+            market_statistics_menu()
+        elif choice == "7":
+            price_trend_menu()
+        elif choice == "8":
             process_all_read()
+        elif choice == "9":
+            print("Returning to Main Menu...")
+            break
+        else:
+            print("Invalid choice. Please try again.")
+
+
+def process_menu_maintenance():
+    """
+    Handles user actions in the maintenance menu.
+    """
+    from price_summary import rebuild_summary_menu, check_summary_menu
+    from bulk_import import bulk_import_menu
+    from bulk_export import bulk_export_menu
+    from query_cache import query_cache_menu
+    from price_history import compact_history_menu
+    from sql_stats import sql_stats_menu
+
+    while True:
+        maintenance_menu()
+
+        choice = input("Choose an option: ")
+        if choice == "1":
+            rebuild_summary_menu()
+        elif choice == "2":
+            check_summary_menu()
+        elif choice == "3":
+            bulk_import_menu()
+        elif choice == "4":
+            bulk_export_menu()
         elif choice == "5":
+            query_cache_menu()
+        elif choice == "6":
+            compact_history_menu()
+        elif choice == "7":
+            sql_stats_menu()
+        elif choice == "8":
             print("Returning to Main Menu...")
             break
         else:
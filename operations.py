@@ -0,0 +1,183 @@
+"""
+The application's operations as plain function calls, for scripts, bulk jobs and other Python code:
+no prompts and no printing. Every function runs in its own unit of work (committed when it returns)
+and returns the record namedtuples of services.py, IDs or counts, never ORM objects, so results
+stay valid after the session is gone and can be cached, pickled or sent between threads.
+
+    import operations
+    for property in operations.search_by_city("Vilnius") or []:
+        print(property.registry_number, property.average_sale_price)
+
+Unknown IDs raise services.NotFoundError and invalid arguments ValueError. To run several
+operations in one transaction, call the services.py functions with a session from
+db.session_scope() instead.
+"""
+import services
+from db import unit_of_work
+from search_index import search
+
+
+# Reads
+
+@unit_of_work
+def search_by_city(session, city_name):
+    """
+    PropertySummary records of a city's properties, or None if the city does not exist.
+    """
+    return services.search_by_city(session, city_name)
+
+
+@unit_of_work
+def prices_by_registry_number(session, registry_number):
+    """
+    (PropertyDetails, [ListingPrice]) for a registry number, or None if no such property exists.
+    """
+    return services.prices_by_registry_number(session, registry_number)
+
+
+@unit_of_work
+def advanced_search(session, city_name, min_sale_price=None, max_sale_price=None,
+                    min_rental_price=None, max_rental_price=None):
+    """
+    PricedProperty records of a city's properties within the price ranges, or None if the city
+    does not exist.
+    """
+    return services.advanced_search(session, city_name, min_sale_price, max_sale_price,
+                                    min_rental_price, max_rental_price)
+
+
+@unit_of_work
+def nearby_search(session, latitude, longitude, radius_km, min_sale_price=None, max_sale_price=None,
+                  min_rental_price=None, max_rental_price=None, limit=None):
+    """
+    NearbyProperty records within radius_km of a point, nearest first.
+    """
+    return services.properties_near(session, latitude, longitude, radius_km, min_sale_price, max_sale_price,
+                                    min_rental_price, max_rental_price, limit)
+
+
+@unit_of_work
+def full_text_search(session, query, kinds=None, limit=20):
+    """
+    SearchResult records of the entities matching the query, best match first.
+    """
+    return search(session, query, kinds, limit)
+
+
+# Writes
+
+@unit_of_work
+def add_owner(session, first_name, last_name, phone_number):
+    """
+    Adds an owner and returns their ID.
+    """
+    return services.create_owner(session, first_name, last_name, phone_number).owner_id
+
+
+@unit_of_work
+def add_property(session, owner_id, street_address, postal_code, city_name, area_sqm, registry_number,
+                 latitude=None, longitude=None):
+    """
+    Adds a property with its address, creating the city if needed, and returns its ID.
+    """
+    return services.create_property(session, owner_id, street_address, postal_code, city_name, area_sqm,
+                                    registry_number, latitude, longitude).property_id
+
+
+@unit_of_work
+def add_agency(session, name, company_code):
+    """
+    Adds an agency and returns its ID. Raises ValueError if the company code is taken.
+    """
+    return services.create_agency(session, name, company_code).agency_id
+
+
+@unit_of_work
+def add_listing(session, property_id, agency_id, sale_price=None, rental_price=None):
+    """
+    Adds a listing and returns its ID. Raises ValueError if no price is given.
+    """
+    listing = services.create_listing(session, property_id, agency_id, sale_price, rental_price)
+    session.flush()
+    return listing.listing_id
+
+
+@unit_of_work
+def edit_owner(session, owner_id, first_name=None, last_name=None, phone_number=None):
+    """
+    Changes the given owner fields; None keeps the current value.
+    """
+    services.update_owner(session, owner_id, first_name, last_name, phone_number)
+
+
+@unit_of_work
+def edit_property(session, property_id, area_sqm=None, registry_number=None):
+    """
+    Changes the given property fields; None keeps the current value.
+    """
+    services.update_property(session, property_id, area_sqm, registry_number)
+
+
+@unit_of_work
+def edit_address(session, address_id, street_address=None, postal_code=None, city_name=None,
+                 latitude=None, longitude=None):
+    """
+    Changes the given address fields, creating the city if needed; None keeps the current value.
+    """
+    services.update_address(session, address_id, street_address, postal_code, city_name, latitude, longitude)
+
+
+@unit_of_work
+def edit_listing(session, listing_id, sale_price, rental_price):
+    """
+    Replaces a listing's sale and rental prices.
+    """
+    services.update_listing_prices(session, listing_id, sale_price, rental_price)
+
+
+@unit_of_work
+def edit_agency(session, agency_id, name=None, company_code=None):
+    """
+    Changes the given agency fields; None keeps the current value.
+    """
+    services.update_agency(session, agency_id, name, company_code)
+
+
+@unit_of_work
+def edit_city(session, city_id, name=None):
+    """
+    Renames a city; None keeps the current name.
+    """
+    services.update_city(session, city_id, name)
+
+
+@unit_of_work
+def remove_owner(session, owner_id):
+    """
+    Removes an owner with their properties; returns the number of properties removed.
+    """
+    return services.delete_owner(session, owner_id)
+
+
+@unit_of_work
+def remove_property(session, property_id):
+    """
+    Removes a property with its address and listings.
+    """
+    services.delete_property(session, property_id)
+
+
+@unit_of_work
+def remove_listing(session, listing_id):
+    """
+    Removes a listing.
+    """
+    services.delete_listing(session, listing_id)
+
+
+@unit_of_work
+def remove_agency_listings(session, agency_id):
+    """
+    Removes every listing of an agency; returns the number removed.
+    """
+    return services.delete_agency_listings(session, agency_id)
@@ -0,0 +1,135 @@
+"""
+Shared entity picker for the add, edit and remove screens.
+
+A picker shows one page of rows at a time and asks for the ID of the row to act on. Pages are
+keyset queries (WHERE sort key > last key ... LIMIT page size) over the columns the picker displays,
+so every page costs the same however large the table is. Typing "/text" narrows the list to rows
+whose filter column (last name, registry number, company code...) starts with the text; the prefix
+becomes an index range and the rows are paged in filter column order, which that index provides.
+"""
+import os
+from collections import namedtuple
+
+from sqlalchemy import tuple_
+
+from db import Owner, Property, Address, Agency, City, Listing
+
+# Rows a picker shows per page
+PICKER_PAGE_SIZE = int(os.environ.get("REAL_ESTATE_PICKER_PAGE_SIZE", "20"))
+
+Picker = namedtuple("Picker", ["label", "plural", "key", "columns", "joins", "filter_column", "filter_label",
+                               "format"])
+
+OWNERS = Picker(
+    "owner", "owners", Owner.owner_id,
+    (Owner.owner_id, Owner.first_name, Owner.last_name, Owner.phone_number), (),
+    Owner.last_name, "last name",
+    lambda row: f"Owner ID: {row.owner_id}, Name: {row.first_name} {row.last_name}, Phone: {row.phone_number}")
+
+PROPERTIES = Picker(
+    "property", "properties", Property.property_id,
+    (Property.property_id, Property.registry_number, Property.area_sqm), (),
+    Property.registry_number, "registry number",
+    lambda row: f"Property ID: {row.property_id}, Registry Number: {row.registry_number}, "
+                f"Area: {row.area_sqm} sqm")
+
+ADDRESSES = Picker(
+    "address", "addresses", Address.address_id,
+    (Address.address_id, Address.street_address, City.name.label("city"), Address.postal_code),
+    ((City, Address.city_id == City.city_id),),
+    Address.street_address, "street address",
+    lambda row: f"Address ID: {row.address_id}, Street: {row.street_address}, City: {row.city}, "
+                f"Postal Code: {row.postal_code}")
+
+LISTINGS = Picker(
+    "listing", "listings", Listing.listing_id,
+    (Listing.listing_id, Property.registry_number, Listing.property_id, Listing.agency_id, Listing.sale_price,
+     Listing.rental_price),
+    ((Property, Listing.property_id == Property.property_id),),
+    Property.registry_number, "property registry number",
+    lambda row: f"Listing ID: {row.listing_id}, Property ID: {row.property_id} ({row.registry_number}), "
+                f"Agency ID: {row.agency_id}, Sale Price: {row.sale_price}, Rental Price: {row.rental_price}")
+
+AGENCIES = Picker(
+    "agency", "agencies", Agency.agency_id,
+    (Agency.agency_id, Agency.name, Agency.company_code), (),
+    Agency.company_code, "company code",
+    lambda row: f"Agency ID: {row.agency_id}, Name: {row.name}, Company Code: {row.company_code}")
+
+CITIES = Picker(
+    "city", "cities", City.city_id,
+    (City.city_id, City.name), (),
+    City.name, "name",
+    lambda row: f"City ID: {row.city_id}, Name: {row.name}")
+
+
+def _sort_columns(picker, prefix):
+    return (picker.filter_column, picker.key) if prefix else (picker.key,)
+
+
+def picker_page(session, picker, prefix=None, after=None, limit=PICKER_PAGE_SIZE):
+    """
+    Up to `limit` rows of the picker's columns after the sort key `after` (a tuple from sort_key()),
+    optionally only those whose filter column starts with `prefix` (case-sensitive).
+    """
+    query = session.query(*picker.columns)
+    for target, condition in picker.joins:
+        query = query.join(target, condition)
+
+    sort_columns = _sort_columns(picker, prefix)
+    if prefix:
+        # A range rather than LIKE, so the filter column's index is used whatever the collation settings
+        upper_bound = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        query = query.filter(picker.filter_column >= prefix, picker.filter_column < upper_bound)
+    if after is not None:
+        query = query.filter(tuple_(*sort_columns) > tuple_(*after))
+        if prefix:
+            # Also starts the index range at the last page's value rather than at the prefix
+            query = query.filter(picker.filter_column >= after[0])
+    return query.order_by(*sort_columns).limit(limit).all()
+
+
+def sort_key(picker, row, prefix=None):
+    """
+    Values of the picker's sort columns for a row returned by picker_page().
+    """
+    return tuple(row._mapping[column] for column in _sort_columns(picker, prefix))
+
+
+def pick(session, picker, action, empty_message=None, page_size=None):
+    """
+    Lists the picker's rows a page at a time and asks for the ID of the one to `action` (e.g. "edit").
+    Enter shows the next page, "/text" filters by the start of the filter column ("/" alone clears it)
+    and "q" cancels. Returns the answer as typed, for the caller to look up, or None when cancelled
+    or there is nothing to pick.
+    """
+    page_size = page_size or PICKER_PAGE_SIZE
+    prefix, after, show_page = None, None, True
+    while True:
+        if show_page:
+            rows = picker_page(session, picker, prefix, after, page_size + 1)
+            has_more, rows = len(rows) > page_size, rows[:page_size]
+            if not rows and prefix is None:
+                print(empty_message or f"No {picker.plural} found.")
+                return None
+            if not rows:
+                print(f"No {picker.plural} with a {picker.filter_label} starting with '{prefix}'.")
+            for row in rows:
+                print(picker.format(row))
+
+        more = "Enter for more, " if has_more else ""
+        answer = input(f"Enter the ID of the {picker.label} to {action} "
+                       f"({more}/text to filter by {picker.filter_label}, q to cancel): ").strip()
+        show_page = True
+        if not answer:
+            if not has_more:
+                print(f"No more {picker.plural}.")
+                show_page = False
+                continue
+            after = sort_key(picker, rows[-1], prefix)
+        elif answer.startswith("/"):
+            prefix, after = answer[1:].strip() or None, None
+        elif answer.lower() == "q":
+            return None
+        else:
+            return answer
@@ -0,0 +1,222 @@
+"""
+Listing price history: an append-only log of listing prices with time-bucketed trend queries.
+
+Triggers on listings append a row to listing_price_history whenever a listing is added, has its
+sale or rental price changed, or is removed, whichever code path makes the change. Every row
+records the time, the listing's property, city and agency and its prices at that moment.
+
+The table is kept bounded by compact_price_history(): events older than the raw retention period
+are downsampled to the last event per listing and bucket, and events older than the maximum
+retention period are dropped.
+"""
+import argparse
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.sql import func
+
+from db import engine, session_scope, unit_of_work, replace_stale_objects, ListingPriceHistory
+from schema_objects import HISTORY_EVENTS as EVENTS, HISTORY_NOW, HISTORY_OBJECTS
+from services import find_city_id, find_agency
+
+EVENTS_BY_CODE = {code: event for event, code in EVENTS.items()}
+
+# Bucket widths in seconds for trend queries and downsampling
+BUCKETS = {"hour": 3600, "day": 86400, "week": 7 * 86400}
+
+# Buckets are aligned to this Unix time, a Monday midnight UTC, so that weeks start on Mondays
+BUCKET_ORIGIN = 4 * 86400
+
+# Events younger than this are kept as they are
+RAW_RETENTION_DAYS = 90
+
+# Older events are thinned to the last one per listing and bucket of this width
+DOWNSAMPLE_BUCKET = "week"
+
+# Events older than this are deleted
+MAX_RETENTION_DAYS = 730
+
+PriceBucket = namedtuple("PriceBucket", ["bucket_start", "events", "avg_sale_price", "min_sale_price",
+                                         "max_sale_price", "avg_rental_price"])
+
+HistoryEvent = namedtuple("HistoryEvent", ["ts", "event", "listing_id", "agency_id", "sale_price", "rental_price"])
+
+
+def ensure_price_history(bind=engine):
+    """
+    Creates the history table when missing, and its triggers when missing or different from their
+    statements in schema_objects. When the history is empty, every existing listing is recorded as
+    listed now, so later changes have a starting point.
+    """
+    ListingPriceHistory.__table__.create(bind, checkfirst=True)
+    with bind.begin() as connection:
+        if not replace_stale_objects(connection, HISTORY_OBJECTS):
+            return
+        if connection.execute(text("SELECT 1 FROM listing_price_history LIMIT 1")).first() is None:
+            count = connection.execute(text(
+                f"INSERT INTO listing_price_history(ts, event, listing_id, property_id, city_id, agency_id, "
+                f"sale_price, rental_price) SELECT {HISTORY_NOW}, {EVENTS['listed']}, listings.listing_id, "
+                f"listings.property_id, addresses.city_id, listings.agency_id, listings.sale_price, "
+                f"listings.rental_price FROM listings JOIN properties ON properties.property_id = listings.property_id "
+                f"JOIN addresses ON addresses.address_id = properties.address_id")).rowcount
+            print(f"Price history started with {count} listings.")
+
+
+def _bucket_width(bucket):
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket '{bucket}'; choose one of {', '.join(BUCKETS)}.")
+    return BUCKETS[bucket]
+
+
+def price_trend(session, by, key, start, end=None, bucket="week"):
+    """
+    PriceBuckets of the prices listings were added or repriced at, for a city, agency or property
+    (by = "city", "agency" or "property") between the Unix times start and end (default now).
+    Buckets without events are omitted.
+    """
+    columns = {"city": ListingPriceHistory.city_id, "agency": ListingPriceHistory.agency_id,
+               "property": ListingPriceHistory.property_id}
+    if by not in columns:
+        raise ValueError(f"Unknown grouping '{by}'; choose one of {', '.join(columns)}.")
+    width = _bucket_width(bucket)
+    end = int(time.time()) + 1 if end is None else end
+
+    bucket_start = ((ListingPriceHistory.ts - BUCKET_ORIGIN) // width * width + BUCKET_ORIGIN).label("bucket_start")
+    rows = (session.query(bucket_start,
+                          func.count(),
+                          func.avg(ListingPriceHistory.sale_price),
+                          func.min(ListingPriceHistory.sale_price),
+                          func.max(ListingPriceHistory.sale_price),
+                          func.avg(ListingPriceHistory.rental_price))
+            .filter(columns[by] == key,
+                    ListingPriceHistory.ts >= start,
+                    ListingPriceHistory.ts < end,
+                    ListingPriceHistory.event != EVENTS["removed"])
+            .group_by(bucket_start)
+            .order_by(bucket_start)
+            .all())
+    return [PriceBucket(*row) for row in rows]
+
+
+def property_history(session, property_id):
+    """
+    Every recorded event of the property's listings as HistoryEvents, oldest first.
+    """
+    rows = (session.query(ListingPriceHistory.ts, ListingPriceHistory.event, ListingPriceHistory.listing_id,
+                          ListingPriceHistory.agency_id, ListingPriceHistory.sale_price,
+                          ListingPriceHistory.rental_price)
+            .filter(ListingPriceHistory.property_id == property_id)
+            .order_by(ListingPriceHistory.ts, ListingPriceHistory.history_id)
+            .all())
+    return [HistoryEvent(ts, EVENTS_BY_CODE[event], *rest) for ts, event, *rest in rows]
+
+
+def compact_price_history(bind=engine, raw_days=RAW_RETENTION_DAYS, bucket=DOWNSAMPLE_BUCKET,
+                          max_days=MAX_RETENTION_DAYS, now=None):
+    """
+    Deletes events older than max_days and keeps only the last event per listing and bucket among
+    those older than raw_days. Safe to run repeatedly. Returns (downsampled, expired) row counts.
+    """
+    width = _bucket_width(bucket)
+    now = int(time.time()) if now is None else now
+    raw_cutoff, max_cutoff = now - raw_days * 86400, now - max_days * 86400
+    with bind.begin() as connection:
+        expired = connection.execute(text("DELETE FROM listing_price_history WHERE ts < :cutoff"),
+                                     {"cutoff": max_cutoff}).rowcount
+        # History IDs grow with time, so the highest ID of a listing's bucket is its last event there.
+        # Buckets start at BUCKET_ORIGIN, like those of price_trend(), so a kept event stands for one trend bucket
+        downsampled = connection.execute(text(
+            "DELETE FROM listing_price_history WHERE ts < :cutoff AND history_id NOT IN ("
+            "SELECT max(history_id) FROM listing_price_history WHERE ts < :cutoff "
+            "GROUP BY listing_id, (ts - :origin) / :width)"),
+            {"cutoff": raw_cutoff, "origin": BUCKET_ORIGIN, "width": width}).rowcount
+    return downsampled, expired
+
+
+def _format_day(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")
+
+
+def _print_trend(buckets):
+    first_average = next((row.avg_sale_price for row in buckets if row.avg_sale_price), None)
+    print(f"  {'From':10} {'Events':>7} {'Avg sale':>12} {'Min sale':>12} {'Max sale':>12} {'Avg rent':>10} {'Change':>8}")
+    for row in buckets:
+        change = (f"{(row.avg_sale_price / first_average - 1) * 100:+7.1f}%"
+                  if row.avg_sale_price and first_average else f"{'N/A':>8}")
+        print(f"  {_format_day(row.bucket_start):10} {row.events:7d} "
+              + " ".join(f"{value:12.2f}" if value is not None else f"{'N/A':>12}"
+                         for value in (row.avg_sale_price, row.min_sale_price, row.max_sale_price))
+              + (f" {row.avg_rental_price:10.2f}" if row.avg_rental_price is not None else f" {'N/A':>10}")
+              + f" {change}")
+
+
+@unit_of_work
+def price_trend_menu(session):
+    """
+    Shows how asking prices moved in a city or at an agency over a recent period.
+    """
+    print("\n--- Price History ---")
+    by = input("Show prices for a city or an agency? (city/agency): ").strip().lower()
+    if by == "city":
+        name = input("Enter the city name: ").strip()
+        key = find_city_id(session, name)
+    elif by == "agency":
+        name = input("Enter the agency ID: ").strip()
+        agency = find_agency(session, name)
+        key = agency.agency_id if agency else None
+    else:
+        print("Invalid choice.")
+        return
+    if key is None:
+        print(f"No {by} found for '{name}'.")
+        return
+
+    try:
+        days = int(input("Enter the period in days (default 90): ").strip() or 90)
+        bucket = input(f"Bucket size ({'/'.join(BUCKETS)}, default week): ").strip().lower() or "week"
+        buckets = price_trend(session, by, key, int(time.time()) - days * 86400, bucket=bucket)
+    except ValueError as e:
+        print(f"Invalid input: {e}")
+        return
+
+    if not buckets:
+        print(f"No price changes recorded for {by} '{name}' in the last {days} days.")
+        return
+    print(f"\nAsking prices for {by} '{name}' over the last {days} days, per {bucket}:")
+    _print_trend(buckets)
+
+
+def compact_history_menu():
+    """
+    Runs the retention and downsampling job from the menu.
+    """
+    print("\n--- Compact Price History ---")
+    downsampled, expired = compact_price_history()
+    print(f"Removed {expired} events older than {MAX_RETENTION_DAYS} days and downsampled {downsampled} "
+          f"events older than {RAW_RETENTION_DAYS} days to one per listing and {DOWNSAMPLE_BUCKET}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain and query the listing price history.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compact_parser = subparsers.add_parser("compact")
+    compact_parser.add_argument("--raw-days", type=int, default=RAW_RETENTION_DAYS)
+    compact_parser.add_argument("--bucket", choices=list(BUCKETS), default=DOWNSAMPLE_BUCKET)
+    compact_parser.add_argument("--max-days", type=int, default=MAX_RETENTION_DAYS)
+    trend_parser = subparsers.add_parser("trend")
+    trend_parser.add_argument("by", choices=["city", "agency", "property"])
+    trend_parser.add_argument("id", type=int)
+    trend_parser.add_argument("--days", type=int, default=90)
+    trend_parser.add_argument("--bucket", choices=list(BUCKETS), default="week")
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        downsampled, expired = compact_price_history(raw_days=args.raw_days, bucket=args.bucket,
+                                                     max_days=args.max_days)
+        print(f"Removed {expired} expired and {downsampled} downsampled events.")
+    else:
+        with session_scope() as db_session:
+            _print_trend(price_trend(db_session, args.by, args.id, int(time.time()) - args.days * 86400,
+                                     bucket=args.bucket))
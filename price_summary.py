@@ -0,0 +1,165 @@
+import argparse
+import math
+
+from sqlalchemy import inspect
+from sqlalchemy.sql import func, select, Select
+
+from db import session_scope, engine, Listing, PropertyPriceSummary
+from query_cache import clear_query_cache
+
+# Aggregate columns in the same order as the PropertyPriceSummary columns they fill
+SUMMARY_AGGREGATES = (
+    func.count(Listing.listing_id).label("listing_count"),
+    func.min(Listing.sale_price).label("min_sale_price"),
+    func.avg(Listing.sale_price).label("avg_sale_price"),
+    func.max(Listing.sale_price).label("max_sale_price"),
+    func.min(Listing.rental_price).label("min_rental_price"),
+    func.avg(Listing.rental_price).label("avg_rental_price"),
+    func.max(Listing.rental_price).label("max_rental_price"),
+)
+SUMMARY_COLUMNS = ["property_id"] + [aggregate.name for aggregate in SUMMARY_AGGREGATES]
+
+
+def refresh_property_summary(db_session, property_id):
+    """
+    Recomputes the summary row of one property from its listings.
+    The aggregate is served by the (property_id, sale_price, rental_price) index,
+    so this costs a single index range scan. The caller commits.
+    """
+    stats = (db_session.query(*SUMMARY_AGGREGATES)
+             .filter(Listing.property_id == property_id)
+             .one())
+
+    if not stats.listing_count:
+        discard_property_summaries(db_session, [property_id])
+        return
+
+    db_session.merge(PropertyPriceSummary(property_id=property_id, **stats._asdict()))
+
+
+def id_filter(ids):
+    """
+    IDs for an IN clause: a SELECT of IDs stays a subquery, any other iterable becomes a list.
+    """
+    return ids if isinstance(ids, Select) else list(ids)
+
+
+def discard_property_summaries(db_session, property_ids):
+    """
+    Deletes the summary rows of the given properties (an iterable or a SELECT of IDs). The caller commits.
+    """
+    (db_session.query(PropertyPriceSummary)
+     .filter(PropertyPriceSummary.property_id.in_(id_filter(property_ids)))
+     .delete(synchronize_session=False))
+
+
+def refresh_property_summaries(connection, property_ids, *listing_criteria):
+    """
+    Set-based refresh of many properties at once: one DELETE and one INSERT ... SELECT.
+    property_ids is an iterable or a SELECT of IDs; listing_criteria, if given, limit the listings
+    aggregated, e.g. to leave out listings about to be deleted. Accepts a Session or a Core Connection.
+    The caller commits.
+    """
+    property_ids = id_filter(property_ids)
+    table = PropertyPriceSummary.__table__
+    aggregates = (select(Listing.property_id, *SUMMARY_AGGREGATES)
+                  .where(Listing.property_id.in_(property_ids), *listing_criteria)
+                  .group_by(Listing.property_id))
+    connection.execute(table.delete().where(table.c.property_id.in_(property_ids)))
+    connection.execute(table.insert().from_select(SUMMARY_COLUMNS, aggregates))
+
+
+def rebuild_price_summary(db_session):
+    """
+    Rebuilds the whole summary table from listings with one INSERT ... SELECT.
+    Returns the number of summary rows written.
+    """
+    db_session.query(PropertyPriceSummary).delete(synchronize_session=False)
+    aggregates = (select(Listing.property_id, *SUMMARY_AGGREGATES)
+                  .where(Listing.property_id.isnot(None))
+                  .group_by(Listing.property_id))
+    db_session.execute(PropertyPriceSummary.__table__.insert().from_select(SUMMARY_COLUMNS, aggregates))
+    db_session.commit()
+    clear_query_cache()
+    return db_session.query(func.count(PropertyPriceSummary.property_id)).scalar()
+
+
+def check_price_summary(db_session):
+    """
+    Compares the summary table against a fresh aggregation of listings.
+    Returns the property IDs whose summary row is missing, stale or orphaned.
+    """
+    expected = {row.property_id: row for row in (db_session.query(Listing.property_id, *SUMMARY_AGGREGATES)
+                                                 .filter(Listing.property_id.isnot(None))
+                                                 .group_by(Listing.property_id))}
+    mismatched = []
+    for summary in db_session.query(PropertyPriceSummary).yield_per(10_000):
+        row = expected.pop(summary.property_id, None)
+        if row is None or any(not _same(getattr(summary, aggregate.name), getattr(row, aggregate.name))
+                              for aggregate in SUMMARY_AGGREGATES):
+            mismatched.append(summary.property_id)
+
+    # Whatever is left has listings but no summary row
+    mismatched.extend(expected)
+    return sorted(mismatched)
+
+
+def _same(stored, fresh):
+    """
+    Equality for aggregate values, tolerating float rounding in averages.
+    """
+    if stored is None or fresh is None:
+        return stored is None and fresh is None
+    return math.isclose(stored, fresh, rel_tol=1e-9, abs_tol=1e-6)
+
+
+def ensure_price_summary():
+    """
+    Fills the summary table when it is empty but listings exist,
+    e.g. for databases created before the table was introduced.
+    """
+    if not inspect(engine).has_table(PropertyPriceSummary.__tablename__):
+        return
+    with session_scope() as db_session:
+        has_summary = db_session.query(PropertyPriceSummary.property_id).first() is not None
+        has_listings = db_session.query(Listing.listing_id).first() is not None
+        if has_listings and not has_summary:
+            count = rebuild_price_summary(db_session)
+            print(f"Property price summary built for {count} properties.")
+
+
+def rebuild_summary_menu():
+    """
+    Rebuilds the price summary table from the menu.
+    """
+    print("\n--- Rebuild Price Summary ---")
+    with session_scope() as db_session:
+        count = rebuild_price_summary(db_session)
+    print(f"Price summary rebuilt for {count} properties.")
+
+
+def check_summary_menu():
+    """
+    Runs the consistency check from the menu and reports stale properties.
+    """
+    print("\n--- Check Price Summary ---")
+    with session_scope() as db_session:
+        mismatched = check_price_summary(db_session)
+    if not mismatched:
+        print("Price summary is consistent with listings.")
+        return
+
+    print(f"{len(mismatched)} property summaries are out of date, e.g. property IDs: "
+          f"{', '.join(str(property_id) for property_id in mismatched[:20])}")
+    print("Run 'Rebuild price summary' to repair them.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the property price summary table.")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        rebuild_summary_menu()
+    else:
+        check_summary_menu()
@@ -0,0 +1,267 @@
+"""
+Process-wide cache of read query results with write-driven invalidation.
+
+Cached queries (see @cached_query in services.py) are keyed on the database the session reaches,
+the query name and its normalized arguments, and every entry carries tags naming what it depends
+on, e.g. "city:3" or "property:17". Write functions call invalidate_on_commit(session, tags); the
+tags are dropped from the cache when that session commits, so only entries depending on the
+changed rows are recomputed. Keys and tags include db.database_identity(), so engines on different
+databases never see each other's results, while the sync, async and read-service engines of one
+database share them.
+
+Configured from the environment:
+    REAL_ESTATE_QUERY_CACHE          "lru" (default) or "off"
+    REAL_ESTATE_QUERY_CACHE_ENTRIES  maximum number of entries (default 4096)
+    REAL_ESTATE_QUERY_CACHE_MB       approximate memory bound of the cached results (default 64)
+    REAL_ESTATE_QUERY_CACHE_TTL      seconds an entry stays valid, 0 for no expiry (default 300)
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+
+from db import database_identity
+
+# session.info keys: tags a session's pending writes will invalidate, and the cache generation
+# when its current transaction began
+PENDING_TAGS_KEY = "query_cache_tags"
+BEGIN_GENERATION_KEY = "query_cache_generation"
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache with per-entry TTL, an entry limit and an approximate byte limit.
+    Least recently used entries are evicted when either limit is exceeded.
+    """
+
+    def __init__(self, max_entries=4096, max_bytes=64 * 1024 * 1024, ttl=300.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (value, tags, size, expires_at)
+        self.keys_by_tag = {}
+        self.bytes = 0
+        # Bumped by every invalidation so results computed before it are not stored after it
+        self.generation = 0
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def lookup(self, key):
+        """
+        Returns (True, value) for a live entry, otherwise (False, generation) where generation
+        is passed back to store() once the value has been computed.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if self.ttl and entry[3] < time.monotonic():
+                    self._remove(key)
+                    self.expirations += 1
+                else:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return True, entry[0]
+            self.misses += 1
+            return False, self.generation
+
+    def store(self, key, value, tags, generation):
+        """
+        Caches a computed value, unless an invalidation happened since its lookup().
+        """
+        size = estimate_size(value)
+        with self.lock:
+            if generation != self.generation or size > self.max_bytes:
+                return
+            if key in self.entries:
+                self._remove(key)
+            expires_at = time.monotonic() + self.ttl if self.ttl else None
+            self.entries[key] = (value, tags, size, expires_at)
+            self.bytes += size
+            for tag in tags:
+                self.keys_by_tag.setdefault(tag, set()).add(key)
+
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def invalidate(self, tags):
+        """
+        Drops every entry carrying one of the tags.
+        """
+        with self.lock:
+            self.generation += 1
+            for tag in tags:
+                for key in list(self.keys_by_tag.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+            self.keys_by_tag.clear()
+            self.bytes = 0
+
+    def _remove(self, key):
+        _, tags, size, _ = self.entries.pop(key)
+        self.bytes -= size
+        for tag in tags:
+            keys = self.keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.keys_by_tag[tag]
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self.entries), "bytes": self.bytes, "hits": self.hits, "misses": self.misses,
+                    "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                    "evictions": self.evictions, "expirations": self.expirations,
+                    "invalidations": self.invalidations}
+
+
+class NullCache:
+    """
+    Cache that stores nothing; every lookup is a miss.
+    """
+
+    generation = 0
+
+    def lookup(self, key):
+        return False, 0
+
+    def store(self, key, value, tags, generation):
+        pass
+
+    def invalidate(self, tags):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {"entries": 0, "disabled": True}
+
+
+def estimate_size(value):
+    """
+    Approximate memory held by a query result: the containers, rows and their scalar values.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, int, float)) or value is None:
+        return size
+    if isinstance(value, dict):
+        return size + sum(estimate_size(item) for item in value.values())
+    try:
+        return size + sum(estimate_size(item) for item in value)
+    except TypeError:
+        return size
+
+
+def create_query_cache():
+    """
+    Builds the cache selected by the REAL_ESTATE_QUERY_CACHE* environment variables.
+    """
+    if os.environ.get("REAL_ESTATE_QUERY_CACHE", "lru") == "off":
+        return NullCache()
+    return QueryCache(max_entries=int(os.environ.get("REAL_ESTATE_QUERY_CACHE_ENTRIES", "4096")),
+                      max_bytes=int(float(os.environ.get("REAL_ESTATE_QUERY_CACHE_MB", "64")) * 1024 * 1024),
+                      ttl=float(os.environ.get("REAL_ESTATE_QUERY_CACHE_TTL", "300")))
+
+
+query_cache = create_query_cache()
+
+
+def set_query_cache(cache):
+    """
+    Replaces the process-wide cache, e.g. with NullCache() or a differently sized QueryCache
+    (as benchmarks/bench_query_cache.py does to compare them).
+    """
+    global query_cache
+    query_cache = cache
+
+
+def clear_query_cache():
+    """
+    Drops every cached result; used after writes that bypass the ORM, such as bulk imports.
+    """
+    query_cache.clear()
+
+
+def query_cache_menu():
+    """
+    Prints the query cache counters from the menu, optionally clearing the cache.
+    """
+    print("\n--- Query Cache Statistics ---")
+    for name, value in query_cache.stats().items():
+        print(f"  {name}: {value}")
+    if input("Clear the cache? (yes/no): ").strip().lower() == "yes":
+        clear_query_cache()
+        print("Query cache cleared.")
+
+
+def _normalize(value):
+    return value.strip() if isinstance(value, str) else value
+
+
+def cached_query(name, tags):
+    """
+    Caches a query function called as query(session, *args). tags(args, result) returns the tags
+    the result depends on. Sessions with uncommitted cache-relevant writes bypass the cache,
+    so a unit of work always reads its own writes and never caches them before they commit.
+    """
+    def decorator(query):
+        @wraps(query)
+        def wrapper(session, *args):
+            args = tuple(_normalize(arg) for arg in args)
+            if session.info.get(PENDING_TAGS_KEY):
+                return query(session, *args)
+
+            database = database_identity(session.get_bind())
+            key = (database, name) + args
+            found, value = query_cache.lookup(key)
+            if found:
+                return value
+            result = query(session, *args)
+            # A transaction that began before an invalidation may still read the old rows
+            generation = min(value, session.info.get(BEGIN_GENERATION_KEY, value))
+            query_tags = {(database, tag) for tag in tags(args, result)} | {(database, name)}
+            query_cache.store(key, result, frozenset(query_tags), generation)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def invalidate_on_commit(session, tags):
+    """
+    Schedules the tags for invalidation, in the session's database, when the session commits;
+    a rollback discards them.
+    """
+    database = database_identity(session.get_bind())
+    session.info.setdefault(PENDING_TAGS_KEY, set()).update((database, tag) for tag in tags)
+
+
+@event.listens_for(OrmSession, "after_begin")
+def _remember_generation(session, transaction, connection):
+    session.info[BEGIN_GENERATION_KEY] = query_cache.generation
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _invalidate_committed(session):
+    tags = session.info.pop(PENDING_TAGS_KEY, None)
+    if tags:
+        query_cache.invalidate(tags)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(PENDING_TAGS_KEY, None)
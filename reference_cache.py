@@ -0,0 +1,200 @@
+"""
+Process-wide cache of the small reference tables: city name -> city ID, agency ID -> agency record
+and company code -> agency ID, kept separately for every database (see db.database_identity()).
+
+Entries are learned lazily from lookups. Creations and changes made in a session are published
+to the cache only when that session commits, and a rollback discards them, so the cache never
+holds IDs of rows that were not committed. Changes made by other processes are not seen;
+call reference_cache.clear() after editing the database externally.
+"""
+import threading
+from collections import namedtuple
+
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session as OrmSession
+
+from db import City, Agency, database_identity
+
+AgencyRecord = namedtuple("AgencyRecord", ["agency_id", "name", "company_code"])
+
+# session.info key holding the cache updates to apply when the session commits
+PENDING_CHANGES_KEY = "reference_cache_changes"
+
+
+class ReferenceMaps:
+    """
+    The cached lookups of one database.
+    """
+
+    __slots__ = ("city_ids", "agencies", "agency_ids")
+
+    def __init__(self):
+        self.city_ids = {}
+        self.agencies = {}
+        self.agency_ids = {}
+
+
+class ReferenceCache:
+    """
+    Thread-safe maps of the city and agency lookups the write paths repeat for every row.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.databases = {}
+        # Bumped whenever committed changes are applied, so a lookup that raced them is not stored
+        self.generation = 0
+        self.hits = self.misses = 0
+
+    def _maps(self, session):
+        """
+        ReferenceMaps of the database the session reaches.
+        """
+        database = database_identity(session.get_bind())
+        maps = self.databases.get(database)
+        if maps is None:
+            with self.lock:
+                maps = self.databases.setdefault(database, ReferenceMaps())
+        return maps
+
+    def _lookup(self, session, mapping, key, load, store):
+        """
+        Returns mapping[key], loading it with load() on a miss. Sessions with uncommitted
+        reference changes read the database directly.
+        """
+        if session.info.get(PENDING_CHANGES_KEY):
+            return load()
+
+        with self.lock:
+            value = mapping.get(key)
+            generation = self.generation
+            if value is not None:
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = load()
+        if value is not None:
+            with self.lock:
+                if generation == self.generation:
+                    store(value)
+        return value
+
+    def city_id(self, session, name):
+        """
+        ID of the city with the given name, or None.
+        """
+        city_ids = self._maps(session).city_ids
+        return self._lookup(session, city_ids, name,
+                            lambda: session.query(City.city_id).filter(City.name == name).scalar(),
+                            lambda city_id: city_ids.__setitem__(name, city_id))
+
+    def get_or_create_city_id(self, session, name):
+        """
+        Returns (city ID, created). Safe against concurrent writers creating the same city:
+        the insert is skipped if the name already exists and the winner's ID is read back.
+        """
+        city_id = self.city_id(session, name)
+        if city_id is not None:
+            return city_id, False
+
+        created = session.execute(insert(City).values(name=name)
+                                  .on_conflict_do_nothing(index_elements=["name"])).rowcount == 1
+        city_id = session.query(City.city_id).filter(City.name == name).scalar()
+        city_ids = self._maps(session).city_ids
+        self.on_commit(session, lambda: city_ids.__setitem__(name, city_id))
+        return city_id, created
+
+    def city_renamed(self, session, old_name, new_name, city_id):
+        city_ids = self._maps(session).city_ids
+
+        def apply():
+            city_ids.pop(old_name, None)
+            city_ids[new_name] = city_id
+        self.on_commit(session, apply)
+
+    def agency(self, session, agency_id):
+        """
+        AgencyRecord of the agency with the given ID, or None.
+        """
+        try:
+            agency_id = int(agency_id)
+        except (TypeError, ValueError):
+            return None
+
+        def load():
+            row = (session.query(Agency.agency_id, Agency.name, Agency.company_code)
+                   .filter(Agency.agency_id == agency_id).first())
+            return AgencyRecord(*row) if row else None
+
+        maps = self._maps(session)
+        return self._lookup(session, maps.agencies, agency_id, load, lambda record: self._store_agency(maps, record))
+
+    def agency_id_by_code(self, session, company_code):
+        """
+        ID of the agency with the given company code, or None.
+        """
+        agency_ids = self._maps(session).agency_ids
+        return self._lookup(session, agency_ids, company_code,
+                            lambda: session.query(Agency.agency_id)
+                            .filter(Agency.company_code == company_code).scalar(),
+                            lambda agency_id: agency_ids.__setitem__(company_code, agency_id))
+
+    def agency_saved(self, session, agency):
+        """
+        Publishes a created or edited agency when the session commits.
+        """
+        record = AgencyRecord(agency.agency_id, agency.name, agency.company_code)
+        maps = self._maps(session)
+
+        def apply():
+            for company_code, agency_id in list(maps.agency_ids.items()):
+                if agency_id == record.agency_id:
+                    del maps.agency_ids[company_code]
+            self._store_agency(maps, record)
+        self.on_commit(session, apply)
+
+    @staticmethod
+    def _store_agency(maps, record):
+        maps.agencies[record.agency_id] = record
+        maps.agency_ids[record.company_code] = record.agency_id
+
+    def on_commit(self, session, apply):
+        """
+        Schedules a cache update for when the session commits.
+        """
+        session.info.setdefault(PENDING_CHANGES_KEY, []).append(apply)
+
+    def apply_committed(self, changes):
+        with self.lock:
+            self.generation += 1
+            for apply in changes:
+                apply()
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.databases.clear()
+
+    def stats(self):
+        with self.lock:
+            maps = list(self.databases.values())
+            return {"databases": len(maps), "cities": sum(len(entry.city_ids) for entry in maps),
+                    "agencies": sum(len(entry.agencies) for entry in maps),
+                    "hits": self.hits, "misses": self.misses}
+
+
+reference_cache = ReferenceCache()
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _apply_committed_changes(session):
+    changes = session.info.pop(PENDING_CHANGES_KEY, None)
+    if changes:
+        reference_cache.apply_committed(changes)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_rolled_back_changes(session):
+    session.info.pop(PENDING_CHANGES_KEY, None)
@@ -0,0 +1,107 @@
+"""
+The derived objects that start-up creates besides the declared tables: the search index, the
+spatial index and the price history triggers, each as its name and CREATE statement.
+
+Kept free of imports so main.py can fingerprint the schema without loading the modules that
+create these objects (and services, the caches and their dependencies with them). The statements
+are written the way SQLite stores them in sqlite_master, without IF NOT EXISTS, so that
+db.replace_stale_objects() can tell an object created from an older statement from a current one.
+"""
+
+# search_index.py: one FTS5 document per entity, with rowid entity_id * KIND_COUNT + the kind's code
+SEARCH_KINDS = {"address": 0, "owner": 1, "agency": 2, "city": 3}
+KIND_COUNT = len(SEARCH_KINDS)
+
+
+def search_rowid(kind, id_expression):
+    return f"{id_expression} * {KIND_COUNT} + {SEARCH_KINDS[kind]}"
+
+
+_CITY_OF_ADDRESS = "coalesce((SELECT name FROM cities WHERE city_id = new.city_id), '')"
+
+# (table, kind, id column, name expression, detail expression) over the row alias "new"
+SEARCH_DOCUMENTS = [
+    ("addresses", "address", "address_id", "new.street_address",
+     f"coalesce(new.postal_code, '') || ' ' || {_CITY_OF_ADDRESS}"),
+    ("owners", "owner", "owner_id", "coalesce(new.first_name, '') || ' ' || coalesce(new.last_name, '')",
+     "coalesce(new.phone_number, '')"),
+    ("agencies", "agency", "agency_id", "new.name", "coalesce(new.company_code, '')"),
+    ("cities", "city", "city_id", "new.name", "''"),
+]
+
+
+def _search_objects():
+    objects = {
+        "search_index": "CREATE VIRTUAL TABLE search_index USING fts5("
+                        "kind UNINDEXED, entity_id UNINDEXED, name, detail, "
+                        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+        "search_vocabulary": "CREATE VIRTUAL TABLE search_vocabulary USING fts5vocab(search_index, 'row')",
+    }
+    for table, kind, id_column, name, detail in SEARCH_DOCUMENTS:
+        insert = (f"INSERT INTO search_index(rowid, kind, entity_id, name, detail) "
+                  f"VALUES ({search_rowid(kind, 'new.' + id_column)}, '{kind}', new.{id_column}, {name}, {detail});")
+        delete = f"DELETE FROM search_index WHERE rowid = {search_rowid(kind, 'old.' + id_column)};"
+        objects[f"search_{table}_insert"] = (f"CREATE TRIGGER search_{table}_insert AFTER INSERT ON {table} "
+                                             f"BEGIN {insert} END")
+        objects[f"search_{table}_update"] = (f"CREATE TRIGGER search_{table}_update AFTER UPDATE ON {table} "
+                                             f"BEGIN {delete} {insert} END")
+        objects[f"search_{table}_delete"] = (f"CREATE TRIGGER search_{table}_delete AFTER DELETE ON {table} "
+                                             f"BEGIN {delete} END")
+
+    # A renamed city changes the detail of every address in it
+    objects["search_cities_rename"] = (
+        "CREATE TRIGGER search_cities_rename AFTER UPDATE OF name ON cities "
+        "WHEN old.name IS NOT new.name BEGIN "
+        "UPDATE search_index SET detail = coalesce((SELECT postal_code FROM addresses "
+        "WHERE address_id = search_index.entity_id), '') || ' ' || coalesce(new.name, '') "
+        f"WHERE rowid IN (SELECT {search_rowid('address', 'address_id')} FROM addresses WHERE city_id = new.city_id); "
+        "END")
+    return objects
+
+
+SEARCH_OBJECTS = _search_objects()
+
+# geo_search.py: one zero-size R*Tree box per located address
+GEO_LOCATION_OF_NEW = "new.address_id, new.latitude, new.latitude, new.longitude, new.longitude"
+GEO_HAS_LOCATION = "new.latitude IS NOT NULL AND new.longitude IS NOT NULL"
+
+GEO_OBJECTS = {
+    "address_locations": "CREATE VIRTUAL TABLE address_locations USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+    "geo_addresses_insert": f"CREATE TRIGGER geo_addresses_insert AFTER INSERT ON addresses WHEN {GEO_HAS_LOCATION} "
+                            f"BEGIN INSERT INTO address_locations VALUES ({GEO_LOCATION_OF_NEW}); END",
+    "geo_addresses_update": "CREATE TRIGGER geo_addresses_update AFTER UPDATE OF latitude, longitude ON addresses "
+                            "BEGIN DELETE FROM address_locations WHERE id = old.address_id; "
+                            f"INSERT INTO address_locations SELECT {GEO_LOCATION_OF_NEW} WHERE {GEO_HAS_LOCATION}; END",
+    "geo_addresses_delete": "CREATE TRIGGER geo_addresses_delete AFTER DELETE ON addresses "
+                            "BEGIN DELETE FROM address_locations WHERE id = old.address_id; END",
+}
+
+# price_history.py: an event appended to listing_price_history on every listing and price change
+HISTORY_EVENTS = {"listed": 0, "repriced": 1, "removed": 2}
+HISTORY_NOW = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+
+def _history_record(row, event):
+    """
+    Statement appending the prices of the trigger row alias `row` ("new" or "old") as an event.
+    """
+    city = (f"(SELECT addresses.city_id FROM properties JOIN addresses ON addresses.address_id = "
+            f"properties.address_id WHERE properties.property_id = {row}.property_id)")
+    return (f"INSERT INTO listing_price_history(ts, event, listing_id, property_id, city_id, agency_id, "
+            f"sale_price, rental_price) VALUES ({HISTORY_NOW}, {HISTORY_EVENTS[event]}, {row}.listing_id, "
+            f"{row}.property_id, {city}, {row}.agency_id, {row}.sale_price, {row}.rental_price);")
+
+
+HISTORY_OBJECTS = {
+    "history_listings_insert": "CREATE TRIGGER history_listings_insert AFTER INSERT ON listings "
+                               f"BEGIN {_history_record('new', 'listed')} END",
+    "history_listings_update": "CREATE TRIGGER history_listings_update AFTER UPDATE OF sale_price, rental_price "
+                               "ON listings WHEN old.sale_price IS NOT new.sale_price "
+                               "OR old.rental_price IS NOT new.rental_price "
+                               f"BEGIN {_history_record('new', 'repriced')} END",
+    "history_listings_delete": "CREATE TRIGGER history_listings_delete AFTER DELETE ON listings "
+                               f"BEGIN {_history_record('old', 'removed')} END",
+}
+
+# In creation order: every object after the ones it refers to
+DERIVED_OBJECTS = {**SEARCH_OBJECTS, **GEO_OBJECTS, **HISTORY_OBJECTS}
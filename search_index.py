@@ -0,0 +1,234 @@
+"""
+Full-text search over addresses, owners, agencies and cities with SQLite FTS5.
+
+One FTS5 table, search_index, holds a document per entity (kind, entity_id, name, detail):
+
+    address  street address   | postal code and city name
+    owner    first/last name  | phone number
+    agency   agency name      | company code
+    city     city name        |
+
+Triggers on the four tables keep it in sync, including re-indexing a city's addresses when the
+city is renamed. Document rowids are entity_id * 4 + the kind's code, so every trigger updates
+its document by rowid.
+
+Matches are ranked in Python rather than with bm25(): bm25 counts the documents of every query
+term, which costs as much as scanning the index for words found in nearly every document
+("street", "city"), while fetching the matching rows costs only as much as the rows returned.
+"""
+import argparse
+import heapq
+import re
+import time
+import unicodedata
+from collections import namedtuple
+
+from sqlalchemy import text
+
+from db import engine, session_scope, replace_stale_objects
+from schema_objects import SEARCH_KINDS, SEARCH_DOCUMENTS, SEARCH_OBJECTS, search_rowid
+
+SEARCH_KINDS_BY_CODE = {code: kind for kind, code in SEARCH_KINDS.items()}
+
+# Tokens this long or longer get typo-tolerant matching (one edit) when the exact search finds nothing
+FUZZY_MIN_LENGTH = 4
+
+# Seconds before the vocabulary used for typo tolerance is reloaded
+VOCABULARY_TTL = 300
+
+# Shortest last word matched as a prefix: the index has prefix entries for 2 and 3 characters, while a
+# one-character prefix would expand to a large share of the vocabulary
+PREFIX_MIN_LENGTH = 2
+
+# Most matching rows ranked per search; beyond that the query is too unspecific to rank usefully
+CANDIDATE_LIMIT = 500
+
+SearchResult = namedtuple("SearchResult", ["kind", "entity_id", "name", "detail", "score"])
+
+
+def _reindex(connection):
+    """
+    Replaces every document with one built from the current rows. Returns the number of documents.
+    """
+    connection.execute(text("DELETE FROM search_index"))
+    for table, kind, id_column, name, detail in SEARCH_DOCUMENTS:
+        select_columns = f"{search_rowid(kind, 'new.' + id_column)}, '{kind}', new.{id_column}, {name}, {detail}"
+        connection.execute(text(f"INSERT INTO search_index(rowid, kind, entity_id, name, detail) "
+                                f"SELECT {select_columns} FROM {table} AS new"))
+    connection.execute(text("INSERT INTO search_index(search_index) VALUES ('optimize')"))
+    return connection.execute(text("SELECT count(*) FROM search_index")).scalar()
+
+
+def rebuild_search_index(bind=engine):
+    """
+    Creates or replaces the search table and triggers as needed and re-indexes every entity.
+    Returns the number of documents indexed.
+    """
+    with bind.begin() as connection:
+        replace_stale_objects(connection, SEARCH_OBJECTS)
+        count = _reindex(connection)
+    _vocabulary_cache.clear()
+    return count
+
+
+def ensure_search_index(bind=engine):
+    """
+    Builds the index when it or any of its triggers is missing or differs from its statement in
+    schema_objects, e.g. for databases created before it was introduced or changed, or whose tables
+    were recreated.
+    """
+    with bind.begin() as connection:
+        if not replace_stale_objects(connection, SEARCH_OBJECTS):
+            return
+        count = _reindex(connection)
+    _vocabulary_cache.clear()
+    print(f"Search index built with {count} entries.")
+
+
+def _normalize(value):
+    """
+    Lowercases and strips diacritics the way the FTS5 tokenizer does.
+    """
+    if value.isascii():
+        return value.lower()
+    decomposed = unicodedata.normalize("NFKD", value.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(query):
+    return _WORD.findall(_normalize(query)) if query else []
+
+
+_vocabulary_cache = {}
+
+
+def _vocabulary(session):
+    """
+    Indexed terms that are not pure numbers, reloaded every VOCABULARY_TTL seconds.
+    """
+    loaded_at, terms = _vocabulary_cache.get("terms", (0.0, None))
+    if terms is None or time.monotonic() - loaded_at > VOCABULARY_TTL:
+        terms = frozenset(row[0] for row in session.execute(
+            text("SELECT term FROM search_vocabulary WHERE term GLOB '*[^0-9]*'")))
+        _vocabulary_cache["terms"] = (time.monotonic(), terms)
+    return terms
+
+
+def _one_edit_away(token, alphabet):
+    """
+    Every string one deletion, transposition, replacement or insertion away from the token.
+    """
+    splits = [(token[:i], token[i:]) for i in range(len(token) + 1)]
+    deletes = [left + right[1:] for left, right in splits if right]
+    transposes = [left + right[1] + right[0] + right[2:] for left, right in splits if len(right) > 1]
+    replaces = [left + char + right[1:] for left, right in splits if right for char in alphabet]
+    inserts = [left + char + right for left, right in splits for char in alphabet]
+    return set(deletes + transposes + replaces + inserts)
+
+
+def _similar_terms(session, token):
+    if len(token) < FUZZY_MIN_LENGTH or token.isdigit():
+        return []
+    vocabulary = _vocabulary(session)
+    alphabet = set("abcdefghijklmnopqrstuvwxyz0123456789") | set(token)
+    return sorted(_one_edit_away(token, alphabet) & vocabulary)
+
+
+def _candidates(session, match, kinds):
+    kind_filter = ""
+    parameters = {"match": match, "limit": CANDIDATE_LIMIT}
+    if kinds:
+        kind_filter = "AND kind IN (" + ", ".join(f":kind{i}" for i in range(len(kinds))) + ")"
+        parameters.update({f"kind{i}": kind for i, kind in enumerate(kinds)})
+    return session.execute(text(f"SELECT kind, entity_id, name, detail FROM search_index "
+                                f"WHERE search_index MATCH :match {kind_filter} LIMIT :limit"), parameters).all()
+
+
+def _term_score(term, name_words, detail_words):
+    """
+    How well one term matches a document: whole words beat prefixes, the name beats the detail.
+    """
+    if term in name_words:
+        return 4.0
+    if any(word.startswith(term) for word in name_words):
+        return 2.0
+    if term in detail_words:
+        return 1.0
+    if any(word.startswith(term) for word in detail_words):
+        return 0.5
+    return 0.0
+
+
+def _rank(rows, alternatives, limit):
+    """
+    Scores rows by their best-matching alternative for every query word (typo corrections count half)
+    and returns the best `limit` as SearchResults. Ties go to shorter names.
+    """
+    weighted = [[(term, 1.0 if position == 0 else 0.5) for position, term in enumerate(terms)]
+                for terms in alternatives]
+    scored = []
+    for kind, entity_id, name, detail in rows:
+        name_words, detail_words = tokenize(name), tokenize(detail)
+        score = 0.0
+        for terms in weighted:
+            score += max(_term_score(term, name_words, detail_words) * weight for term, weight in terms)
+        scored.append((-score, len(name or ""), SEARCH_KINDS[kind], entity_id, name, detail))
+
+    return [SearchResult(SEARCH_KINDS_BY_CODE[code], entity_id, name, detail, -negative_score)
+            for negative_score, _, code, entity_id, name, detail in heapq.nsmallest(limit, scored)]
+
+
+def _match_expression(alternatives):
+    """
+    Every word must match, itself or one of its typo corrections. Only the last word, the one still
+    being typed, also matches as a prefix: prefixes without a prefix index merge the doclists of every
+    term they cover, which for common words costs as much as a scan.
+    """
+    last = len(alternatives) - 1
+    groups = []
+    for position, (token, *corrections) in enumerate(alternatives):
+        prefix = position == last and len(token) >= PREFIX_MIN_LENGTH
+        options = [f'"{token}"*' if prefix else f'"{token}"'] + [f'"{term}"' for term in corrections]
+        groups.append("(" + " OR ".join(options) + ")")
+    return " AND ".join(groups)
+
+
+def search(session, query, kinds=None, limit=20):
+    """
+    Ranked search for entities matching every word of the query; the last word also matches as a prefix.
+    When nothing matches, words of FUZZY_MIN_LENGTH or more characters additionally match indexed
+    terms one typo away. Returns SearchResults (kind, entity_id, name, detail, score), best match first.
+    kinds optionally limits the result to some of SEARCH_KINDS.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+
+    alternatives = [[token] for token in tokens]
+    rows = _candidates(session, _match_expression(alternatives), kinds)
+    if not rows:
+        alternatives = [[token] + _similar_terms(session, token) for token in tokens]
+        if all(len(terms) == 1 for terms in alternatives):
+            return []
+        rows = _candidates(session, _match_expression(alternatives), kinds)
+    return _rank(rows, alternatives, limit)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain and query the full-text search index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("rebuild")
+    query_parser = subparsers.add_parser("query")
+    query_parser.add_argument("text")
+    query_parser.add_argument("--kind", choices=list(SEARCH_KINDS), action="append")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        print(f"Search index rebuilt with {rebuild_search_index()} entries.")
+    else:
+        with session_scope() as db_session:
+            for row in search(db_session, args.text, args.kind):
+                print(f"{row.kind:8} {row.entity_id:>8}  {row.name} | {row.detail}")
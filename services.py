@@ -0,0 +1,648 @@
+from collections import namedtuple
+from operator import ge, le
+
+from sqlalchemy.sql import func, select, tuple_
+
+import geo_search
+from db import Owner, Property, Address, Agency, City, Listing, PropertyPriceSummary
+from price_summary import refresh_property_summary, refresh_property_summaries, discard_property_summaries, id_filter
+from query_cache import cached_query, invalidate_on_commit
+from reference_cache import reference_cache, AgencyRecord
+
+# Read results are plain records, so they can be cached, pickled, serialized and handed between
+# threads without holding on to SQLAlchemy rows or sessions
+PropertySummary = namedtuple("PropertySummary", [
+    "property_id", "registry_number", "area_sqm", "street_address", "postal_code",
+    "average_sale_price", "average_rental_price"])
+PropertyDetails = namedtuple("PropertyDetails", ["property_id", "registry_number", "area_sqm", "street_address", "city"])
+ListingPrice = namedtuple("ListingPrice", ["sale_price", "rental_price", "agency_name"])
+PricedProperty = namedtuple("PricedProperty", [
+    "property_id", "registry_number", "area_sqm", "street_address", "city",
+    "cheapest_sale_price", "cheapest_rental_price"])
+LocatedProperty = namedtuple("LocatedProperty", PricedProperty._fields + ("latitude", "longitude"))
+NearbyProperty = namedtuple("NearbyProperty", LocatedProperty._fields + ("distance_km",))
+OwnerRecord = namedtuple("OwnerRecord", ["owner_id", "first_name", "last_name", "phone_number"])
+CityRecord = namedtuple("CityRecord", ["city_id", "name"])
+AddressRecord = namedtuple("AddressRecord", ["address_id", "street_address", "postal_code", "city",
+                                             "latitude", "longitude"])
+ListingRecord = namedtuple("ListingRecord", ["listing_id", "property_id", "agency_id", "sale_price", "rental_price"])
+PropertyRecord = namedtuple("PropertyRecord", [
+    "property_id", "registry_number", "area_sqm", "owner_id", "street_address", "postal_code", "city",
+    "sale_price", "rental_price"])
+
+
+class NotFoundError(ValueError):
+    """
+    Raised when an operation refers to an entity that does not exist.
+    """
+
+
+def _get_or_raise(session, model, entity_id, label):
+    entity = session.get(model, entity_id)
+    if entity is None:
+        raise NotFoundError(f"No {label} found with ID {entity_id}.")
+    return entity
+
+
+def _records(record_type, rows):
+    """
+    The rows of a query as a list of record_type tuples.
+    """
+    return list(map(record_type._make, rows))
+
+
+def property_cache_tags(session, property_ids):
+    """
+    Query cache tags of the given properties (an iterable or a SELECT of IDs): the property,
+    its registry number and its city.
+    """
+    rows = (session.query(Property.property_id, Property.registry_number, Address.city_id)
+            .join(Address, Property.address_id == Address.address_id)
+            .filter(Property.property_id.in_(id_filter(property_ids)))
+            .all())
+    tags = set()
+    for row in rows:
+        tags.update((f"property:{row.property_id}", f"registry:{row.registry_number}", f"city:{row.city_id}"))
+    return tags
+
+
+def find_city_id(session, city_name):
+    """
+    Returns the ID of the city with the given name, or None if it does not exist.
+    """
+    return reference_cache.city_id(session, city_name.strip())
+
+
+@cached_query("properties_in_city", lambda args, result: {f"city:{args[0]}"})
+def properties_in_city(session, city_id):
+    """
+    PropertySummary records of the properties with listings in a city, with their average sale
+    and rental prices.
+    """
+    return _records(PropertySummary, session.query(Property.property_id,
+                          Property.registry_number,
+                          Property.area_sqm,
+                          Address.street_address,
+                          Address.postal_code,
+                          PropertyPriceSummary.avg_sale_price.label("average_sale_price"),
+                          PropertyPriceSummary.avg_rental_price.label("average_rental_price"))
+            .join(Address, Property.address_id == Address.address_id)
+            .join(PropertyPriceSummary, Property.property_id == PropertyPriceSummary.property_id)
+            .filter(Address.city_id == city_id))
+
+
+@cached_query("property_by_registry_number",
+              lambda args, result: {f"registry:{args[0]}"} |
+              ({f"property:{result.property_id}", f"city-name:{result.city}"} if result else set()))
+def property_by_registry_number(session, registry_number):
+    """
+    PropertyDetails (address, city and area) of the property with the given registry number, or None.
+    """
+    row = (session.query(Property.property_id,
+                         Property.registry_number,
+                         Property.area_sqm,
+                         Address.street_address,
+                         City.name.label("city"))
+           .join(Address, Property.address_id == Address.address_id)
+           .join(City, Address.city_id == City.city_id)
+           .filter(Property.registry_number == registry_number)
+           .first())
+    return None if row is None else PropertyDetails._make(row)
+
+
+@cached_query("property_listings", lambda args, result: {f"property:{args[0]}"})
+def property_listings(session, property_id):
+    """
+    ListingPrice records: sale and rental prices of a property at every agency listing it.
+    """
+    return _records(ListingPrice,
+                    session.query(Listing.sale_price, Listing.rental_price, Agency.name.label("agency_name"))
+                    .join(Agency, Listing.agency_id == Agency.agency_id)
+                    .filter(Listing.property_id == property_id))
+
+
+def priced_properties_query(session, min_sale_price=None, max_sale_price=None,
+                            min_rental_price=None, max_rental_price=None, extra_columns=()):
+    """
+    Query of properties with their address, city and cheapest sale and rental prices, limited to
+    listings within the given price ranges. Callers add their own filters on Property, Address or City.
+    """
+    price_filters = (min_sale_price, max_sale_price, min_rental_price, max_rental_price)
+    columns = (Property.property_id,
+               Property.registry_number,
+               Property.area_sqm,
+               Address.street_address,
+               City.name.label("city"))
+    if all(price is None for price in price_filters):
+        # Without price filters the cheapest prices come straight from the summary table
+        return (session.query(*columns,
+                              PropertyPriceSummary.min_sale_price.label("cheapest_sale_price"),
+                              PropertyPriceSummary.min_rental_price.label("cheapest_rental_price"),
+                              *extra_columns)
+                .join(Address, Property.address_id == Address.address_id)
+                .join(City, Address.city_id == City.city_id)
+                .join(PropertyPriceSummary, Property.property_id == PropertyPriceSummary.property_id))
+
+    # Price filters apply to individual listings, so they still need the listings table
+    return (session.query(*columns,
+                          func.min(Listing.sale_price).label("cheapest_sale_price"),
+                          func.min(Listing.rental_price).label("cheapest_rental_price"),
+                          *extra_columns)
+            .join(Address, Property.address_id == Address.address_id)
+            .join(City, Address.city_id == City.city_id)
+            .join(Listing, Property.property_id == Listing.property_id)
+            .filter(*[operator(column, price) for column, operator, price in (
+                (Listing.sale_price, ge, min_sale_price),
+                (Listing.sale_price, le, max_sale_price),
+                (Listing.rental_price, ge, min_rental_price),
+                (Listing.rental_price, le, max_rental_price)) if price is not None])
+            .group_by(Property.property_id))
+
+
+@cached_query("search_properties", lambda args, result: {f"city:{args[0]}"})
+def search_properties(session, city_id, min_sale_price=None, max_sale_price=None,
+                      min_rental_price=None, max_rental_price=None):
+    """
+    PricedProperty records of the properties in a city with their cheapest sale and rental prices,
+    limited to listings within the given price ranges.
+    """
+    return _records(PricedProperty,
+                    priced_properties_query(session, min_sale_price, max_sale_price, min_rental_price,
+                                            max_rental_price)
+                    .filter(Address.city_id == city_id))
+
+
+def properties_in_box(session, south, west, north, east, min_sale_price=None, max_sale_price=None,
+                      min_rental_price=None, max_rental_price=None):
+    """
+    LocatedProperty records of the properties whose address lies within the bounding box, with their
+    coordinates and cheapest prices within the given price ranges. Addresses are selected through
+    the spatial index.
+    """
+    return _records(LocatedProperty,
+                    priced_properties_query(session, min_sale_price, max_sale_price, min_rental_price,
+                                            max_rental_price, extra_columns=(Address.latitude, Address.longitude))
+                    .join(geo_search.address_locations, geo_search.address_locations.c.id == Address.address_id)
+                    .filter(*geo_search.within_box(south, west, north, east)))
+
+
+def properties_near(session, latitude, longitude, radius_km, min_sale_price=None, max_sale_price=None,
+                    min_rental_price=None, max_rental_price=None, limit=None):
+    """
+    Properties within radius_km of a point and the given price ranges, as NearbyProperty rows
+    nearest first. Raises ValueError for invalid coordinates or a negative radius.
+    """
+    geo_search.validate_coordinates(latitude, longitude)
+    if latitude is None or radius_km is None or radius_km < 0:
+        raise ValueError("A location and a non-negative radius are required.")
+
+    rows = properties_in_box(session, *geo_search.bounding_box(latitude, longitude, radius_km),
+                             min_sale_price, max_sale_price, min_rental_price, max_rental_price)
+    nearby = []
+    for row in rows:
+        distance = geo_search.haversine_km(latitude, longitude, row.latitude, row.longitude)
+        if distance <= radius_km:
+            nearby.append(NearbyProperty(*row, distance))
+    nearby.sort(key=lambda row: (row.distance_km, row.property_id))
+    return nearby[:limit] if limit is not None else nearby
+
+
+def search_by_city(session, city_name):
+    """
+    PropertySummary records of a city's properties, or None if the city does not exist.
+    """
+    city_id = find_city_id(session, city_name)
+    return None if city_id is None else properties_in_city(session, city_id)
+
+
+def prices_by_registry_number(session, registry_number):
+    """
+    (PropertyDetails, [ListingPrice]) for a registry number, or None if no such property exists.
+    """
+    property_data = property_by_registry_number(session, registry_number)
+    if property_data is None:
+        return None
+    return property_data, property_listings(session, property_data.property_id)
+
+
+def advanced_search(session, city_name, min_sale_price=None, max_sale_price=None,
+                    min_rental_price=None, max_rental_price=None):
+    """
+    PricedProperty records of a city's properties within the price ranges, or None if the city
+    does not exist.
+    """
+    city_id = find_city_id(session, city_name)
+    if city_id is None:
+        return None
+    return search_properties(session, city_id, min_sale_price, max_sale_price, min_rental_price, max_rental_price)
+
+
+def create_listing(session, property_id, agency_id, sale_price=None, rental_price=None):
+    """
+    Adds a listing and refreshes the property's price summary. The caller commits.
+    Raises NotFoundError for an unknown property or agency and ValueError if no price is given.
+    """
+    _get_or_raise(session, Property, property_id, "property")
+    if reference_cache.agency(session, agency_id) is None:
+        raise NotFoundError(f"No agency found with ID {agency_id}.")
+    if sale_price is None and rental_price is None:
+        raise ValueError("You must provide at least one price (sale or rental).")
+
+    listing = Listing(property_id=property_id, agency_id=agency_id, sale_price=sale_price, rental_price=rental_price)
+    session.add(listing)
+    refresh_property_summary(session, property_id)
+    invalidate_on_commit(session, property_cache_tags(session, [property_id]))
+    return listing
+
+
+def update_listing_prices(session, listing_id, sale_price, rental_price):
+    """
+    Replaces a listing's sale and rental prices and refreshes the property's price summary.
+    The caller commits. Raises NotFoundError if the listing does not exist.
+    """
+    listing = _get_or_raise(session, Listing, listing_id, "listing")
+    listing.sale_price = sale_price
+    listing.rental_price = rental_price
+    refresh_property_summary(session, listing.property_id)
+    invalidate_on_commit(session, property_cache_tags(session, [listing.property_id]))
+    return listing
+
+
+def find_agency(session, agency_id):
+    """
+    Returns the agency's (agency_id, name, company_code) record, or None if it does not exist.
+    """
+    return reference_cache.agency(session, agency_id)
+
+
+def find_owner(session, owner_id):
+    """
+    Returns the owner's OwnerRecord, or None if it does not exist.
+    """
+    row = (session.query(Owner.owner_id, Owner.first_name, Owner.last_name, Owner.phone_number)
+           .filter(Owner.owner_id == owner_id)
+           .first())
+    return None if row is None else OwnerRecord._make(row)
+
+
+def find_property(session, property_id):
+    """
+    Returns the property's PropertyDetails, or None if it does not exist.
+    """
+    row = (session.query(Property.property_id, Property.registry_number, Property.area_sqm,
+                         Address.street_address, City.name.label("city"))
+           .join(Address, Property.address_id == Address.address_id)
+           .join(City, Address.city_id == City.city_id)
+           .filter(Property.property_id == property_id)
+           .first())
+    return None if row is None else PropertyDetails._make(row)
+
+
+def find_address(session, address_id):
+    """
+    Returns the address's AddressRecord, with its city name, or None if it does not exist.
+    """
+    row = (session.query(Address.address_id, Address.street_address, Address.postal_code, City.name.label("city"),
+                         Address.latitude, Address.longitude)
+           .join(City, Address.city_id == City.city_id)
+           .filter(Address.address_id == address_id)
+           .first())
+    return None if row is None else AddressRecord._make(row)
+
+
+def find_listing(session, listing_id):
+    """
+    Returns the listing's ListingRecord, or None if it does not exist.
+    """
+    row = (session.query(Listing.listing_id, Listing.property_id, Listing.agency_id,
+                         Listing.sale_price, Listing.rental_price)
+           .filter(Listing.listing_id == listing_id)
+           .first())
+    return None if row is None else ListingRecord._make(row)
+
+
+def find_city(session, city_id):
+    """
+    Returns the city's CityRecord, or None if it does not exist.
+    """
+    row = session.query(City.city_id, City.name).filter(City.city_id == city_id).first()
+    return None if row is None else CityRecord._make(row)
+
+
+def get_or_create_city_id(session, city_name):
+    """
+    Returns (city ID, created), creating the city if needed; safe against concurrent writers.
+    """
+    return reference_cache.get_or_create_city_id(session, city_name)
+
+
+def create_owner(session, first_name, last_name, phone_number):
+    """
+    Adds an owner. The caller commits.
+    """
+    owner = Owner(first_name=first_name, last_name=last_name, phone_number=phone_number)
+    session.add(owner)
+    session.flush()
+    return owner
+
+
+def create_property(session, owner_id, street_address, postal_code, city_name, area_sqm, registry_number,
+                    latitude=None, longitude=None):
+    """
+    Adds a property with its address, creating the city if needed. The caller commits.
+    Raises ValueError for invalid coordinates.
+    """
+    _get_or_raise(session, Owner, owner_id, "owner")
+    geo_search.validate_coordinates(latitude, longitude)
+    city_id, _ = get_or_create_city_id(session, city_name)
+    address = Address(street_address=street_address, postal_code=postal_code, city_id=city_id,
+                      latitude=latitude, longitude=longitude)
+    session.add(address)
+    session.flush()
+
+    property_obj = Property(owner_id=owner_id, address_id=address.address_id, area_sqm=area_sqm,
+                            registry_number=registry_number)
+    session.add(property_obj)
+    session.flush()
+    invalidate_on_commit(session, {f"registry:{registry_number}", f"city:{city_id}"})
+    return property_obj
+
+
+def create_agency(session, name, company_code):
+    """
+    Adds an agency. The caller commits. Raises ValueError if the company code is taken.
+    """
+    if reference_cache.agency_id_by_code(session, company_code) is not None:
+        raise ValueError(f"An agency with company code '{company_code}' already exists.")
+
+    agency = Agency(name=name, company_code=company_code)
+    session.add(agency)
+    session.flush()
+    reference_cache.agency_saved(session, agency)
+    return agency
+
+
+def _apply_changes(entity, changes):
+    """
+    Sets every attribute whose new value is not None.
+    """
+    for name, value in changes.items():
+        if value is not None:
+            setattr(entity, name, value)
+    return entity
+
+
+def update_owner(session, owner_id, first_name=None, last_name=None, phone_number=None):
+    """
+    Changes the given owner fields; None keeps the current value. The caller commits.
+    """
+    owner = _get_or_raise(session, Owner, owner_id, "owner")
+    return _apply_changes(owner, {"first_name": first_name, "last_name": last_name, "phone_number": phone_number})
+
+
+def update_property(session, property_id, area_sqm=None, registry_number=None):
+    """
+    Changes the given property fields; None keeps the current value. The caller commits.
+    """
+    property_obj = _get_or_raise(session, Property, property_id, "property")
+    invalidate_on_commit(session, property_cache_tags(session, [property_id]) | {f"registry:{registry_number}"})
+    return _apply_changes(property_obj, {"area_sqm": area_sqm, "registry_number": registry_number})
+
+
+def update_address(session, address_id, street_address=None, postal_code=None, city_name=None,
+                   latitude=None, longitude=None):
+    """
+    Changes the given address fields, creating the city if needed; None keeps the current value.
+    The caller commits. Raises ValueError for invalid coordinates.
+    """
+    address = _get_or_raise(session, Address, address_id, "address")
+    geo_search.validate_coordinates(latitude if latitude is not None else address.latitude,
+                                    longitude if longitude is not None else address.longitude)
+    property_ids = [row.property_id for row in session.query(Property.property_id).filter_by(address_id=address_id)]
+    invalidate_on_commit(session, property_cache_tags(session, property_ids) | {f"city:{address.city_id}"})
+    if city_name:
+        address.city_id = get_or_create_city_id(session, city_name)[0]
+        invalidate_on_commit(session, {f"city:{address.city_id}"})
+    return _apply_changes(address, {"street_address": street_address, "postal_code": postal_code,
+                                    "latitude": latitude, "longitude": longitude})
+
+
+def update_agency(session, agency_id, name=None, company_code=None):
+    """
+    Changes the given agency fields; None keeps the current value. The caller commits.
+    """
+    agency = _get_or_raise(session, Agency, agency_id, "agency")
+    # Agency names appear in every cached property_listings result
+    invalidate_on_commit(session, {"property_listings"})
+    _apply_changes(agency, {"name": name, "company_code": company_code})
+    reference_cache.agency_saved(session, agency)
+    return agency
+
+
+def update_city(session, city_id, name=None):
+    """
+    Renames a city; None keeps the current name. The caller commits.
+    """
+    city = _get_or_raise(session, City, city_id, "city")
+    invalidate_on_commit(session, {f"city:{city_id}", f"city-name:{city.name}", f"city-name:{name}"})
+    if name is not None:
+        reference_cache.city_renamed(session, city.name, name, city_id)
+    return _apply_changes(city, {"name": name})
+
+
+def _delete_properties(session, property_ids):
+    """
+    Removes properties (an iterable or a SELECT of IDs) with their addresses, listings and price
+    summaries using one DELETE per table, however many properties there are. Returns the number
+    of properties removed.
+    """
+    property_ids = id_filter(property_ids)
+    invalidate_on_commit(session, property_cache_tags(session, property_ids))
+    discard_property_summaries(session, property_ids)
+    # Listings and addresses go first: both subqueries below read the properties
+    (session.query(Listing)
+     .filter(Listing.property_id.in_(property_ids))
+     .delete(synchronize_session=False))
+    (session.query(Address)
+     .filter(Address.address_id.in_(select(Property.address_id).where(Property.property_id.in_(property_ids))))
+     .delete(synchronize_session=False))
+    return (session.query(Property)
+            .filter(Property.property_id.in_(property_ids))
+            .delete(synchronize_session=False))
+
+
+def delete_owner(session, owner_id):
+    """
+    Removes an owner with their properties, the properties' addresses and listings. The caller commits.
+    Returns the number of properties removed.
+    """
+    owner = _get_or_raise(session, Owner, owner_id, "owner")
+    removed = _delete_properties(session, select(Property.property_id).where(Property.owner_id == owner_id))
+    session.delete(owner)
+    return removed
+
+
+def delete_property(session, property_id):
+    """
+    Removes a property with its address and listings; the city is kept. The caller commits.
+    """
+    _get_or_raise(session, Property, property_id, "property")
+    _delete_properties(session, [property_id])
+
+
+def delete_listing(session, listing_id):
+    """
+    Removes a listing and refreshes its property's price summary. The caller commits.
+    """
+    listing = _get_or_raise(session, Listing, listing_id, "listing")
+    invalidate_on_commit(session, property_cache_tags(session, [listing.property_id]))
+    session.delete(listing)
+    refresh_property_summary(session, listing.property_id)
+
+
+def count_agency_listings(session, agency_id):
+    """
+    Number of listings an agency has.
+    """
+    return session.query(func.count(Listing.listing_id)).filter(Listing.agency_id == agency_id).scalar()
+
+
+def delete_agency_listings(session, agency_id):
+    """
+    Removes every listing of an agency with a single DELETE and refreshes the price summaries of the
+    properties they were for; the agency is kept. The caller commits. Returns the number of listings
+    removed. Raises NotFoundError if the agency does not exist.
+    """
+    if reference_cache.agency(session, agency_id) is None:
+        raise NotFoundError(f"No agency found with ID {agency_id}.")
+    property_ids = select(Listing.property_id).where(Listing.agency_id == agency_id).distinct()
+    invalidate_on_commit(session, property_cache_tags(session, property_ids))
+    # Summaries are rebuilt from the listings that stay while the subquery can still find the properties
+    refresh_property_summaries(session, property_ids, Listing.agency_id.is_distinct_from(agency_id))
+    return (session.query(Listing)
+            .filter(Listing.agency_id == agency_id)
+            .delete(synchronize_session=False))
+
+
+def _page(query, key_column, after, limit):
+    """
+    One keyset page: at most `limit` rows whose key is greater than `after` (all keys when None), in
+    key order. The last key of a page is the `after` of the next one.
+    """
+    if after is not None:
+        query = query.filter(key_column > after)
+    return query.order_by(key_column).limit(limit).all()
+
+
+def owners_page(session, after=None, limit=50):
+    """
+    Up to `limit` OwnerRecords in owner ID order, from the first owner ID after `after` (None: the first).
+    """
+    return _records(OwnerRecord, _page(session.query(Owner.owner_id, Owner.first_name, Owner.last_name,
+                                                     Owner.phone_number), Owner.owner_id, after, limit))
+
+
+def agencies_page(session, after=None, limit=50):
+    """
+    Up to `limit` AgencyRecords in agency ID order, from the first agency ID after `after` (None: the first).
+    """
+    return _records(AgencyRecord, _page(session.query(Agency.agency_id, Agency.name, Agency.company_code),
+                                        Agency.agency_id, after, limit))
+
+
+def cities_page(session, after=None, limit=50):
+    """
+    Up to `limit` CityRecords in city ID order, from the first city ID after `after` (None: the first).
+    """
+    return _records(CityRecord, _page(session.query(City.city_id, City.name), City.city_id, after, limit))
+
+
+def properties_page(session, after=None, limit=50):
+    """
+    Up to `limit` PropertyRecords (properties with address, city and their cheapest prices) in property
+    ID order, from the first property ID after `after` (None: the first).
+    """
+    return _records(PropertyRecord, _page(properties_query(session), Property.property_id, after, limit))
+
+
+def listings_page(session, after=None, limit=50):
+    """
+    Up to `limit` ListingRecords in listing ID order, from the first listing ID after `after` (None: the first).
+    """
+    return _records(ListingRecord, _page(session.query(Listing.listing_id, Listing.property_id, Listing.agency_id,
+                                                       Listing.sale_price, Listing.rental_price),
+                                         Listing.listing_id, after, limit))
+
+
+# Report queries select only the columns the reports display, as plain rows: no entities are
+# built, tracked in the identity map or instrumented, whatever the number of rows
+
+def properties_query(session):
+    """
+    Every property with its address, city and cheapest prices.
+    """
+    return (session.query(Property.property_id, Property.registry_number, Property.area_sqm, Property.owner_id,
+                          Address.street_address, Address.postal_code, City.name.label("city"),
+                          PropertyPriceSummary.min_sale_price.label("sale_price"),
+                          PropertyPriceSummary.min_rental_price.label("rental_price"))
+            .join(Address, Property.address_id == Address.address_id)
+            .join(City, Address.city_id == City.city_id)
+            .outerjoin(PropertyPriceSummary, Property.property_id == PropertyPriceSummary.property_id))
+
+
+def owner_properties_query(session):
+    """
+    Every owner's properties, one row per property with the owner, address and city.
+    """
+    return (session.query(Owner.owner_id, Owner.first_name, Owner.last_name, Owner.phone_number,
+                          Property.property_id, Property.registry_number, Property.area_sqm,
+                          Address.street_address, City.name.label("city"))
+            .join(Property, Owner.owner_id == Property.owner_id)
+            .join(Address, Property.address_id == Address.address_id)
+            .join(City, Address.city_id == City.city_id))
+
+
+def agency_listings_query(session):
+    """
+    Every agency's listings, one row per listing with the agency, property, address and city.
+    """
+    return (session.query(Agency.agency_id, Agency.name.label("agency_name"), Listing.listing_id,
+                          Listing.sale_price, Listing.rental_price, Property.registry_number, Property.area_sqm,
+                          Address.street_address, City.name.label("city"))
+            .join(Listing, Agency.agency_id == Listing.agency_id)
+            .join(Property, Listing.property_id == Property.property_id)
+            .join(Address, Property.address_id == Address.address_id)
+            .join(City, Address.city_id == City.city_id))
+
+
+# Rows fetched from the database cursor at a time when a report is not paged
+STREAM_BATCH_SIZE = 1000
+
+
+def stream_report_rows(query, key_columns, key_of, page_size, next_page=lambda: True):
+    """
+    Streams the rows of a report query in key order without loading the whole result.
+
+    With a page size, every page is a separate keyset query (WHERE key > last key ... LIMIT page_size),
+    so each page costs the same regardless of how far into the report the caller is; after a full page
+    the stream continues only if next_page() returns True. Without one (0), rows are streamed from a
+    single cursor in batches. key_of(row) must return the values of key_columns for a row.
+    """
+    ordered = query.order_by(*key_columns)
+
+    if not page_size:
+        yield from ordered.yield_per(STREAM_BATCH_SIZE)
+        return
+
+    last_key = None
+    while True:
+        page = ordered if last_key is None else ordered.filter(tuple_(*key_columns) > tuple_(*last_key))
+        row_count = 0
+        for row in page.limit(page_size).yield_per(page_size):
+            row_count += 1
+            last_row = row
+            yield row
+
+        if row_count < page_size or not next_page():
+            return
+        last_key = key_of(last_row)
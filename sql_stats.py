@@ -0,0 +1,423 @@
+"""
+SQL instrumentation: time, rows returned and issuing feature of every statement, plus a slow-query
+log holding the query plan of each slow statement.
+
+install_sql_stats(engine) hooks the engine's before/after_cursor_execute events; db.py does so for
+every engine it creates. Statements are attributed to the innermost feature function running under
+@unit_of_work (see operation_scope()), otherwise to the nearest application function on the call
+stack. SQLite steps a SELECT as its rows are fetched, so SQLite connections use a cursor class that
+also times the fetches and counts the rows they return; a SELECT is recorded when its cursor closes.
+The bookkeeping adds 10-20 µs to every statement, so it is off unless REAL_ESTATE_SQL_STATS=on.
+
+Statements slower than the threshold are appended to the slow-query log with their callers,
+EXPLAIN QUERY PLAN output and the number and types of their parameters; parameter values (names,
+phone numbers) are never logged. Counters and recent slow queries are under Maintenance Menu ->
+SQL statistics.
+
+Configured from the environment:
+    REAL_ESTATE_SQL_STATS       "on" or "off" (default)
+    REAL_ESTATE_SLOW_QUERY_MS   slow statement threshold in milliseconds (default 200)
+    REAL_ESTATE_SLOW_QUERY_LOG  slow-query log file (default slow_queries.log), empty for none
+"""
+import os
+import re
+import sqlite3
+import sys
+import sysconfig
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from sqlalchemy import event
+
+SQL_STATS_ENABLED = os.environ.get("REAL_ESTATE_SQL_STATS", "off") == "on"
+SLOW_QUERY_MS = float(os.environ.get("REAL_ESTATE_SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG = os.environ.get("REAL_ESTATE_SLOW_QUERY_LOG", "slow_queries.log")
+
+# Distinct (operation, statement) pairs counted separately; later ones share OTHER_STATEMENTS
+MAX_STATEMENTS = 2000
+OTHER_STATEMENTS = "(other statements)"
+# Slow queries kept in memory for the menu, and application frames named as their callers
+RECENT_SLOW_QUERIES = 20
+CALLER_FRAMES = 3
+
+# Feature function currently running under @unit_of_work, as "module.function"
+_operation = ContextVar("sql_stats_operation", default=None)
+
+# Frames from these directories (the standard library and installed packages) are never callers
+_LIBRARY_PATHS = tuple({sysconfig.get_paths()[name] for name in ("stdlib", "platstdlib", "purelib", "platlib")})
+
+# Modules whose frames are never named as the caller of a statement
+_PLUMBING_MODULES = {__name__, "db"}
+
+# Expanded IN lists and multi-row VALUES differ in length only; counted as one statement
+_PLACEHOLDER_LIST = re.compile(r"\(\?(?:, \?)+\)")
+_REPEATED_ROWS = re.compile(r"(\([^()]*\))(?:, \1)+")
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+
+# Serializes appends to the slow-query log
+_log_lock = threading.Lock()
+
+# Statements of cursors garbage-collected before they were closed, recorded by the next statement
+# to finish: __del__ may run on any thread and while that thread holds one of the locks above
+_abandoned = deque()
+
+
+class SqlCounter:
+    """
+    Totals of the statements recorded under one key.
+    """
+    __slots__ = ("statements", "seconds", "max_seconds", "rows")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = self.max_seconds = 0.0
+        self.rows = 0
+
+    def add(self, seconds, rows):
+        self.statements += 1
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.rows += rows
+
+
+class SqlStats:
+    """
+    Thread-safe counters per operation and per (operation, statement), and the recent slow queries.
+    """
+
+    def __init__(self, max_statements=MAX_STATEMENTS):
+        self.max_statements = max_statements
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.by_operation = {}
+            self.by_statement = {}
+            self.slow_queries = 0
+            self.recent_slow = deque(maxlen=RECENT_SLOW_QUERIES)
+            self.since = time.time()
+
+    def record(self, operation, statement, seconds, rows, slow_entry=None):
+        key = (operation, normalize_statement(statement))
+        with self.lock:
+            counter = self.by_statement.get(key)
+            if counter is None:
+                if len(self.by_statement) >= self.max_statements:
+                    key = (operation, OTHER_STATEMENTS)
+                counter = self.by_statement.setdefault(key, SqlCounter())
+            counter.add(seconds, rows)
+            self.by_operation.setdefault(operation, SqlCounter()).add(seconds, rows)
+            if slow_entry is not None:
+                self.slow_queries += 1
+                self.recent_slow.append(slow_entry)
+
+    def top_operations(self, limit=10):
+        """
+        [(operation, SqlCounter)] by total SQL time.
+        """
+        with self.lock:
+            return sorted(self.by_operation.items(), key=lambda item: item[1].seconds, reverse=True)[:limit]
+
+    def top_statements(self, limit=10):
+        """
+        [((operation, statement), SqlCounter)] by total SQL time.
+        """
+        with self.lock:
+            return sorted(self.by_statement.items(), key=lambda item: item[1].seconds, reverse=True)[:limit]
+
+    def totals(self):
+        total = SqlCounter()
+        with self.lock:
+            for counter in self.by_operation.values():
+                total.statements += counter.statements
+                total.seconds += counter.seconds
+                total.max_seconds = max(total.max_seconds, counter.max_seconds)
+                total.rows += counter.rows
+        return total
+
+
+sql_stats = SqlStats()
+
+
+@lru_cache(maxsize=MAX_STATEMENTS)
+def normalize_statement(statement):
+    statement = " ".join(statement.split())
+    return _REPEATED_ROWS.sub(r"\1, ...", _PLACEHOLDER_LIST.sub("(?, ...)", statement))
+
+
+@contextmanager
+def operation_scope(name):
+    """
+    Attributes the statements issued inside the block to the operation `name`.
+    """
+    token = _operation.set(name)
+    try:
+        yield
+    finally:
+        _operation.reset(token)
+
+
+def _application_frames():
+    """
+    Frames of the call stack, innermost first, outside the standard library, installed packages
+    and the session plumbing of db.py.
+    """
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (not filename.startswith(_LIBRARY_PATHS) and not filename.startswith("<")
+                and frame.f_globals.get("__name__") not in _PLUMBING_MODULES):
+            yield frame
+        frame = frame.f_back
+
+
+def callers(limit=CALLER_FRAMES):
+    """
+    The innermost application frames as "file.py:line function".
+    """
+    return [f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+            for frame, _ in zip(_application_frames(), range(limit))]
+
+
+def current_operation():
+    """
+    The operation statements issued now are attributed to.
+    """
+    operation = _operation.get()
+    if operation is not None:
+        return operation
+    for frame in _application_frames():
+        return f"{frame.f_globals.get('__name__')}.{frame.f_code.co_name}"
+    return "(unknown)"
+
+
+def explain(dbapi_connection, statement, parameters):
+    """
+    EXPLAIN QUERY PLAN of an SQLite statement as indented lines; an empty list for statements
+    that have no plan.
+    """
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return []
+    try:
+        rows = dbapi_connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+    except sqlite3.Error as e:
+        return [f"(no plan: {e})"]
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return lines
+
+
+def describe_parameters(parameters):
+    """
+    The number and types of a statement's bound parameters, without their values.
+    """
+    if not parameters:
+        return ""
+    if isinstance(parameters, dict):
+        described = [f"{name}: {type(value).__name__}" for name, value in parameters.items()]
+    else:
+        described = [type(value).__name__ for value in parameters]
+    return f"{len(described)} ({', '.join(described)[:300]})"
+
+
+def write_slow_query(entry):
+    if not SLOW_QUERY_LOG:
+        return
+    lines = [f"# {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['time']))}  {entry['ms']:.1f} ms  "
+             f"rows: {entry['rows']}  operation: {entry['operation']}",
+             f"# called from: {' < '.join(entry['callers']) or '(unknown)'}",
+             entry["statement"].strip() + ";"]
+    if entry["parameters"]:
+        lines.append(f"-- parameters: {entry['parameters']}")
+    if entry["plan"]:
+        lines.append("-- plan:")
+        lines += [f"--   {line}" for line in entry["plan"]]
+    with _log_lock, open(SLOW_QUERY_LOG, "a", encoding="utf-8") as file:
+        file.write("\n".join(lines) + "\n\n")
+
+
+class _Execution:
+    """
+    One statement in flight: its execute time so far and, for a SELECT, the fetches of its rows.
+    """
+    __slots__ = ("stats", "statement", "parameters", "operation", "seconds", "rows")
+
+    def __init__(self, stats, statement, parameters, operation, seconds):
+        self.stats = stats
+        self.statement = statement
+        self.parameters = parameters
+        self.operation = operation
+        self.seconds = seconds
+        self.rows = 0
+
+    def finish(self, dbapi_connection=None):
+        """
+        Records the statement, on the thread that ran it: a slow one is explained on dbapi_connection.
+        """
+        record_abandoned()
+        self._record(dbapi_connection)
+
+    def _record(self, dbapi_connection, abandoned=False):
+        slow_entry = None
+        if self.seconds * 1000 >= SLOW_QUERY_MS:
+            slow_entry = {"time": time.time(), "ms": self.seconds * 1000, "rows": self.rows,
+                          "operation": self.operation, "callers": [] if abandoned else callers(),
+                          "statement": self.statement, "parameters": describe_parameters(self.parameters),
+                          "plan": explain(dbapi_connection, self.statement, self.parameters)
+                          if isinstance(dbapi_connection, sqlite3.Connection) else []}
+            write_slow_query(slow_entry)
+        self.stats.record(self.operation, self.statement, self.seconds, self.rows, slow_entry)
+
+
+def record_abandoned():
+    """
+    Records the statements of cursors garbage-collected before they were closed, without a plan.
+    """
+    while True:
+        try:
+            execution = _abandoned.popleft()
+        except IndexError:
+            return
+        execution._record(None, abandoned=True)
+
+
+class StatsCursor(sqlite3.Cursor):
+    """
+    sqlite3 cursor that adds the time and rows of its fetches to the statement it is running.
+    """
+    execution = None
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        if self.execution is not None:
+            self.execution.seconds += time.perf_counter() - start
+            self.execution.rows += row is not None
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        if self.execution is not None:
+            self.execution.seconds += time.perf_counter() - start
+            self.execution.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        if self.execution is not None:
+            self.execution.seconds += time.perf_counter() - start
+            self.execution.rows += len(rows)
+        return rows
+
+    def finish(self):
+        execution, self.execution = self.execution, None
+        if execution is not None:
+            execution.finish(self.connection)
+
+    def close(self):
+        self.finish()
+        super().close()
+
+    def __del__(self):
+        # Results abandoned without being closed are still counted, by the next statement to finish;
+        # nothing is executed, written or locked here
+        if self.execution is not None:
+            _abandoned.append(self.execution)
+            self.execution = None
+
+
+class StatsConnection(sqlite3.Connection):
+    """
+    sqlite3 connection whose cursors are StatsCursors.
+    """
+
+    def cursor(self, factory=StatsCursor):
+        return super().cursor(factory)
+
+
+def install_sql_stats(sync_engine, stats=None):
+    """
+    Records every statement the (sync) engine executes in `stats` (default: the process-wide
+    sql_stats) and logs the slow ones.
+    """
+    stats = stats or sql_stats
+    if sync_engine.dialect.name == "sqlite" and sync_engine.dialect.driver == "pysqlite":
+        @event.listens_for(sync_engine, "do_connect")
+        def use_stats_connection(dialect, connection_record, cargs, cparams):
+            cparams.setdefault("factory", StatsConnection)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_statement(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("sql_stats_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["sql_stats_started"].pop()
+        if executemany and parameters:
+            parameters = parameters[0]
+        execution = _Execution(stats, statement, parameters, current_operation(), seconds)
+        if cursor.description is not None and isinstance(cursor, StatsCursor):
+            # Finished when SQLAlchemy closes the cursor after the last row is fetched
+            cursor.execution = execution
+        else:
+            execution.rows = max(cursor.rowcount, 0)
+            execution.finish(getattr(cursor, "connection", None))
+
+    @event.listens_for(sync_engine, "handle_error")
+    def discard_statement(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("sql_stats_started"):
+            connection.info["sql_stats_started"].pop()
+
+
+def sql_stats_menu():
+    """
+    Prints the busiest operations and statements and the recent slow queries from the menu,
+    optionally resetting the counters.
+    """
+    print("\n--- SQL Statistics ---")
+    if not SQL_STATS_ENABLED:
+        print("SQL statistics are off; start with REAL_ESTATE_SQL_STATS=on to collect them.")
+        return
+
+    record_abandoned()
+    total = sql_stats.totals()
+    print(f"Since {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(sql_stats.since))}: "
+          f"{total.statements} statements, {total.seconds * 1000:.1f} ms, {total.rows} rows; "
+          f"{sql_stats.slow_queries} slower than {SLOW_QUERY_MS:g} ms"
+          + (f" (logged to {SLOW_QUERY_LOG})" if SLOW_QUERY_LOG else ""))
+
+    print(f"\n{'Operation':48} {'Stmts':>7} {'Total ms':>10} {'Avg ms':>8} {'Max ms':>8} {'Rows':>9}")
+    for operation, counter in sql_stats.top_operations():
+        print(f"{operation[:48]:48} {counter.statements:7} {counter.seconds * 1000:10.1f} "
+              f"{counter.seconds * 1000 / counter.statements:8.2f} {counter.max_seconds * 1000:8.1f} "
+              f"{counter.rows:9}")
+
+    print(f"\n{'Total ms':>10} {'Count':>7} {'Avg ms':>8} {'Rows':>9}  Statement (operation)")
+    for (operation, statement), counter in sql_stats.top_statements():
+        print(f"{counter.seconds * 1000:10.1f} {counter.statements:7} "
+              f"{counter.seconds * 1000 / counter.statements:8.2f} {counter.rows:9}  "
+              f"{statement[:90]} ({operation})")
+
+    recent = list(sql_stats.recent_slow)[-5:]
+    if recent:
+        print("\nRecent slow queries:")
+        for entry in recent:
+            print(f"  {entry['ms']:.1f} ms, {entry['rows']} rows, {entry['operation']}: "
+                  f"{' '.join(entry['statement'].split())[:90]}")
+            for line in entry["plan"]:
+                print(f"      {line}")
+
+    if input("Reset the statistics? (yes/no): ").strip().lower() == "yes":
+        sql_stats.reset()
+        print("SQL statistics reset.")
@@ -0,0 +1,10 @@
+"""
+Tests for the Real Estate Management System, run with `python -m pytest`.
+
+Tests create their own databases, so real_estate.db is never touched; the default engine still
+points at a scratch in-memory database in case a test reaches it.
+"""
+import os
+
+os.environ.setdefault("REAL_ESTATE_DB_URL", "sqlite://")
+os.environ.setdefault("REAL_ESTATE_SLOW_QUERY_LOG", "")
@@ -0,0 +1,91 @@
+import http.client
+import json
+import threading
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+import api
+import db
+from db import Base, Owner, create_database_engine
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """
+    Port of an API server on a new database.
+    """
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'api.db'}", sql_stats=False)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(db, "Session", sessionmaker(bind=engine))
+    api.response_cache.clear()
+    http_server = api.create_server(port=0)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    yield http_server.server_address[1], engine
+    http_server.shutdown()
+    http_server.server_close()
+    engine.dispose()
+
+
+def request(port, method, path, body):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        connection.request(method, path, body=json.dumps(body), headers={"Content-Type": "application/json"})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read() or b"null")
+    finally:
+        connection.close()
+
+
+def owner_count(engine):
+    with engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(Owner)).scalar()
+
+
+def test_post_with_an_empty_body_names_the_missing_fields(server):
+    port, engine = server
+    status, payload = request(port, "POST", "/owners", {})
+
+    assert status == 400
+    assert "first_name, last_name" in payload["error"]
+    assert owner_count(engine) == 0
+
+
+@pytest.mark.parametrize("path, body, missing", [
+    ("/properties", {"street_address": "Gedimino pr. 1", "area_sqm": 50, "registry_number": "R-1"},
+     "owner_id, city"),
+    ("/agencies", {"name": "Agency"}, "company_code"),
+    ("/listings", {"sale_price": 100_000}, "property_id, agency_id"),
+])
+def test_post_without_required_fields_is_a_bad_request(server, path, body, missing):
+    port, _ = server
+    status, payload = request(port, "POST", path, body)
+
+    assert status == 400
+    assert payload["error"].endswith(missing)
+
+
+@pytest.mark.parametrize("method, path, body, message", [
+    ("POST", "/owners", {"first_name": "Ona", "last_name": 7}, "last_name must be a string"),
+    ("POST", "/listings", {"property_id": "1", "agency_id": True}, "property_id must be an integer"),
+    ("PATCH", "/owners/1", {"phone_number": ["+370"]}, "phone_number must be a string"),
+    ("PATCH", "/listings/1", {"sale_price": "cheap"}, "sale_price must be a number"),
+    ("POST", "/owners", ["Ona", "Jonaitė"], "the body must be a JSON object"),
+])
+def test_values_of_the_wrong_type_are_a_bad_request(server, method, path, body, message):
+    port, engine = server
+    status, payload = request(port, method, path, body)
+
+    assert status == 400
+    assert message in payload["error"]
+    assert owner_count(engine) == 0
+
+
+def test_a_complete_body_is_created(server):
+    port, engine = server
+    status, payload = request(port, "POST", "/owners", {"first_name": "Ona", "last_name": "Jonaitė"})
+
+    assert status == 201
+    assert (payload["first_name"], payload["last_name"], payload["phone_number"]) == ("Ona", "Jonaitė", None)
+    assert owner_count(engine) == 1
@@ -0,0 +1,36 @@
+import json
+
+from sqlalchemy import func, select
+
+from bulk_import import import_feed
+from db import Base, Listing, Property, create_database_engine
+
+
+def feed_engine(tmp_path):
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'feed.db'}", sql_stats=False)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def feed_line(number, **values):
+    return json.dumps({"first_name": "Ona", "last_name": "Jonaitė", "phone_number": f"+3706000000{number}",
+                       "street_address": f"{number} Gedimino pr.", "postal_code": "01103", "city": "Vilnius",
+                       "area_sqm": 55.5, "registry_number": f"REG-{number}", "agency_name": "Agency",
+                       "company_code": "AG1", "sale_price": 100_000 + number, **values})
+
+
+def test_malformed_jsonl_lines_are_skipped_and_reported(tmp_path):
+    engine = feed_engine(tmp_path)
+    path = tmp_path / "feed.jsonl"
+    path.write_text("\n".join([feed_line(1), '{"registry_number": "REG-2", ', feed_line(3), "[1, 2]",
+                               feed_line(4, area_sqm="large"), feed_line(5)]) + "\n", encoding="utf-8")
+
+    stats = import_feed(str(path), bind=engine, progress=False)
+
+    assert (stats.rows, stats.skipped) == (3, 3)
+    assert [error.split(":")[0] for error in stats.errors] == ["record 2", "record 4", "record 5"]
+    assert "invalid JSON" in stats.errors[0] and "expected a JSON object" in stats.errors[1]
+    with engine.connect() as connection:
+        assert connection.execute(select(Property.registry_number).order_by(Property.registry_number)).scalars().all() \
+            == ["REG-1", "REG-3", "REG-5"]
+        assert connection.execute(select(func.count()).select_from(Listing)).scalar() == 3
@@ -0,0 +1,29 @@
+import json
+
+from sqlalchemy import select
+
+from bulk_import import import_feed
+from bulk_reprice import reprice_from_file
+from db import Listing
+from tests.test_bulk_import import feed_engine, feed_line
+
+
+def test_malformed_repricing_lines_are_rejected_and_the_rest_applied(tmp_path):
+    engine = feed_engine(tmp_path)
+    feed = tmp_path / "feed.jsonl"
+    feed.write_text("\n".join(feed_line(number) for number in (1, 2, 3)) + "\n", encoding="utf-8")
+    import_feed(str(feed), bind=engine, progress=False)
+
+    prices = tmp_path / "prices.jsonl"
+    prices.write_text("\n".join([json.dumps({"listing_id": 1, "sale_price": 90_000}), '{"listing_id": 2,',
+                                 "42", json.dumps({"listing_id": 2, "sale_price": [1]}),
+                                 json.dumps({"listing_id": 3, "rental_price": 700})]) + "\n", encoding="utf-8")
+
+    stats = reprice_from_file(str(prices), bind=engine, progress=False)
+
+    assert (stats.rows, stats.updated, stats.skipped) == (2, 2, 3)
+    assert [error.split(":")[0] for error in stats.errors] == ["record 2", "record 3", "record 4"]
+    with engine.connect() as connection:
+        assert connection.execute(select(Listing.listing_id, Listing.sale_price, Listing.rental_price)
+                                  .order_by(Listing.listing_id)).all() \
+            == [(1, 90_000.0, None), (2, 100_002.0, None), (3, 100_003.0, 700.0)]
@@ -0,0 +1,58 @@
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from db import Base, ListingPriceHistory, create_database_engine
+from price_history import BUCKET_ORIGIN, BUCKETS, EVENTS, compact_price_history, price_trend
+
+WEEK = BUCKETS["week"]
+
+# A Wednesday noon UTC, so neither the raw retention cutoff nor the start of the data falls on a bucket edge
+NOW = BUCKET_ORIGIN + 2900 * WEEK + 2 * 86400 + 12 * 3600
+
+
+def history_engine(tmp_path, events):
+    """
+    Engine on a new database whose history holds (ts, sale price) events of listing 1 (property 1).
+    """
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'history.db'}", sql_stats=False)
+    Base.metadata.create_all(engine, tables=[ListingPriceHistory.__table__])
+    with engine.begin() as connection:
+        connection.execute(insert(ListingPriceHistory), [
+            {"ts": ts, "event": EVENTS["repriced"], "listing_id": 1, "property_id": 1, "city_id": 1, "agency_id": 1,
+             "sale_price": sale_price, "rental_price": None} for ts, sale_price in events])
+    return engine
+
+
+def weekly_trend(engine):
+    with Session(engine) as session:
+        return price_trend(session, "property", 1, NOW - 300 * 86400, NOW + 1, bucket="week")
+
+
+def test_compaction_keeps_the_weekly_trend_buckets(tmp_path):
+    # An event every 5 hours for 200 days at a rising price, so the last event of a week has its highest price
+    events = [(NOW - 200 * 86400 + step * 5 * 3600, 100_000.0 + step) for step in range(200 * 24 // 5)]
+    engine = history_engine(tmp_path, events)
+    before = weekly_trend(engine)
+
+    downsampled, expired = compact_price_history(engine, raw_days=90, bucket="week", max_days=730, now=NOW)
+    after = weekly_trend(engine)
+
+    assert downsampled > 0 and expired == 0
+    assert [row.bucket_start for row in after] == [row.bucket_start for row in before]
+    assert [row.max_sale_price for row in after] == [row.max_sale_price for row in before]
+    cutoff = NOW - 90 * 86400
+    for row in after:
+        if row.bucket_start + WEEK <= cutoff:
+            # One event left per listing: the week's last, which is what the week's trend point ends on
+            assert row.events == 1 and row.avg_sale_price == row.max_sale_price
+
+
+def test_compaction_groups_by_trend_week_not_epoch_week(tmp_path):
+    # Monday and Sunday of the same trend week; an epoch-aligned week (Thursday to Wednesday) splits them
+    monday = BUCKET_ORIGIN + 2870 * WEEK + 3600
+    engine = history_engine(tmp_path, [(monday, 1.0), (monday + 6 * 86400 + 22 * 3600, 2.0)])
+
+    compact_price_history(engine, raw_days=90, bucket="week", max_days=730, now=NOW)
+
+    [row] = weekly_trend(engine)
+    assert (row.bucket_start, row.events, row.avg_sale_price) == (monday - 3600, 1, 2.0)
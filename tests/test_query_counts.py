@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import db
+from benchmarks.query_counts import MAX_STATEMENTS, SCREENS, count_screens
+from benchmarks.synthetic import generate
+from db import create_database_engine
+
+# Two data sizes far enough apart that a query per listed row would show
+SCALES = (200, 2000)
+
+
+@pytest.fixture
+def screen_counts(tmp_path, monkeypatch):
+    """
+    {scale: {screen label: statement count}} of every screen in benchmarks/query_counts.py.
+    """
+    counts = {}
+    for scale in SCALES:
+        engine = create_database_engine(f"sqlite:///{tmp_path / f'{scale}.db'}", sql_stats=False)
+        generate(engine, scale, agencies=10)
+        monkeypatch.setattr(db, "Session", sessionmaker(bind=engine))
+        counts[scale] = count_screens(engine)
+        engine.dispose()
+    return counts
+
+
+def test_screens_issue_the_same_bounded_number_of_statements_at_every_size(screen_counts):
+    small, large = (screen_counts[scale] for scale in SCALES)
+    for label, _, _ in SCREENS:
+        # A screen that ran against another database would count nothing here
+        assert small[label] > 0, f"{label}: no statements on the test database"
+        assert small[label] == large[label], f"{label}: {small[label]} statements at {SCALES[0]} listings, " \
+                                             f"{large[label]} at {SCALES[1]}"
+        assert large[label] <= MAX_STATEMENTS, f"{label}: {large[label]} statements"
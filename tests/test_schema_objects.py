@@ -0,0 +1,54 @@
+from sqlalchemy import insert, text
+
+from db import (Base, Owner, create_database_engine, mark_schema_current, replace_stale_objects, schema_fingerprint,
+                schema_is_current)
+from geo_search import ensure_geo_index
+from price_history import ensure_price_history
+from schema_objects import DERIVED_OBJECTS
+from search_index import ensure_search_index
+
+FINGERPRINT = schema_fingerprint(*DERIVED_OBJECTS.values())
+
+
+def initialized_engine(tmp_path):
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'schema.db'}", sql_stats=False)
+    Base.metadata.create_all(engine)
+    ensure_search_index(engine)
+    ensure_geo_index(engine)
+    ensure_price_history(engine)
+    mark_schema_current(FINGERPRINT, engine)
+    return engine
+
+
+def test_the_fingerprint_covers_trigger_bodies():
+    changed = dict(DERIVED_OBJECTS, history_listings_insert=DERIVED_OBJECTS["history_listings_insert"]
+                   .replace(" END", " SELECT 1; END"))
+    reformatted = {name: statement.replace(" BEGIN ", "\n    BEGIN\n    ") for name, statement in DERIVED_OBJECTS.items()}
+
+    assert schema_fingerprint(*changed.values()) != FINGERPRINT
+    assert schema_fingerprint(*reformatted.values()) == FINGERPRINT
+
+
+def test_an_initialized_database_has_no_stale_objects(tmp_path):
+    engine = initialized_engine(tmp_path)
+
+    assert schema_is_current(FINGERPRINT, engine)
+    with engine.begin() as connection:
+        assert replace_stale_objects(connection, DERIVED_OBJECTS) == []
+
+
+def test_a_trigger_with_a_changed_body_is_replaced_and_its_index_rebuilt(tmp_path):
+    engine = initialized_engine(tmp_path)
+    with engine.begin() as connection:
+        connection.execute(text("DROP TRIGGER search_owners_insert"))
+        connection.execute(text("CREATE TRIGGER search_owners_insert AFTER INSERT ON owners BEGIN SELECT 1; END"))
+        connection.execute(insert(Owner).values(first_name="Ona", last_name="Jonaitė", phone_number="+37060000001"))
+
+    assert not schema_is_current(FINGERPRINT, engine)
+    ensure_search_index(engine)
+
+    with engine.connect() as connection:
+        stored = connection.execute(text("SELECT sql FROM sqlite_master WHERE name = 'search_owners_insert'")).scalar()
+        assert stored == DERIVED_OBJECTS["search_owners_insert"]
+        assert connection.execute(text("SELECT name FROM search_index WHERE kind = 'owner'")).scalars().all() \
+            == ["Ona Jonaitė"]